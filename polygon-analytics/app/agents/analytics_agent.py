@@ -2,6 +2,10 @@ from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.output_parser import StrOutputParser
 from app.config import get_settings
+from app.agents.fake_llm import FakeTemplateChain
+from app.services.analytics_spec import parse_spec, spec_template
+from app.services.prompt_cache import PromptCache
+from typing import Iterator, Union
 import json
 import re
 
@@ -9,11 +13,13 @@ settings = get_settings()
 
 class AnalyticsAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model="gpt-4o",
-            temperature=0,
-            api_key=settings.openai_api_key
-        )
+        self.llm = None
+        if settings.llm_provider != "fake":
+            self.llm = ChatOpenAI(
+                model="gpt-4o",
+                temperature=0,
+                api_key=settings.openai_api_key
+            )
         
         self.system_prompt = """You are an expert data analyst that generates Python code for analyzing stock tick data.
         
@@ -22,7 +28,8 @@ class AnalyticsAgent:
         - Columns: id, symbol, timestamp, price, size, exchange, conditions, created_at
         
         You should generate Python code that:
-        1. Queries the database using SQLAlchemy
+        1. Loads ticks with the built-in load_ticks helper (or queries the database using SQLAlchemy
+           for aggregations PostgreSQL can do itself)
         2. Processes the data using pandas
         3. Returns results as either a table (DataFrame) or chart (matplotlib/plotly)
         
@@ -31,8 +38,39 @@ class AnalyticsAgent:
         - Use parameterized queries for safety
         - Include error handling
         - Return a dictionary with keys: type (table/chart/both), data, chart
-        - For charts, save to a BytesIO object and return base64 encoded string
+        - For charts, return render_chart(fig) as "chart" (a built-in helper; do not import it). It
+          renders a matplotlib figure into the server's chart store and returns a small reference with
+          its URL; plotly figures are returned as a spec the frontend draws. Never savefig or base64
+          the image yourself
         - Always filter by symbol and date range if specified
+        - Never SELECT * from tick_data: name only the columns you use, and filter on symbol and timestamp
+        - Aggregate in SQL (GROUP BY, DATE_TRUNC) or with load_bars rather than groupby/resample over
+          raw ticks, and never loop over rows (iterrows, itertuples, apply with axis=1)
+        - For bar-level analyses (volume by hour, VWAP over time, OHLC, trade counts per interval)
+          call the built-in helper load_bars(db_session, symbol, start_date, end_date, interval)
+          instead of scanning tick_data. interval is one of '1s', '1m', '5m', '1h', '1d'; it returns a
+          DataFrame with columns bucket, open, high, low, close, volume, trade_count, vwap
+          read from pre-aggregated bars. Do not import it.
+        - To read raw ticks call the built-in helper load_ticks(symbol, start_date, end_date, columns=[...])
+          instead of pd.read_sql or db_session.execute(...).fetchall(). It COPYs straight into typed
+          columns and returns a DataFrame ordered by timestamp. columns defaults to
+          ['timestamp', 'price', 'size']; 'exchange', 'conditions' and 'id' are also available, so ask
+          only for the columns you use. For very large ranges pass chunk_rows=N to get an iterator of
+          DataFrames instead. Do not import it.
+        
+        ANALYTICS SPECS: when the request is only aggregations of one symbol's ticks per time bucket
+        and/or per group (volume, VWAP, OHLC, trade counts, average price by 5 minutes, by hour, by
+        exchange...), respond with ONLY a JSON analytics spec in a ```json block instead of code. It is
+        compiled to a single SQL query and runs far faster than any template. Fields:
+          "aggregations": any of "volume", "trade_count", "vwap", "open", "high", "low", "close",
+                          "avg_price", "price_std", "cumulative_volume", "cumulative_vwap" (required)
+          "interval": time bucket such as "1m", "5m", "15m", "1h", "1d" (optional)
+          "group_by": any of "exchange", "hour" (hour of day), "weekday" (optional)
+          "filters": [{{"column": "price"|"size"|"exchange", "op": "="|"!="|">"|">="|"<"|"<="|"in", "value": ...}}]
+          "totals": true to add a whole-range totals row
+          "charts": [{{"mark": "bar"|"line"|"area"|"point", "y": one of the aggregations}}]
+        Example: {{"interval": "1h", "aggregations": ["volume", "trade_count"], "charts": [{{"mark": "bar", "y": "volume"}}]}}
+        Write Python code for anything a spec cannot express.
         
         Example structure:
         ```python
@@ -40,13 +78,10 @@ class AnalyticsAgent:
         import matplotlib.pyplot as plt
         from sqlalchemy import create_engine, text
         import numpy as np
-        from io import BytesIO
-        import base64
         
         def analyze_data(db_session, symbol, start_date, end_date):
             # Your analysis code here
-            query = "SELECT * FROM tick_data WHERE symbol = :symbol AND timestamp BETWEEN :start AND :end"
-            df = pd.read_sql(query, db_session.bind, params={{"symbol": symbol, "start": start_date, "end": end_date}})
+            df = load_ticks(symbol, start_date, end_date, columns=["timestamp", "price", "size"])
             
             # Process data
             result = process_data(df)
@@ -59,37 +94,94 @@ class AnalyticsAgent:
             return {{
                 "type": "both",
                 "data": result.to_dict(),
-                "chart": fig_to_base64(fig)
+                "chart": render_chart(fig)
             }}
         ```
         """
         
-    def generate_template(self, prompt: str) -> dict:
-        """Generate Python code template from natural language prompt"""
-        
+        # Built once; every generation reuses the same prompt template and chain
         template = ChatPromptTemplate.from_messages([
             ("system", self.system_prompt),
             ("user", """Generate Python code for the following analysis request:
             
             {prompt}
             
-            Return ONLY the Python code, no explanations. The code should be a complete function called 'analyze_data' that takes (db_session, symbol, start_date, end_date) as parameters.""")
+            Return ONLY the Python code (or only the JSON analytics spec), no explanations. The code should be a complete function called 'analyze_data' that takes (db_session, symbol, start_date, end_date) as parameters.""")
         ])
+        if self.llm is None:
+            self.chain = FakeTemplateChain(token_seconds=settings.fake_llm_token_seconds)
+        else:
+            self.chain = template | self.llm | StrOutputParser()
         
-        chain = template | self.llm | StrOutputParser()
+        self.prompt_cache = PromptCache(
+            similarity=settings.prompt_cache_similarity,
+            max_entries=settings.prompt_cache_max_entries
+        )
         
-        code = chain.invoke({"prompt": prompt})
+    def generate_template(self, prompt: str, use_cache: bool = True) -> dict:
+        """Generate Python code template from natural language prompt.
+        
+        Prompts matching an earlier one exactly or closely enough reuse its
+        code ('cache' says which prompt matched); concurrent identical prompts
+        share one LLM call.
+        """
+        cached = self._cached_template(prompt) if use_cache else None
+        if cached is not None:
+            return cached
+        return self.prompt_cache.generate_once(prompt, self._generate)
+    
+    def stream_template(self, prompt: str, use_cache: bool = True) -> Iterator[Union[str, dict]]:
+        """Like generate_template, but yields the LLM's response text as it arrives.
         
-        # Extract just the Python code
-        code = self._extract_python_code(code)
+        The last item is the template dict; a cached template is yielded as a
+        single chunk.
+        """
+        cached = self._cached_template(prompt) if use_cache else None
+        if cached is not None:
+            yield cached["code"]
+            yield cached
+            return
+        
+        chunks = []
+        for chunk in self.chain.stream({"prompt": prompt}):
+            chunks.append(chunk)
+            yield chunk
+        yield self._finish(prompt, "".join(chunks))
+    
+    def _cached_template(self, prompt: str):
+        if not settings.prompt_cache_enabled:
+            return None
+        cached = self.prompt_cache.lookup(prompt)
+        if cached is None:
+            return None
+        return {
+            "prompt": prompt,
+            "code": cached["code"],
+            "output_type": cached["output_type"],
+            "cache": {key: cached[key] for key in ("match", "similarity", "prompt", "template_id")}
+        }
+    
+    def _generate(self, prompt: str) -> dict:
+        return self._finish(prompt, self.chain.invoke({"prompt": prompt}))
+    
+    def _finish(self, prompt: str, response: str) -> dict:
+        # An analytics spec becomes a template that runs it; otherwise extract just the Python code
+        try:
+            spec = parse_spec(response)
+        except ValueError:
+            spec = None  # malformed spec: left to fail validation as code
+        code = spec_template(spec) if spec is not None else self._extract_python_code(response)
         
         # Determine output type from the prompt
         output_type = self._determine_output_type(prompt)
         
+        if settings.prompt_cache_enabled:
+            self.prompt_cache.add(prompt, code, output_type)
         return {
             "prompt": prompt,
             "code": code,
-            "output_type": output_type
+            "output_type": output_type,
+            "cache": None
         }
     
     def _extract_python_code(self, response: str) -> str:
@@ -0,0 +1,39 @@
+"""Offline stand-in for the template generation chain (LLM_PROVIDER=fake).
+
+Answers with one of the example templates, picked by keywords in the prompt,
+fenced like a model response and streamed a word at a time, so generation
+and the streaming endpoint can be exercised without an API key.
+"""
+import re
+import time
+from typing import Any, Dict, Iterator
+
+from app.templates.example_templates import PRICE_DISTRIBUTION, VOLUME_BY_HOUR, VWAP_CALCULATION
+
+_CHUNK = re.compile(r"\s*\S+|\s+")
+
+
+class FakeTemplateChain:
+    """invoke/stream like ``prompt | llm | StrOutputParser()``"""
+
+    def __init__(self, token_seconds: float = 0.0):
+        self.token_seconds = token_seconds
+
+    def _response(self, prompt: str) -> str:
+        prompt = prompt.lower()
+        if "vwap" in prompt:
+            code = VWAP_CALCULATION
+        elif "distribution" in prompt or "histogram" in prompt:
+            code = PRICE_DISTRIBUTION
+        else:
+            code = VOLUME_BY_HOUR
+        return f"```python\n{code.strip()}\n```"
+
+    def invoke(self, inputs: Dict[str, Any]) -> str:
+        return "".join(self.stream(inputs))
+
+    def stream(self, inputs: Dict[str, Any]) -> Iterator[str]:
+        for chunk in _CHUNK.findall(self._response(inputs["prompt"])):
+            if self.token_seconds:
+                time.sleep(self.token_seconds)
+            yield chunk
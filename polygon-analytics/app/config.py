@@ -8,6 +8,86 @@ class Settings(BaseSettings):
     redis_url: str
     secret_key: str
     
+    # Adaptive fetch scheduler (AIMD) tuning
+    fetch_initial_concurrency: int = 16
+    fetch_max_concurrency: int = 500
+    fetch_max_retries: int = 5
+    
+    # Time-sliced pagination: initial window length and adaptive split limits
+    fetch_slice_minutes: int = 60
+    fetch_max_split: int = 16
+    fetch_min_slice_seconds: int = 1
+    
+    # COPY encoding for tick ingest: "binary" (vectorized) or "text" (legacy)
+    ingest_copy_format: str = "binary"
+    
+    # Parallel DB writers, each with its own connection
+    ingest_writer_workers: int = 4
+    ingest_batch_rows: int = 200000
+    
+    # Incremental fetch: data newer than this is never marked as covered
+    coverage_settle_seconds: int = 900
+    
+    # tick_data partitioning: "day" or "month", optional HASH(symbol) sub-partitions
+    tick_partition_interval: str = "day"
+    tick_partition_symbol_hash: int = 0
+    
+    # Backfills spanning at least this many days load via an unindexed staging table
+    ingest_bulk_min_days: int = 5
+    # tick_data secondary indexes: "btree" (per-column) or "brin" (BRIN on timestamp)
+    tick_index_mode: str = "btree"
+    
+    # OHLCV rollups maintained during ingest (empty string disables them)
+    bar_intervals: str = "1s,1m,5m,1h,1d"
+    
+    # Template result cache: in-process LRU in front of Redis
+    result_cache_enabled: bool = True
+    result_cache_max_entries: int = 256
+    result_cache_ttl_seconds: int = 3600
+    
+    # Compiled templates kept per TemplateExecutor (LRU by code hash)
+    template_cache_size: int = 128
+    
+    # Template execution worker processes
+    template_workers: int = 2
+    template_timeout_seconds: float = 60.0
+    template_max_queue: int = 32
+    template_worker_start_method: str = "spawn"
+    
+    # Tables longer than this are stored server-side (Arrow IPC) and returned as a preview + handle
+    result_inline_max_rows: int = 1000
+    result_preview_rows: int = 100
+    result_store_dir: str = "data/results"
+    result_store_ttl_seconds: int = 86400
+    
+    # Columnar (Arrow IPC) tick cache: comma-separated symbols, "*" for all, empty disables
+    tick_cache_symbols: str = ""
+    tick_cache_dir: str = "data/ticks"
+    
+    # Rendered charts: "png"/"svg" files served from /api/charts by content hash, or "inline" base64
+    chart_format: str = "png"
+    chart_store_dir: str = "data/charts"
+    chart_store_ttl_seconds: int = 7 * 86400
+    
+    # Template generation LLM: "openai", or "fake" for canned example templates streamed offline
+    llm_provider: str = "openai"
+    fake_llm_token_seconds: float = 0.0
+    
+    # Narrow SELECT * over tick_data in generated templates to the columns the code references
+    template_lint_rewrite: bool = False
+    
+    # Template generation: reuse code for an exact or near-duplicate (shingle Jaccard >= similarity) prompt
+    prompt_cache_enabled: bool = True
+    prompt_cache_similarity: float = 0.9
+    prompt_cache_max_entries: int = 10000
+    
+    # Peak-memory tracking (tracemalloc) for each template execution; slows templates
+    # down and inflates the recorded timings, so only turn it on while investigating memory
+    template_profile_memory: bool = False
+    
+    # Background fetch jobs: how often live progress is written to fetch_jobs
+    fetch_job_persist_seconds: float = 2.0
+    
     class Config:
         env_file = ".env"
 
@@ -1,19 +1,39 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Header, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from pydantic import BaseModel
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import asyncio
+import json
+import os
+import time
 
-from app.models.database import engine, get_db
+from app.models.database import SessionLocal, engine, get_db, add_missing_columns
 from app.models.models import Base, TickData, AnalyticsTemplate, QueryHistory
 from app.services.polygon_service import PolygonService
 from app.agents.analytics_agent import AnalyticsAgent
 from app.services.template_executor import TemplateExecutor
+from app.services.result_cache import ResultCache, code_hash
+from app.services.result_store import ResultStore, ARROW_MEDIA_TYPE
+from app.services.chart_store import ChartStore, MEDIA_TYPES as CHART_MEDIA_TYPES
+from app.services.fetch_jobs import FetchJobManager
+from app.services.tick_cache import get_tick_cache
+from app.services.tick_partitions import get_partition_manager
+from app.services.template_pool import (
+    TemplateWorkerPool, TemplatePoolFull, TemplateTimeout, TemplateCancelled
+)
+from app.config import get_settings
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+add_missing_columns(engine, QueryHistory.__table__)
+# create_all leaves an existing heap tick_data as it is; fail now rather than on every fetch
+with engine.connect() as connection:
+    get_partition_manager().require_partitioned(connection)
 
 app = FastAPI(title="Polygon Analytics API")
 
@@ -31,18 +51,40 @@ class FetchDataRequest(BaseModel):
     symbol: str
     start_date: str
     end_date: str
+    force: bool = False  # Ignore the coverage ledger and refetch the whole range
+    bulk: Optional[bool] = None  # Staging-table load; default decided by range size
+    background: bool = True  # Return a task id immediately; poll /api/fetch-status/{task_id}
 
 class FetchDataResponse(BaseModel):
     success: bool
     message: str
     symbol: str
     date_range: str
+    task_id: Optional[str] = None
     records_fetched: Optional[int] = None
+    complete: bool = True
+    already_covered: bool = False
+    pages_fetched: Optional[int] = None
+    pages_dropped: int = 0
+    dropped_pages: List[Dict[str, Any]] = []
+
+class FetchBatchRequest(BaseModel):
+    symbols: List[str]
+    start_date: str
+    end_date: str
+    force: bool = False
+    bulk: Optional[bool] = None
+    background: bool = True
 
 class GenerateTemplateRequest(BaseModel):
     prompt: str
     save_template: bool = False
     template_name: Optional[str] = None
+    use_cache: bool = True
+
+class ValidateTemplateRequest(BaseModel):
+    template_code: str
+    rewrite: bool = False
 
 class ExecuteTemplateRequest(BaseModel):
     template_id: Optional[int] = None
@@ -50,6 +92,7 @@ class ExecuteTemplateRequest(BaseModel):
     symbol: str
     start_date: str
     end_date: str
+    execution_id: Optional[str] = None  # Client-chosen id, usable with the cancel endpoint
 
 class TemplateResponse(BaseModel):
     id: int
@@ -59,107 +102,268 @@ class TemplateResponse(BaseModel):
     output_type: str
     created_at: datetime
 
+settings = get_settings()
+
 # Initialize services
-polygon_service = PolygonService()
 analytics_agent = AnalyticsAgent()
 template_executor = TemplateExecutor()
+result_cache = ResultCache(
+    redis_url=settings.redis_url,
+    max_entries=settings.result_cache_max_entries,
+    ttl_seconds=settings.result_cache_ttl_seconds
+)
+result_store = ResultStore(settings.result_store_dir, ttl_seconds=settings.result_store_ttl_seconds)
+chart_store = ChartStore(settings.chart_store_dir, ttl_seconds=settings.chart_store_ttl_seconds)
+tick_cache = get_tick_cache()
+template_pool = TemplateWorkerPool(
+    workers=settings.template_workers,
+    timeout_seconds=settings.template_timeout_seconds,
+    max_queue=settings.template_max_queue,
+    start_method=settings.template_worker_start_method
+)
+
+def invalidate_fetched_ranges(symbol: str, ranges: List[List[str]]):
+    """Cached template results and tick files over cleared/refetched ranges are now stale"""
+    for start_ts, end_ts in ranges:
+        result_cache.invalidate(symbol, start_ts, end_ts)
+    if ranges and tick_cache.caches(symbol):
+        # Day files are rebuilt from tick_data off the event loop
+        asyncio.get_running_loop().run_in_executor(None, tick_cache.refresh, symbol, ranges)
+
+# Called by every fetch path once its DELETE has committed, whether the refetch succeeds or not
+polygon_service = PolygonService(on_ranges_changed=invalidate_fetched_ranges)
+fetch_jobs = FetchJobManager(polygon_service, persist_seconds=settings.fetch_job_persist_seconds)
+
+@app.on_event("startup")
+async def start_template_pool():
+    template_pool.start()
 
-# Global dictionary to track fetch status
-fetch_status = {}
+@app.on_event("startup")
+async def resume_fetch_jobs():
+    fetch_jobs.resume_unfinished()
+
+@app.on_event("shutdown")
+async def stop_template_pool():
+    template_pool.shutdown()
 
 @app.get("/")
 async def root():
     return {"message": "Polygon Analytics API", "version": "1.0.0"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (ingest latency, status, queue and COPY metrics)"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+def validate_fetch_range(start_date: str, end_date: str):
+    """400 unless start/end are YYYY-MM-DD dates at most 30 days apart"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        
+        if start > end:
+            raise ValueError("Start date must be before end date")
+        
+        if (end - start).days > 30:
+            raise ValueError("Date range cannot exceed 30 days for optimal performance")
+            
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/api/fetch-data", response_model=FetchDataResponse)
 async def fetch_data(request: FetchDataRequest, db: Session = Depends(get_db)):
     """Fetch and store tick data from Polygon - Optimized version"""
     try:
-        # Validate dates
-        try:
-            start = datetime.strptime(request.start_date, "%Y-%m-%d")
-            end = datetime.strptime(request.end_date, "%Y-%m-%d")
-            
-            if start > end:
-                raise ValueError("Start date must be before end date")
-            
-            if (end - start).days > 30:
-                raise ValueError("Date range cannot exceed 30 days for optimal performance")
-                
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
+        validate_fetch_range(request.start_date, request.end_date)
+        
+        if request.background:
+            task_id = fetch_jobs.submit(
+                db, request.symbol, request.start_date, request.end_date,
+                force=request.force, bulk=request.bulk
+            )
+            return FetchDataResponse(
+                success=True,
+                message=f"Fetch queued as task {task_id}",
+                symbol=request.symbol,
+                date_range=f"{request.start_date} to {request.end_date}",
+                task_id=task_id,
+                complete=False
+            )
         
         # Start fetching data
         print(f"API: Starting fetch for {request.symbol} from {request.start_date} to {request.end_date}")
         
-        records = await polygon_service.fetch_and_store_data(
+        summary = await polygon_service.fetch_and_store_data(
             request.symbol,
             request.start_date,
             request.end_date,
-            db
+            db,
+            force=request.force,
+            bulk=request.bulk
         )
+        records = summary["records"]
+        
+        if summary["already_covered"]:
+            message = "Range already stored - nothing to fetch"
+        else:
+            message = f"Fetched and stored {records:,} records"
+        if not summary["complete"]:
+            message += f" (INCOMPLETE: {summary['pages_dropped']} page(s) dropped)"
         
         return FetchDataResponse(
             success=True,
-            message=f"Fetched and stored {records:,} records",
+            message=message,
             symbol=request.symbol,
             date_range=f"{request.start_date} to {request.end_date}",
-            records_fetched=records
+            records_fetched=records,
+            complete=summary["complete"],
+            already_covered=summary["already_covered"],
+            pages_fetched=summary.get("pages_fetched"),
+            pages_dropped=summary.get("pages_dropped", 0),
+            dropped_pages=summary.get("dropped_pages", [])
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"API Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/fetch-batch")
+async def fetch_batch(request: FetchBatchRequest, db: Session = Depends(get_db)):
+    """Fetch many symbols through one shared session, scheduler and writer pool"""
+    try:
+        validate_fetch_range(request.start_date, request.end_date)
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in request.symbols if symbol.strip()))
+        if not symbols:
+            raise HTTPException(status_code=400, detail="At least one symbol required")
+        
+        if request.background:
+            task_id = fetch_jobs.submit_batch(
+                db, symbols, request.start_date, request.end_date,
+                force=request.force, bulk=request.bulk
+            )
+            return {
+                "success": True,
+                "message": f"Batch fetch of {len(symbols)} symbols queued as task {task_id}",
+                "task_id": task_id,
+                "symbols": symbols
+            }
+        
+        print(f"API: Starting batch fetch for {len(symbols)} symbols from {request.start_date} to {request.end_date}")
+        batch = await polygon_service.fetch_and_store_batch(
+            symbols, request.start_date, request.end_date, db,
+            force=request.force, bulk=request.bulk
         )
+        return {"success": True, **batch}
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"API Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/fetch-status/{task_id}")
-async def get_fetch_status(task_id: str):
+async def get_fetch_status(task_id: str, db: Session = Depends(get_db)):
     """Get status of a fetch operation"""
-    if task_id in fetch_status:
-        return fetch_status[task_id]
-    return {"status": "not_found"}
+    status = fetch_jobs.status(db, task_id)
+    if status is None:
+        return {"status": "not_found"}
+    return status
 
 @app.post("/api/generate-template")
 async def generate_template(request: GenerateTemplateRequest, db: Session = Depends(get_db)):
     """Generate analytics template from natural language prompt"""
     try:
-        # Generate template using AI
-        template_data = analytics_agent.generate_template(request.prompt)
-        
-        # Validate the generated code
-        validation = template_executor.validate_template(template_data["code"])
-        if not validation["valid"]:
-            raise HTTPException(status_code=400, detail=validation["error"])
-        
-        # Save template if requested
-        if request.save_template:
-            template = AnalyticsTemplate(
-                name=request.template_name or f"Template_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                description=f"Generated from: {request.prompt[:100]}",
-                prompt=request.prompt,
-                python_code=template_data["code"],
-                output_type=template_data["output_type"]
-            )
-            db.add(template)
-            db.commit()
-            db.refresh(template)
-            
-            return {
-                "success": True,
-                "template_id": template.id,
-                "template_name": template.name,
-                "code": template_data["code"],
-                "output_type": template_data["output_type"]
-            }
+        if settings.prompt_cache_enabled:
+            # Templates saved by any API process become cache entries
+            analytics_agent.prompt_cache.sync(db)
         
-        return {
-            "success": True,
-            "code": template_data["code"],
-            "output_type": template_data["output_type"]
-        }
+        # Generate template using AI (blocking LLM call, kept off the event loop)
+        template_data = await asyncio.to_thread(
+            analytics_agent.generate_template, request.prompt, request.use_cache
+        )
+        return finish_generation(db, request, template_data)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/generate-template/stream")
+async def generate_template_stream(request: GenerateTemplateRequest):
+    """Generate a template as Server-Sent Events: 'token' events carry the LLM's response text as
+    it arrives, then a 'done' event has the /api/generate-template response (or 'error')"""
+    return StreamingResponse(
+        generation_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def generation_events(request: GenerateTemplateRequest):
+    # Sync generator: Starlette iterates it in its threadpool, keeping the LLM stream off the event loop
+    db = SessionLocal()
+    try:
+        if settings.prompt_cache_enabled:
+            analytics_agent.prompt_cache.sync(db)
+        for item in analytics_agent.stream_template(request.prompt, request.use_cache):
+            if isinstance(item, str):
+                yield sse_event("token", {"text": item})
+            else:
+                yield sse_event("done", finish_generation(db, request, item))
+    except HTTPException as e:
+        yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+    except Exception as e:
+        yield sse_event("error", {"status_code": 500, "detail": str(e)})
+    finally:
+        db.close()
+
+def finish_generation(db: Session, request: GenerateTemplateRequest, template_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate generated code and save it if requested; the generate endpoints' response"""
+    validation = template_executor.validate_template(
+        template_data["code"], rewrite=settings.template_lint_rewrite
+    )
+    if not validation["valid"]:
+        analytics_agent.prompt_cache.discard(template_data["prompt"])
+        raise HTTPException(status_code=400, detail=validation["error"])
+    if "code" in validation:
+        template_data = {**template_data, "code": validation["code"]}
+        if template_data["cache"] is None and settings.prompt_cache_enabled:
+            # Later cache hits get the narrowed query too
+            analytics_agent.prompt_cache.add(template_data["prompt"], template_data["code"], template_data["output_type"])
+    
+    response = {
+        "success": True,
+        "code": template_data["code"],
+        "output_type": template_data["output_type"],
+        "cache": template_data["cache"],
+        "warnings": validation["warnings"],
+        "rewritten_columns": validation.get("rewritten_columns")
+    }
+    
+    # Save template if requested
+    if request.save_template:
+        template = AnalyticsTemplate(
+            name=request.template_name or f"Template_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            description=f"Generated from: {request.prompt[:100]}",
+            prompt=request.prompt,
+            python_code=template_data["code"],
+            output_type=template_data["output_type"]
+        )
+        db.add(template)
+        db.commit()
+        db.refresh(template)
+        response.update(template_id=template.id, template_name=template.name)
+    return response
+
+@app.post("/api/validate-template")
+async def validate_template(request: ValidateTemplateRequest):
+    """Safety check plus performance warnings; rewrite=true also narrows SELECT * to the columns used"""
+    return template_executor.validate_template(request.template_code, rewrite=request.rewrite)
+
 @app.post("/api/execute-template")
 async def execute_template(request: ExecuteTemplateRequest, db: Session = Depends(get_db)):
     """Execute a template and return results"""
@@ -177,28 +381,189 @@ async def execute_template(request: ExecuteTemplateRequest, db: Session = Depend
         else:
             raise HTTPException(status_code=400, detail="Either template_id or template_code required")
         
-        # Execute the template
-        result = template_executor.execute_template(
-            code, db, request.symbol, request.start_date, request.end_date
-        )
+        # Serve repeated executions over unchanged data from the cache
+        cached, generation = None, None
+        started = time.perf_counter()
+        if settings.result_cache_enabled:
+            # Off the event loop: the Redis tier can block for its socket timeout
+            cached, generation = await asyncio.to_thread(
+                result_cache.lookup, code, request.symbol, request.start_date, request.end_date
+            )
         
-        if not result["success"]:
-            raise HTTPException(status_code=500, detail=result["error"])
+        if cached is not None:
+            result = {**cached, "cached": True}
+            profile = {"wall_seconds": time.perf_counter() - started}
+        else:
+            # Execute the template in a worker process
+            result = await template_pool.execute(
+                code, request.symbol, request.start_date, request.end_date,
+                execution_id=request.execution_id
+            )
+            profile = result.get("profile") or {}
+            
+            if not result["success"]:
+                record_execution(db, request, code, None, profile, cached=False, success=False)
+                raise HTTPException(status_code=500, detail=result["error"])
+            
+            if settings.result_cache_enabled:
+                # Stored under the generation seen before executing, so a fetch that
+                # invalidated the symbol meanwhile keeps this result out of the cache
+                await asyncio.to_thread(
+                    result_cache.set, code, request.symbol, request.start_date, request.end_date, result, generation
+                )
+            result = {**result, "cached": False}
         
         # Save to query history
-        history = QueryHistory(
-            prompt=f"Execute template for {request.symbol}",
-            template_id=request.template_id,
-            result=result["result"]
-        )
-        db.add(history)
-        db.commit()
+        record_execution(db, request, code, result["result"], profile, cached=result["cached"])
         
         return result
         
+    except HTTPException:
+        raise
+    except TemplatePoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except TemplateTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except TemplateCancelled as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def record_execution(db: Session, request: ExecuteTemplateRequest, code: str, result: Any,
+                     profile: Dict[str, Any], cached: bool, success: bool = True):
+    """QueryHistory row with the execution's profile"""
+    if isinstance(result, dict) and "data_handle" in result:
+        # Stored tables are summarised by their handle, not copied into history
+        result = {key: value for key, value in result.items() if key != "data"}
+    history = QueryHistory(
+        prompt=f"Execute template for {request.symbol}",
+        template_id=request.template_id,
+        result=result,
+        execution_time=profile.get("wall_seconds"),
+        code_hash=code_hash(code),
+        symbol=request.symbol,
+        cached=cached,
+        success=success,
+        db_time=profile.get("db_seconds"),
+        pandas_time=profile.get("pandas_seconds"),
+        chart_time=profile.get("chart_seconds"),
+        serialize_time=profile.get("serialize_seconds"),
+        queries=profile.get("queries"),
+        rows_fetched=profile.get("rows_fetched"),
+        payload_bytes=profile.get("payload_bytes"),
+        peak_memory_bytes=profile.get("peak_memory_bytes")
+    )
+    db.add(history)
+    db.commit()
+
+@app.get("/api/results/{handle_id}")
+async def get_result_page(handle_id: str, offset: int = 0, limit: int = 1000):
+    """One page of a large template result stored server-side"""
+    if offset < 0 or not 0 < limit <= 50000:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 50000")
+    try:
+        info = await asyncio.to_thread(result_store.info, handle_id)
+        rows = await asyncio.to_thread(result_store.page, handle_id, offset, limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return {**info, "offset": offset, "limit": limit, "data": rows}
+
+@app.get("/api/results/{handle_id}/stream")
+async def stream_result(handle_id: str, format: str = "ndjson"):
+    """Whole stored result as NDJSON (streamed a batch at a time) or an Arrow IPC file"""
+    try:
+        path = result_store.path(handle_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    if format == "arrow":
+        return FileResponse(path, media_type=ARROW_MEDIA_TYPE, filename=f"{handle_id}.arrow")
+    if format == "ndjson":
+        # Sync iterator, so Starlette encodes each batch in its threadpool
+        return StreamingResponse(result_store.iter_ndjson(handle_id), media_type="application/x-ndjson")
+    raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'arrow'")
+
+@app.get("/api/charts/{chart_name}")
+async def get_chart(chart_name: str, if_none_match: Optional[str] = Header(None)):
+    """A rendered chart; the id is the image's content hash, so it never changes"""
+    chart_id, _, fmt = chart_name.partition(".")
+    try:
+        path = chart_store.path(chart_id, fmt)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Chart not found or expired")
+    etag = f'"{chart_id}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Chart not found or expired")
+    return FileResponse(path, media_type=CHART_MEDIA_TYPES[fmt], headers=headers)
+
+@app.post("/api/execute-template/{execution_id}/cancel")
+async def cancel_execution(execution_id: str):
+    """Cancel a queued or running template execution"""
+    if not template_pool.cancel(execution_id):
+        raise HTTPException(status_code=404, detail="No running execution with that id")
+    return {"success": True, "execution_id": execution_id}
+
+@app.get("/api/template-workers")
+async def template_workers():
+    """Template worker pool occupancy"""
+    return template_pool.stats()
+
+@app.get("/api/prompt-cache")
+async def prompt_cache_stats():
+    """Template generation cache: entries, exact/similar hits, misses, deduplicated calls"""
+    return analytics_agent.prompt_cache.stats()
+
+@app.get("/api/templates/slowest")
+async def slowest_templates(limit: int = 10, order_by: str = "avg", symbol: Optional[str] = None,
+                            db: Session = Depends(get_db)):
+    """Templates ranked by execution time, with their average profile (cache hits excluded)"""
+    wall = QueryHistory.execution_time
+    order_columns = {"avg": func.avg(wall), "max": func.max(wall), "total": func.sum(wall)}
+    if order_by not in order_columns:
+        raise HTTPException(status_code=400, detail=f"order_by must be one of {', '.join(order_columns)}")
+    
+    query = db.query(
+        QueryHistory.template_id,
+        QueryHistory.code_hash,
+        func.count().label("executions"),
+        func.avg(wall).label("avg_seconds"),
+        func.max(wall).label("max_seconds"),
+        func.sum(wall).label("total_seconds"),
+        func.avg(QueryHistory.db_time).label("avg_db_seconds"),
+        func.avg(QueryHistory.pandas_time).label("avg_pandas_seconds"),
+        func.avg(QueryHistory.chart_time).label("avg_chart_seconds"),
+        func.avg(QueryHistory.serialize_time).label("avg_serialize_seconds"),
+        func.avg(QueryHistory.rows_fetched).label("avg_rows_fetched"),
+        func.avg(QueryHistory.payload_bytes).label("avg_payload_bytes"),
+        func.max(QueryHistory.peak_memory_bytes).label("max_peak_memory_bytes"),
+        func.max(QueryHistory.created_at).label("last_run")
+    ).filter(
+        QueryHistory.cached.is_(False),
+        QueryHistory.success.is_(True),
+        QueryHistory.code_hash.isnot(None)
+    )
+    if symbol:
+        query = query.filter(QueryHistory.symbol == symbol)
+    rows = query.group_by(QueryHistory.template_id, QueryHistory.code_hash).order_by(
+        order_columns[order_by].desc()
+    ).limit(max(1, min(limit, 100))).all()
+    
+    names = dict(db.query(AnalyticsTemplate.id, AnalyticsTemplate.name).filter(
+        AnalyticsTemplate.id.in_([r.template_id for r in rows if r.template_id is not None])
+    ).all())
+    return [
+        {
+            **{key: (float(value) if key.startswith("avg_") and value is not None else value)
+               for key, value in row._asdict().items()},
+            "template_name": names.get(row.template_id)
+        }
+        for row in rows
+    ]
+
 @app.get("/api/templates")
 async def list_templates(db: Session = Depends(get_db)):
     """List all saved templates"""
@@ -265,7 +630,11 @@ async def clear_symbol_data(symbol: str, db: Session = Depends(get_db)):
     """Clear all data for a specific symbol"""
     try:
         deleted = db.query(TickData).filter(TickData.symbol == symbol.upper()).delete()
+        polygon_service.coverage.clear(db, symbol.upper())
+        polygon_service.bars.clear_symbol(db, symbol.upper())
         db.commit()
+        result_cache.invalidate(symbol.upper())
+        tick_cache.clear_symbol(symbol.upper())
         return {"success": True, "deleted_records": deleted}
     except Exception as e:
         db.rollback()
@@ -1,22 +1,37 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON, BigInteger, Index
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Text, JSON, BigInteger, Boolean, Index
 from sqlalchemy.sql import func
 from app.models.database import Base
+from app.config import get_settings
 from datetime import datetime
 
+def _tick_data_indexes():
+    """Secondary indexes for tick_data according to settings.tick_index_mode"""
+    indexes = [Index('idx_symbol_timestamp', 'symbol', 'timestamp')]
+    if get_settings().tick_index_mode == "brin":
+        # Ticks arrive in time order, so a BRIN index is tiny and nearly free to maintain
+        indexes.append(Index('idx_tick_data_timestamp_brin', 'timestamp', postgresql_using='brin'))
+    else:
+        indexes.append(Index('ix_tick_data_symbol', 'symbol'))
+        indexes.append(Index('ix_tick_data_timestamp', 'timestamp'))
+    return tuple(indexes)
+
 class TickData(Base):
     __tablename__ = "tick_data"
     
-    id = Column(BigInteger, primary_key=True, index=True)
-    symbol = Column(String(10), nullable=False, index=True)
-    timestamp = Column(DateTime, nullable=False, index=True)
+    # Range-partitioned on timestamp (optionally sub-partitioned by symbol hash),
+    # so both partition keys are part of the PK; partitions are created by
+    # app.services.tick_partitions. The PK index also serves id lookups.
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    symbol = Column(String(10), primary_key=True, nullable=False)
+    timestamp = Column(DateTime, primary_key=True, nullable=False)
     price = Column(Float, nullable=False)
     size = Column(Integer, nullable=False)
     exchange = Column(String(10))
     conditions = Column(JSON)
     created_at = Column(DateTime, default=func.now())
     
-    __table_args__ = (
-        Index('idx_symbol_timestamp', 'symbol', 'timestamp'),
+    __table_args__ = _tick_data_indexes() + (
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
     )
 
 class AnalyticsTemplate(Base):
@@ -38,5 +53,65 @@ class QueryHistory(Base):
     prompt = Column(Text, nullable=False)
     template_id = Column(Integer)
     result = Column(JSON)
-    execution_time = Column(Float)
-    created_at = Column(DateTime, default=func.now())
\ No newline at end of file
+    execution_time = Column(Float)  # wall seconds in the worker; cache lookup time for cache hits
+    created_at = Column(DateTime, default=func.now())
+    
+    # Execution profile (see app.services.template_profiler); NULL for cache hits
+    code_hash = Column(String(64), index=True)  # groups ad-hoc template_code runs
+    symbol = Column(String(10))
+    cached = Column(Boolean, default=False)
+    success = Column(Boolean, default=True)
+    db_time = Column(Float)
+    pandas_time = Column(Float)
+    chart_time = Column(Float)
+    serialize_time = Column(Float)
+    queries = Column(Integer)
+    rows_fetched = Column(BigInteger)
+    payload_bytes = Column(BigInteger)
+    peak_memory_bytes = Column(BigInteger)
+
+class IngestCoverage(Base):
+    __tablename__ = "ingest_coverage"
+    
+    # One row per symbol per UTC day; [day start, covered_until_ns) is stored
+    symbol = Column(String(10), primary_key=True)
+    day = Column(Date, primary_key=True)
+    covered_until_ns = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class TickBar(Base):
+    __tablename__ = "tick_bars"
+    
+    # OHLCV rollups maintained during ingest; interval is '1s', '1m', '5m', '1h' or '1d'
+    symbol = Column(String(10), primary_key=True)
+    interval = Column(String(4), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(BigInteger, nullable=False)
+    trade_count = Column(Integer, nullable=False)
+    pv_sum = Column(Float, nullable=False)  # sum(price * size), VWAP = pv_sum / volume
+    first_ts = Column(BigInteger, nullable=False)  # ns of the open trade, for order-independent merges
+    last_ts = Column(BigInteger, nullable=False)
+
+class FetchJob(Base):
+    __tablename__ = "fetch_jobs"
+    
+    # Background /api/fetch-data jobs; progress is flushed periodically so
+    # status survives a restart, and unfinished jobs are resumed on startup
+    id = Column(String(32), primary_key=True)
+    symbol = Column(String(10))  # single-symbol jobs
+    symbols = Column(JSON)  # batch jobs (/api/fetch-batch)
+    start_date = Column(String(10), nullable=False)
+    end_date = Column(String(10), nullable=False)
+    force = Column(Boolean, default=False)
+    bulk = Column(Boolean)
+    status = Column(String(20), nullable=False, index=True)  # queued, running, completed, incomplete, failed
+    attempts = Column(Integer, default=0)
+    progress = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -0,0 +1,298 @@
+"""Declarative analytics specs compiled to a single SQL query.
+
+Common analyses (volume, VWAP, OHLC, trade counts per time bucket, grouped
+or filtered) are described as data instead of code:
+
+    {"interval": "1h", "aggregations": ["volume", "trade_count", "avg_price"],
+     "charts": [{"mark": "bar", "y": "volume"}]}
+
+and compiled to one GROUP BY over tick_data, or over tick_bars when the
+range and interval line up with a rolled-up bar interval, so nothing but the
+result rows leaves PostgreSQL. Charts come back as a Vega-Lite spec drawn by
+the frontend. A spec runs as an ordinary template through run_spec
+(spec_template writes the code), so saving, caching and the worker pool are
+unchanged.
+"""
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+
+from pydantic import BaseModel, field_validator, model_validator
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.services.bar_rollups import BAR_INTERVALS, parse_intervals
+from app.services.tick_loader import tick_bounds
+
+BUCKET_ORIGIN = datetime(2000, 1, 1)
+_INTERVAL = re.compile(r"^(\d+)([smhd])$")
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# name: (expression over tick_data, expression over tick_bars or None if bars can't answer it);
+# cumulative_* run over the bucket-ordered window "w"
+AGGREGATIONS = {
+    'volume': ("SUM(size)::bigint", "SUM(volume)::bigint"),
+    'trade_count': ("COUNT(*)", "SUM(trade_count)::bigint"),
+    'vwap': ("SUM(price * size) / NULLIF(SUM(size), 0)", "SUM(pv_sum) / NULLIF(SUM(volume), 0)"),
+    'open': ("(array_agg(price ORDER BY timestamp))[1]", "(array_agg(open ORDER BY bar_time))[1]"),
+    'high': ("MAX(price)", "MAX(high)"),
+    'low': ("MIN(price)", "MIN(low)"),
+    'close': ("(array_agg(price ORDER BY timestamp DESC))[1]", "(array_agg(close ORDER BY bar_time DESC))[1]"),
+    'avg_price': ("AVG(price)", None),
+    'price_std': ("STDDEV_SAMP(price)", None),
+    'cumulative_volume': ("(SUM(SUM(size)) OVER w)::bigint", "(SUM(SUM(volume)) OVER w)::bigint"),
+    'cumulative_vwap': (
+        "SUM(SUM(price * size)) OVER w / NULLIF(SUM(SUM(size)::float8) OVER w, 0)",
+        "SUM(SUM(pv_sum)) OVER w / NULLIF(SUM(SUM(volume)::float8) OVER w, 0)",
+    ),
+}
+# On a totals row a cumulative value is just the range total
+TOTAL_OF = {'cumulative_volume': 'volume', 'cumulative_vwap': 'vwap'}
+
+# name: (expression over tick_data, over tick_bars, bar width in seconds must divide this)
+GROUPS = {
+    'exchange': ("exchange", None, None),
+    'hour': ("EXTRACT(HOUR FROM timestamp)::int", "EXTRACT(HOUR FROM bucket)::int", 3600),
+    'weekday': ("EXTRACT(ISODOW FROM timestamp)::int", "EXTRACT(ISODOW FROM bucket)::int", 86400),
+}
+FILTER_OPS = {'=': '=', '!=': '<>', '>': '>', '>=': '>=', '<': '<', '<=': '<='}
+
+
+def interval_seconds(interval: str) -> int:
+    match = _INTERVAL.match(interval)
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"interval must look like 30s, 5m, 1h or 1d, not {interval!r}")
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+class ChartPanel(BaseModel):
+    mark: Literal['bar', 'line', 'area', 'point'] = 'line'
+    y: str
+
+
+class Filter(BaseModel):
+    column: Literal['price', 'size', 'exchange']
+    op: Literal['=', '!=', '>', '>=', '<', '<=', 'in']
+    value: Union[int, float, str, List[Union[int, float, str]]]
+
+    @model_validator(mode='after')
+    def _coerce_value(self):
+        """Values typed like the column: text for exchange (4 -> '4'), numbers for price and size"""
+        many = isinstance(self.value, list)
+        if many and self.op != 'in':
+            raise ValueError(f"filter op {self.op!r} takes a single value; use 'in' for a list")
+        values = self.value if many else [self.value]
+        if self.column == 'exchange':
+            values = [str(int(v)) if isinstance(v, float) and v.is_integer() else str(v) for v in values]
+        else:
+            try:
+                values = [float(v) if isinstance(v, str) else v for v in values]
+            except ValueError:
+                raise ValueError(f"filter on {self.column} needs numbers, not {self.value!r}")
+        self.value = values if many else values[0]
+        return self
+
+
+class AnalyticsSpec(BaseModel):
+    """One bucketed/grouped aggregation over a symbol's ticks"""
+    source: Literal['auto', 'ticks', 'bars'] = 'auto'
+    interval: Optional[str] = None
+    group_by: List[Literal['exchange', 'hour', 'weekday']] = []
+    aggregations: List[str]
+    filters: List[Filter] = []
+    totals: bool = False  # adds a row aggregated over the whole range
+    charts: List[ChartPanel] = []
+
+    @field_validator('interval')
+    @classmethod
+    def _check_interval(cls, value):
+        if value is not None:
+            interval_seconds(value)
+        return value
+
+    @field_validator('aggregations')
+    @classmethod
+    def _check_aggregations(cls, value):
+        unknown = [name for name in value if name not in AGGREGATIONS]
+        if unknown or not value:
+            raise ValueError(f"aggregations must be a non-empty list of {', '.join(AGGREGATIONS)}")
+        return list(dict.fromkeys(value))
+
+    @model_validator(mode='after')
+    def _check_combination(self):
+        if self.interval is None and any(name.startswith('cumulative_') for name in self.aggregations):
+            raise ValueError("cumulative aggregations need an interval")
+        for panel in self.charts:
+            if panel.y not in self.aggregations:
+                raise ValueError(f"chart y {panel.y!r} is not one of the aggregations")
+        if self.charts and self.interval is None and not self.group_by:
+            raise ValueError("charts need an interval or a group_by")
+        return self
+
+
+def _bar_interval(spec: AnalyticsSpec, start: datetime, end: datetime) -> Optional[str]:
+    """The coarsest rolled-up bar interval that answers spec exactly over [start, end), if any"""
+    if spec.filters or any(AGGREGATIONS[name][1] is None for name in spec.aggregations) \
+            or any(GROUPS[name][1] is None for name in spec.group_by):
+        return None
+    width = interval_seconds(spec.interval) if spec.interval else None
+    edges = [(bound - BUCKET_ORIGIN).total_seconds() for bound in (start, end)]
+    for name in reversed(parse_intervals(get_settings().bar_intervals)):
+        bar = BAR_INTERVALS[name] // 1_000_000_000
+        if width is not None and width % bar:
+            continue
+        if any(GROUPS[group][2] % bar for group in spec.group_by):
+            continue
+        # Bars straddling either end of the range would pull in ticks outside it
+        if any(edge % bar for edge in edges):
+            continue
+        return name
+    return None
+
+
+def compile_spec(spec: AnalyticsSpec, symbol: str, start_date: str,
+                 end_date: str) -> Tuple[str, Dict[str, Any], str]:
+    """(SQL, bind params, 'ticks' or 'bars:<interval>') for spec over a symbol's [start_date, end_date]"""
+    start, end = tick_bounds(start_date, end_date)
+    bar_interval = None if spec.source == 'ticks' else _bar_interval(spec, start, end)
+    if spec.source == 'bars' and bar_interval is None:
+        raise ValueError("This spec can't be answered from tick_bars (filters, exchange, avg_price/price_std, "
+                         "or an interval/range not aligned to a rolled-up bar interval)")
+    bars = bar_interval is not None
+    params: Dict[str, Any] = {'symbol': symbol.upper(), 'start': start, 'end': end}
+
+    # Keys are computed in a subquery so GROUPING() and the window can refer to them by name
+    if bars:
+        inner = ["bucket AS bar_time", "open", "high", "low", "close", "volume", "trade_count", "pv_sum"]
+        source = "tick_bars WHERE symbol = :symbol AND interval = :bar_interval AND bucket >= :start AND bucket < :end"
+        params['bar_interval'] = bar_interval
+        time_column = "bucket"
+    else:
+        inner = ["timestamp", "price", "size"]
+        source = "tick_data WHERE symbol = :symbol AND timestamp >= :start AND timestamp < :end"
+        time_column = "timestamp"
+    for i, condition in enumerate(spec.filters):
+        if condition.op == 'in':
+            values = condition.value if isinstance(condition.value, list) else [condition.value]
+            source += f" AND {condition.column} = ANY(:filter_{i})"
+            params[f'filter_{i}'] = values
+        else:
+            source += f" AND {condition.column} {FILTER_OPS[condition.op]} :filter_{i}"
+            params[f'filter_{i}'] = condition.value
+
+    keys = []
+    if spec.interval:
+        inner.append(f"date_bin(CAST(:width AS interval), {time_column}, TIMESTAMP '2000-01-01') AS bucket")
+        params['width'] = f"{interval_seconds(spec.interval)} seconds"
+        keys.append("bucket")
+    for group in spec.group_by:
+        inner.append(f"{GROUPS[group][1 if bars else 0]} AS {group}")
+        keys.append(group)
+
+    total_row = spec.totals and bool(keys)
+    select = list(keys)
+    for name in spec.aggregations:
+        expression = AGGREGATIONS[name][1 if bars else 0]
+        if total_row and name in TOTAL_OF:
+            total = AGGREGATIONS[TOTAL_OF[name]][1 if bars else 0]
+            expression = f"CASE WHEN GROUPING({', '.join(keys)}) > 0 THEN {total} ELSE {expression} END"
+        select.append(f"{expression} AS {name}")
+    if total_row:
+        select.append(f"GROUPING({', '.join(keys)}) > 0 AS is_total")
+
+    sql = f"SELECT {', '.join(select)} FROM (SELECT {', '.join(inner)} FROM {source}) AS t"
+    if keys:
+        group_keys = ", ".join(keys)
+        sql += f" GROUP BY GROUPING SETS (({group_keys}), ())" if total_row else f" GROUP BY {group_keys}"
+    if any(name.startswith('cumulative_') for name in spec.aggregations):
+        partition = ", ".join(spec.group_by)
+        sql += f" WINDOW w AS ({f'PARTITION BY {partition} ' if partition else ''}ORDER BY bucket)"
+    if keys:
+        sql += f" ORDER BY {', '.join(keys)}"
+    return sql, params, f"bars:{bar_interval}" if bars else "ticks"
+
+
+def vega_lite_chart(spec: AnalyticsSpec, rows: List[Dict[str, Any]], symbol: str) -> Dict[str, Any]:
+    """One Vega-Lite panel per chart entry, stacked, over the result rows"""
+    if spec.interval:
+        x = {"field": "bucket", "type": "temporal", "title": "Time"}
+    else:
+        x = {"field": spec.group_by[0], "type": "ordinal", "title": spec.group_by[0].title()}
+    color = {"color": {"field": spec.group_by[0], "type": "nominal"}} if spec.interval and spec.group_by else {}
+    panels = [{
+        "title": f"{symbol} - {panel.y.replace('_', ' ').title()}",
+        "mark": {"type": panel.mark, "tooltip": True},
+        "encoding": {"x": x, "y": {"field": panel.y, "type": "quantitative"}, **color},
+        "width": "container",
+    } for panel in spec.charts]
+    chart = {"$schema": "https://vega.github.io/schema/vega-lite/v5.json", "data": {"values": rows}}
+    if len(panels) == 1:
+        chart.update(panels[0])
+    else:
+        chart["vconcat"] = panels
+    return {"format": "vega-lite", "spec": chart}
+
+
+def run_spec(db_session, symbol: str, start_date: str, end_date: str,
+             spec: Union[AnalyticsSpec, Dict[str, Any]]) -> Dict[str, Any]:
+    """Template helper: run an analytics spec and return a template-shaped result.
+
+    'data' holds the result rows, 'totals' the whole-range row (with
+    totals), 'chart' a Vega-Lite spec (with charts) and 'source' the table
+    that answered it.
+    """
+    if not isinstance(spec, AnalyticsSpec):
+        spec = AnalyticsSpec.model_validate(spec)
+    sql, params, source = compile_spec(spec, symbol, start_date, end_date)
+    result = db_session.execute(text(sql), params)
+    columns = list(result.keys())
+    rows = [dict(zip(columns, row)) for row in result.fetchall()]
+
+    totals = None
+    if spec.totals:
+        if 'is_total' in columns:
+            totals = next((row for row in rows if row['is_total']), None)
+            rows = [row for row in rows if not row['is_total']]
+            for row in rows + ([totals] if totals else []):
+                del row['is_total']
+            if totals is not None:
+                totals = {name: totals[name] for name in spec.aggregations}
+        else:
+            totals = rows[0] if rows else None
+
+    output = {'type': 'both' if spec.charts else 'table', 'data': rows, 'source': source}
+    if spec.totals:
+        output['totals'] = totals
+    if spec.charts:
+        output['chart'] = vega_lite_chart(spec, rows, symbol.upper())
+    return output
+
+
+def parse_spec(response: str) -> Optional[AnalyticsSpec]:
+    """An analytics spec from an LLM response (bare or ```json fenced JSON), or None if it isn't one"""
+    match = re.search(r"```(?:json)?\s*\n(.*?)\n```", response, re.DOTALL)
+    body = (match.group(1) if match else response).strip()
+    if not body.startswith("{"):
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or 'aggregations' not in data:
+        return None
+    return AnalyticsSpec.model_validate(data)
+
+
+def spec_template(spec: Union[AnalyticsSpec, Dict[str, Any]]) -> str:
+    """Template code that runs spec; saved, cached and executed like any other template"""
+    if not isinstance(spec, AnalyticsSpec):
+        spec = AnalyticsSpec.model_validate(spec)
+    fields = spec.model_dump(exclude_defaults=True)
+    literal = "{\n" + ",\n".join(f"    {key!r}: {value!r}" for key, value in fields.items()) + "\n}"
+    return (
+        f"SPEC = {literal}\n\n\n"
+        "def analyze_data(db_session, symbol, start_date, end_date):\n"
+        "    # Declarative spec, run as one SQL query by the built-in run_spec helper\n"
+        "    return run_spec(db_session, symbol, start_date, end_date, SPEC)\n"
+    )
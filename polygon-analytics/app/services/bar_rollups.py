@@ -0,0 +1,231 @@
+"""OHLCV bar rollups (tick_bars) maintained incrementally during ingest.
+
+Rebuild bars for data ingested before rollups existed:
+    python -m app.services.bar_rollups rebuild AAPL 2024-01-02 2024-01-31
+"""
+import argparse
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.coverage_ledger import ns_to_naive_utc
+from app.services.tick_loader import tick_bounds
+
+BAR_INTERVALS = {
+    '1s': 1_000_000_000,
+    '1m': 60 * 1_000_000_000,
+    '5m': 300 * 1_000_000_000,
+    '1h': 3_600 * 1_000_000_000,
+    '1d': 86_400 * 1_000_000_000,
+}
+
+# Bars arrive from several writers in any order, so open/close are resolved
+# by the trade timestamps rather than by arrival
+UPSERT_SQL = """
+    INSERT INTO tick_bars (symbol, interval, bucket, open, high, low, close,
+                           volume, trade_count, pv_sum, first_ts, last_ts)
+    VALUES %s
+    ON CONFLICT (symbol, interval, bucket) DO UPDATE SET
+        open = CASE WHEN EXCLUDED.first_ts < tick_bars.first_ts THEN EXCLUDED.open ELSE tick_bars.open END,
+        close = CASE WHEN EXCLUDED.last_ts >= tick_bars.last_ts THEN EXCLUDED.close ELSE tick_bars.close END,
+        high = GREATEST(tick_bars.high, EXCLUDED.high),
+        low = LEAST(tick_bars.low, EXCLUDED.low),
+        volume = tick_bars.volume + EXCLUDED.volume,
+        trade_count = tick_bars.trade_count + EXCLUDED.trade_count,
+        pv_sum = tick_bars.pv_sum + EXCLUDED.pv_sum,
+        first_ts = LEAST(tick_bars.first_ts, EXCLUDED.first_ts),
+        last_ts = GREATEST(tick_bars.last_ts, EXCLUDED.last_ts)
+"""
+UPSERT_TEMPLATE = "(%s, %s, to_timestamp(%s) AT TIME ZONE 'UTC', %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+
+REBUILD_SQL = """
+    INSERT INTO tick_bars (symbol, interval, bucket, open, high, low, close,
+                           volume, trade_count, pv_sum, first_ts, last_ts)
+    SELECT
+        symbol,
+        :interval,
+        date_bin(CAST(:width AS interval), timestamp, TIMESTAMP '2000-01-01') AS bucket,
+        (array_agg(price ORDER BY timestamp))[1],
+        MAX(price),
+        MIN(price),
+        (array_agg(price ORDER BY timestamp DESC))[1],
+        SUM(size),
+        COUNT(*),
+        SUM(price * size),
+        CAST(EXTRACT(EPOCH FROM MIN(timestamp)) * 1000000 AS BIGINT) * 1000,
+        CAST(EXTRACT(EPOCH FROM MAX(timestamp)) * 1000000 AS BIGINT) * 1000
+    FROM tick_data
+    WHERE symbol = :symbol AND timestamp >= :start AND timestamp < :end
+    GROUP BY symbol, bucket
+    ON CONFLICT (symbol, interval, bucket) DO UPDATE SET
+        open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close,
+        volume = EXCLUDED.volume, trade_count = EXCLUDED.trade_count, pv_sum = EXCLUDED.pv_sum,
+        first_ts = EXCLUDED.first_ts, last_ts = EXCLUDED.last_ts
+"""
+
+
+def parse_intervals(spec: str) -> List[str]:
+    """'1s,1m,1h' -> ['1s', '1m', '1h'] in BAR_INTERVALS order"""
+    wanted = {part.strip() for part in spec.split(",") if part.strip()}
+    unknown = wanted - set(BAR_INTERVALS)
+    if unknown:
+        raise ValueError(f"Unknown bar interval(s): {', '.join(sorted(unknown))}")
+    return [name for name in BAR_INTERVALS if name in wanted]
+
+
+def compute_bars(cols: Dict[str, np.ndarray], intervals: List[str]) -> List[Tuple]:
+    """Aggregate a batch of trade columns into upsert rows for every interval"""
+    if len(cols['timestamp_ns']) == 0:
+        return []
+
+    order = np.argsort(cols['timestamp_ns'], kind='stable')
+    ts = cols['timestamp_ns'][order]
+    price = cols['price'][order]
+    size = cols['size'][order].astype(np.int64)
+    pv = price * size
+
+    rows = []
+    for name in intervals:
+        width = BAR_INTERVALS[name]
+        buckets = ts // width * width
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+        rows.extend(zip(
+            [name] * len(starts),
+            (buckets[starts] // 1_000_000_000).tolist(),
+            price[starts].tolist(),
+            np.maximum.reduceat(price, starts).tolist(),
+            np.minimum.reduceat(price, starts).tolist(),
+            price[ends].tolist(),
+            np.add.reduceat(size, starts).tolist(),
+            (ends - starts + 1).tolist(),
+            np.add.reduceat(pv, starts).tolist(),
+            ts[starts].tolist(),
+            ts[ends].tolist(),
+        ))
+    return rows
+
+
+def upsert_bars(cur, symbol: str, cols: Dict[str, np.ndarray], intervals: List[str]) -> int:
+    """Merge a batch into tick_bars on the writer's cursor (same transaction as its COPY)"""
+    rows = compute_bars(cols, intervals)
+    if rows:
+        # Rows are in (interval, bucket) order, so concurrent writers lock
+        # shared bars in the same order and cannot deadlock
+        execute_values(cur, UPSERT_SQL, [(symbol,) + row for row in rows],
+                       template=UPSERT_TEMPLATE, page_size=5000)
+    return len(rows)
+
+
+class BarRollups:
+    """Keeps tick_bars consistent when tick ranges are deleted and refetched"""
+
+    def __init__(self, intervals: List[str]):
+        self.intervals = intervals
+
+    def clear_ranges(self, db: Session, symbol: str, ranges: List[Tuple[int, int]]):
+        """Drop every bar overlapping the ranges about to be refetched"""
+        for lo, hi in ranges:
+            for name in self.intervals:
+                width = BAR_INTERVALS[name]
+                db.execute(text("""
+                    DELETE FROM tick_bars
+                    WHERE symbol = :symbol AND interval = :interval
+                    AND bucket >= :start AND bucket < :end
+                """), {
+                    "symbol": symbol,
+                    "interval": name,
+                    "start": ns_to_naive_utc(lo // width * width),
+                    "end": ns_to_naive_utc(hi)
+                })
+
+    def rebuild_boundaries(self, db: Session, symbol: str, ranges: List[Tuple[int, int]]):
+        """Recompute bars straddling a range edge from tick_data.
+
+        Those buckets also hold ticks outside the refetched range, which the
+        writers never saw, so incremental merging alone would undercount them.
+        """
+        for lo, hi in ranges:
+            for name in self.intervals:
+                width = BAR_INTERVALS[name]
+                for edge in (lo, hi):
+                    if edge % width:
+                        bucket = edge // width * width
+                        self.rebuild(db, symbol, bucket, bucket + width, [name])
+        db.commit()
+
+    def rebuild(self, db: Session, symbol: str, lo: int, hi: int, intervals: List[str] = None):
+        """Recompute bars for [lo, hi) nanoseconds straight from tick_data"""
+        for name in intervals or self.intervals:
+            db.execute(text(REBUILD_SQL), {
+                "interval": name,
+                "width": f"{BAR_INTERVALS[name] // 1_000_000_000} seconds",
+                "symbol": symbol,
+                "start": ns_to_naive_utc(lo),
+                "end": ns_to_naive_utc(hi)
+            })
+
+    def clear_symbol(self, db: Session, symbol: str):
+        db.execute(text("DELETE FROM tick_bars WHERE symbol = :symbol"), {"symbol": symbol})
+
+
+def load_bars(db_session, symbol: str, start_date: str, end_date: str, interval: str = '1m') -> pd.DataFrame:
+    """Template helper: OHLCV bars for a symbol/range instead of raw ticks.
+
+    Returns columns bucket, open, high, low, close, volume, trade_count, vwap
+    for buckets starting in the same [start, end) range load_ticks reads, so a
+    bare end date includes that whole day.
+    """
+    if interval not in BAR_INTERVALS:
+        raise ValueError(f"interval must be one of {', '.join(BAR_INTERVALS)}")
+    start, end = tick_bounds(start_date, end_date)
+    result = db_session.execute(text("""
+        SELECT bucket, open, high, low, close, volume, trade_count,
+               pv_sum / NULLIF(volume, 0) AS vwap
+        FROM tick_bars
+        WHERE symbol = :symbol AND interval = :interval
+            AND bucket >= :start AND bucket < :end
+        ORDER BY bucket
+    """), {"symbol": symbol, "interval": interval, "start": start, "end": end})
+    return pd.DataFrame(
+        result.fetchall(),
+        columns=['bucket', 'open', 'high', 'low', 'close', 'volume', 'trade_count', 'vwap']
+    )
+
+
+def main():
+    from datetime import datetime, timezone
+
+    from app.config import get_settings
+    from app.models.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild tick_bars from tick_data")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild")
+    rebuild.add_argument("symbol")
+    rebuild.add_argument("start_date")
+    rebuild.add_argument("end_date")
+    args = parser.parse_args()
+
+    def day_ns(date_str):
+        dt = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        return int(dt.timestamp()) * 1_000_000_000
+
+    rollups = BarRollups(parse_intervals(get_settings().bar_intervals))
+    lo, hi = day_ns(args.start_date), day_ns(args.end_date) + BAR_INTERVALS['1d']
+    db = SessionLocal()
+    try:
+        rollups.clear_ranges(db, args.symbol, [(lo, hi)])
+        rollups.rebuild(db, args.symbol, lo, hi)
+        db.commit()
+        print(f"Rebuilt {', '.join(rollups.intervals)} bars for {args.symbol}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Rendered chart artifacts, stored by content hash and served by URL.
+
+Template workers render figures (matplotlib to PNG/SVG) into the store;
+results carry a small reference instead of inline base64. Identical images
+share one file, and since the id is the hash of the bytes it doubles as a
+strong ETag. Plotly figures are returned as their JSON spec for the
+frontend to draw instead.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import time
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+CHART_ID = re.compile(r"^[0-9a-f]{64}$")
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class ChartStore:
+    """PNG/SVG files named by the SHA-256 of their bytes"""
+
+    def __init__(self, directory: str, ttl_seconds: int = 7 * 86400):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self._last_purge = 0.0
+
+    def path(self, chart_id: str, fmt: str) -> str:
+        if not CHART_ID.match(chart_id) or fmt not in MEDIA_TYPES:
+            raise KeyError(chart_id)
+        return os.path.join(self.directory, f"{chart_id}.{fmt}")
+
+    def put(self, data: bytes, fmt: str = "png") -> Dict[str, Any]:
+        """Store image bytes (no-op if already stored) and return the chart reference"""
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported chart format: {fmt} (use {' or '.join(MEDIA_TYPES)})")
+        chart_id = hashlib.sha256(data).hexdigest()
+        path = self.path(chart_id, fmt)
+        if os.path.exists(path):
+            os.utime(path)  # keeps a reused chart from expiring
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            self._maybe_purge()
+            tmp_path = f"{path}.tmp.{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return {
+            "chart_id": chart_id,
+            "format": fmt,
+            "url": f"/api/charts/{chart_id}.{fmt}",
+            "bytes": len(data),
+        }
+
+    def put_base64(self, encoded: str) -> Optional[Dict[str, Any]]:
+        """Store a legacy inline base64 PNG; None if the string isn't one"""
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            return None
+        if not data.startswith(PNG_SIGNATURE):
+            return None
+        return self.put(data, "png")
+
+    def _maybe_purge(self):
+        # At most every few minutes; several worker processes share the directory
+        if time.time() - self._last_purge > 300:
+            self._last_purge = time.time()
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+def render_figure(fig, fmt: str = "png", dpi: Optional[int] = None) -> bytes:
+    """A matplotlib figure's image bytes"""
+    import matplotlib
+
+    buffer = BytesIO()
+    # No timestamp and fixed SVG element ids, so the same figure always hashes the same
+    with matplotlib.rc_context({"svg.hashsalt": "chart-store"}):
+        fig.savefig(buffer, format=fmt, bbox_inches="tight", dpi=dpi,
+                    metadata={"Date": None} if fmt == "svg" else None)
+    return buffer.getvalue()
+
+
+def is_plotly_figure(fig) -> bool:
+    return callable(getattr(fig, "to_plotly_json", None))
@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import IngestCoverage
+
+NS_PER_DAY = 86_400 * 1_000_000_000
+
+
+def day_start_ns(day: date) -> int:
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()) * 1_000_000_000
+
+
+def ns_to_naive_utc(ns: int) -> datetime:
+    """Nanosecond timestamp as the naive UTC datetime stored in tick_data"""
+    return datetime(1970, 1, 1) + timedelta(microseconds=ns // 1000)
+
+
+class CoverageLedger:
+    """Per symbol/day record of which part of each UTC day is already stored.
+
+    A day is fully covered once ``covered_until_ns`` reaches the next
+    midnight; otherwise only its tail ``[covered_until_ns, day end)`` is
+    missing. Ranges newer than ``settle_seconds`` are never marked covered
+    because Polygon may still be publishing trades for them.
+    """
+
+    def __init__(self, settle_seconds: int = 900):
+        self.settle_seconds = settle_seconds
+
+    def _settled_ns(self) -> int:
+        return (int(datetime.now(timezone.utc).timestamp()) - self.settle_seconds) * 1_000_000_000
+
+    def _days(self, start_date: str, end_date: str) -> List[date]:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    def missing_ranges(self, db: Session, symbol: str, start_date: str, end_date: str) -> List[Tuple[int, int]]:
+        """Half-open nanosecond ranges in [start_date, end_date] not yet stored, merged"""
+        days = self._days(start_date, end_date)
+        covered = dict(db.query(IngestCoverage.day, IngestCoverage.covered_until_ns).filter(
+            IngestCoverage.symbol == symbol,
+            IngestCoverage.day.between(days[0], days[-1])
+        ).all())
+        settled = self._settled_ns()
+
+        ranges = []
+        for day in days:
+            lo = max(day_start_ns(day), covered.get(day, 0))
+            hi = min(day_start_ns(day) + NS_PER_DAY, settled)
+            if lo >= hi:
+                continue
+            if ranges and ranges[-1][1] == lo:
+                ranges[-1] = (ranges[-1][0], hi)
+            else:
+                ranges.append((lo, hi))
+        return ranges
+
+    def mark_covered(self, db: Session, symbol: str, ranges: List[Tuple[int, int]]):
+        """Advance coverage for every day touched by the fetched ranges"""
+        settled = self._settled_ns()
+        rows = []
+        for lo, hi in ranges:
+            hi = min(hi, settled)
+            day_lo = lo - lo % NS_PER_DAY
+            for day_ns in range(day_lo, hi, NS_PER_DAY):
+                rows.append({
+                    "symbol": symbol,
+                    "day": ns_to_naive_utc(day_ns).date(),
+                    "covered_until_ns": min(hi, day_ns + NS_PER_DAY)
+                })
+        if not rows:
+            return
+
+        stmt = insert(IngestCoverage).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IngestCoverage.symbol, IngestCoverage.day],
+            set_={
+                "covered_until_ns": text(
+                    "GREATEST(ingest_coverage.covered_until_ns, excluded.covered_until_ns)"
+                ),
+                "updated_at": text("now()")
+            }
+        )
+        db.execute(stmt)
+        db.commit()
+
+    def clear(self, db: Session, symbol: str):
+        db.query(IngestCoverage).filter(IngestCoverage.symbol == symbol).delete()
+
+    def clear_ranges(self, db: Session, symbol: str, ranges: List[Tuple[int, int]]):
+        """Roll coverage back over ranges whose rows are being deleted; commits with the caller's DELETE"""
+        for lo, hi in ranges:
+            first = ns_to_naive_utc(lo).date()
+            last = ns_to_naive_utc(hi - 1).date()
+            rows = db.query(IngestCoverage).filter(IngestCoverage.symbol == symbol)
+            # Days starting inside the range lose all their coverage, the one it starts in keeps what precedes lo
+            partial = day_start_ns(first) < lo
+            rows.filter(
+                IngestCoverage.day.between(first + timedelta(days=1) if partial else first, last)
+            ).delete(synchronize_session=False)
+            if partial:
+                rows.filter(IngestCoverage.day == first, IngestCoverage.covered_until_ns > lo).update(
+                    {"covered_until_ns": lo}, synchronize_session=False
+                )
@@ -0,0 +1,325 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.database import SessionLocal, engine
+from app.models.models import FetchJob
+from app.services.ingest_metrics import observe_job
+
+# Jobs in these states were cut off by a restart and are resumed on startup
+UNFINISHED = ("queued", "running")
+
+
+class FetchProgress:
+    """Live counters for one fetch, updated by the scheduler and writer threads"""
+
+    def __init__(self, rate_window_seconds: float = 10.0):
+        self.phase = "fetching"
+        self.pages = 0
+        self.bytes_received = 0
+        self.rows_written = 0
+        self.span_ns = 0
+        self.span_done_ns = 0
+        self.dropped_pages = []
+        self.stage_seconds: Dict[str, float] = {}
+        self.http_statuses: Dict[str, int] = {}
+        self.started = time.time()
+        self.rate_window_seconds = rate_window_seconds
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    def add_page(self, nbytes: int):
+        with self._lock:
+            self.pages += 1
+            self.bytes_received += nbytes
+
+    def add_dropped(self, page: Dict[str, Any]):
+        with self._lock:
+            self.dropped_pages.append(page)
+
+    def add_stage(self, stage: str, seconds: float):
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def add_status(self, status: str):
+        with self._lock:
+            self.http_statuses[status] = self.http_statuses.get(status, 0) + 1
+
+    def add_rows(self, rows: int):
+        with self._lock:
+            self.rows_written += rows
+
+    def set_span(self, span_ns: int):
+        self.span_ns = span_ns
+
+    def add_span_done(self, span_ns: int):
+        with self._lock:
+            self.span_done_ns += span_ns
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            rows, nbytes, done = self.rows_written, self.bytes_received, self.span_done_ns
+            stage_seconds = {stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items()}
+            http_statuses = dict(self.http_statuses)
+            # Current throughput over a sliding window rather than since start
+            self._samples.append((now, rows, nbytes))
+            while len(self._samples) > 2 and now - self._samples[0][0] > self.rate_window_seconds:
+                self._samples.popleft()
+            first = self._samples[0]
+
+        elapsed = now - self.started
+        window = now - first[0]
+        fraction = done / self.span_ns if self.span_ns else 0.0
+        eta = None
+        if self.phase == "fetching" and fraction > 0:
+            eta = elapsed * (1 - fraction) / fraction
+
+        return {
+            "phase": self.phase,
+            "pages_fetched": self.pages,
+            "rows_written": rows,
+            "bytes_received": nbytes,
+            "fraction_done": round(fraction, 4),
+            "elapsed_seconds": round(elapsed, 1),
+            "rows_per_second": round((rows - first[1]) / window) if window > 0 else 0,
+            "bytes_per_second": round((nbytes - first[2]) / window) if window > 0 else 0,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "stage_seconds": stage_seconds,
+            "http_statuses": http_statuses,
+        }
+
+
+def combined_snapshot(progress: Dict[str, FetchProgress]) -> Dict[str, Any]:
+    """Batch-wide totals plus each symbol's own snapshot"""
+    per_symbol = {symbol: p.snapshot() for symbol, p in progress.items()}
+    span = sum(p.span_ns for p in progress.values())
+    fraction = sum(p.span_done_ns for p in progress.values()) / span if span else 0.0
+    elapsed = max((s["elapsed_seconds"] for s in per_symbol.values()), default=0.0)
+    fetching = any(s["phase"] == "fetching" for s in per_symbol.values())
+    phases = {s["phase"] for s in per_symbol.values()}
+    eta = elapsed * (1 - fraction) / fraction if fetching and fraction > 0 else None
+
+    snapshot = {
+        "phase": "fetching" if fetching else ("merging" if "merging" in phases else "done"),
+        "fraction_done": round(fraction, 4),
+        "elapsed_seconds": elapsed,
+        "eta_seconds": round(eta, 1) if eta is not None else None,
+        "symbols_done": sum(1 for s in per_symbol.values() if s["phase"] == "done"),
+        "symbols": per_symbol,
+    }
+    for key in ("pages_fetched", "rows_written", "bytes_received", "rows_per_second", "bytes_per_second"):
+        snapshot[key] = sum(s[key] for s in per_symbol.values())
+    for key in ("stage_seconds", "http_statuses"):
+        totals = {}
+        for s in per_symbol.values():
+            for name, value in s[key].items():
+                totals[name] = totals.get(name, 0) + value
+        snapshot[key] = totals
+    return snapshot
+
+
+class JobClaim:
+    """PostgreSQL session advisory locks on one dedicated connection.
+
+    Shared by every API worker process, unlike asyncio locks, and released
+    by the server if the process holding them dies.
+    """
+
+    def __init__(self, poll_seconds: float = 0.5):
+        self.poll_seconds = poll_seconds
+        self.connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+    def try_lock(self, key: str) -> bool:
+        return bool(self.connection.execute(
+            text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": key}
+        ).scalar())
+
+    async def lock(self, key: str):
+        while not self.try_lock(key):
+            await asyncio.sleep(self.poll_seconds)
+
+    def release(self):
+        # Session-level locks outlive close() on a pooled connection, so drop them first
+        try:
+            self.connection.execute(text("SELECT pg_advisory_unlock_all()"))
+        finally:
+            self.connection.close()
+
+
+class FetchJobManager:
+    """Runs /api/fetch-data requests as background jobs.
+
+    Job rows in fetch_jobs hold the request, status and the last progress
+    snapshot. Jobs left queued or running by a restart are resubmitted on
+    startup; the coverage ledger makes the rerun fetch only what the
+    interrupted attempt didn't finish. A job runs only in the worker that
+    claims it (see JobClaim), so several API workers resuming on startup
+    don't run it twice, and jobs for the same symbol run one at a time
+    across workers since each one clears and rewrites its ranges.
+    """
+
+    def __init__(self, polygon_service, persist_seconds: float = 2.0):
+        self.polygon_service = polygon_service
+        self.persist_seconds = persist_seconds
+        self._live: Dict[str, FetchProgress] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, db: Session, symbol: str, start_date: str, end_date: str,
+               force: bool = False, bulk: Optional[bool] = None) -> str:
+        job = FetchJob(
+            id=uuid.uuid4().hex,
+            symbol=symbol,
+            start_date=start_date,
+            end_date=end_date,
+            force=force,
+            bulk=bulk,
+            status="queued"
+        )
+        db.add(job)
+        db.commit()
+        self._start(job.id)
+        return job.id
+
+    def submit_batch(self, db: Session, symbols: List[str], start_date: str, end_date: str,
+                     force: bool = False, bulk: Optional[bool] = None) -> str:
+        job = FetchJob(
+            id=uuid.uuid4().hex,
+            symbols=symbols,
+            start_date=start_date,
+            end_date=end_date,
+            force=force,
+            bulk=bulk,
+            status="queued"
+        )
+        db.add(job)
+        db.commit()
+        self._start(job.id)
+        return job.id
+
+    def resume_unfinished(self) -> int:
+        db = SessionLocal()
+        try:
+            job_ids = [j.id for j in db.query(FetchJob).filter(FetchJob.status.in_(UNFINISHED)).all()]
+        finally:
+            db.close()
+        for job_id in job_ids:
+            print(f"Resuming interrupted fetch job {job_id}")
+            self._start(job_id)
+        return len(job_ids)
+
+    def _start(self, job_id: str):
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def _run(self, job_id: str):
+        claim = JobClaim()
+        if not claim.try_lock(f"fetch_job:{job_id}"):
+            # Another worker is running it
+            claim.release()
+            self._tasks.pop(job_id, None)
+            return
+        db = SessionLocal()
+        progress: Dict[str, FetchProgress] = {}
+        flusher = None
+        try:
+            job = db.get(FetchJob, job_id)
+            if job is None or job.status not in UNFINISHED:
+                # Finished by another worker between our query and the claim
+                return
+            symbols = job.symbols or [job.symbol]
+            progress.update({symbol: FetchProgress() for symbol in symbols})
+            # Sorted, so overlapping batches can't deadlock on each other
+            for symbol in sorted(symbols):
+                await claim.lock(f"fetch_symbol:{symbol}")
+            job.status = "running"
+            job.attempts = (job.attempts or 0) + 1
+            db.commit()
+
+            for p in progress.values():
+                p.started = time.time()
+            self._live[job_id] = progress
+            flusher = asyncio.create_task(self._flush_progress(job_id, progress))
+            batch = await self.polygon_service.fetch_and_store_batch(
+                symbols, job.start_date, job.end_date, db,
+                force=job.force,
+                bulk=job.bulk,
+                progress=progress
+            )
+            for p in progress.values():
+                p.phase = "done"
+
+            job.status = "completed" if batch["complete"] else "incomplete"
+            job.result = batch if job.symbols else batch["symbols"][job.symbol]
+            job.progress = self._snapshot(job, progress)
+            db.commit()
+            observe_job(job.status, batch["records"], batch.get("elapsed_seconds"))
+        except Exception as e:
+            print(f"Fetch job {job_id} failed: {e}")
+            db.rollback()
+            self._finish_failed(db, job_id, progress, f"{type(e).__name__}: {e}")
+            observe_job("failed", 0, None)
+        finally:
+            if flusher is not None:
+                flusher.cancel()
+            self._live.pop(job_id, None)
+            self._tasks.pop(job_id, None)
+            db.close()
+            claim.release()
+
+    @staticmethod
+    def _snapshot(job: FetchJob, progress: Dict[str, FetchProgress]) -> Optional[Dict[str, Any]]:
+        if not progress:
+            return None
+        if job.symbols:
+            return combined_snapshot(progress)
+        return progress[job.symbol].snapshot()
+
+    def _finish_failed(self, db: Session, job_id: str, progress: Dict[str, FetchProgress], error: str):
+        job = db.get(FetchJob, job_id)
+        if job is not None:
+            job.status = "failed"
+            job.error = error
+            job.progress = self._snapshot(job, progress)
+            db.commit()
+
+    async def _flush_progress(self, job_id: str, progress: Dict[str, FetchProgress]):
+        """Persist the live snapshot periodically, on a session of its own"""
+        while True:
+            await asyncio.sleep(self.persist_seconds)
+            db = SessionLocal()
+            try:
+                job = db.get(FetchJob, job_id)
+                job.progress = self._snapshot(job, progress)
+                db.commit()
+            except Exception as e:
+                # A lost connection or serialization failure skips one update, not the rest of the job's
+                print(f"Fetch job {job_id} progress flush failed: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
+    def status(self, db: Session, job_id: str) -> Optional[Dict[str, Any]]:
+        job = db.get(FetchJob, job_id)
+        if job is None:
+            return None
+        live = self._live.get(job_id)
+        return {
+            "task_id": job.id,
+            "status": job.status,
+            "symbol": job.symbol,
+            "symbols": job.symbols,
+            "start_date": job.start_date,
+            "end_date": job.end_date,
+            "attempts": job.attempts,
+            "progress": self._snapshot(job, live) if live is not None else job.progress,
+            "result": job.result,
+            "error": job.error,
+            "created_at": job.created_at,
+            "updated_at": job.updated_at,
+        }
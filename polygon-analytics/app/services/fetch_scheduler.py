@@ -0,0 +1,181 @@
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from app.services.ingest_metrics import CONCURRENCY_LIMIT, observe_request
+
+# Status codes that mean "back off and try again" rather than "this page is bad"
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limiter for in-flight HTTP requests.
+
+    The limit grows by one after a full window of healthy responses and is
+    halved whenever Polygon signals overload (429/5xx, timeouts) or latency
+    drifts well above the observed baseline.
+    """
+
+    def __init__(self, initial_limit: int = 16, min_limit: int = 1, max_limit: int = 500,
+                 latency_tolerance: float = 2.0, decrease_factor: float = 0.5):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.baseline_latency = None
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            while self.in_flight >= int(self.limit):
+                await self._condition.wait()
+            self.in_flight += 1
+
+    async def release(self, latency: float, overloaded: bool):
+        async with self._condition:
+            self.in_flight -= 1
+            if overloaded or self._is_slow(latency):
+                self._decrease()
+            else:
+                self._increase(latency)
+            self._condition.notify_all()
+
+    def _is_slow(self, latency: float) -> bool:
+        return (self.baseline_latency is not None
+                and latency > self.baseline_latency * self.latency_tolerance)
+
+    def _increase(self, latency: float):
+        # Exponentially weighted baseline so one fast page doesn't reset it
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+
+        self._successes += 1
+        if self._successes >= int(self.limit):
+            self._successes = 0
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def _decrease(self):
+        # At most one cut per baseline RTT, otherwise a burst of 429s from the
+        # same window would collapse the limit to the floor
+        now = time.monotonic()
+        if now - self._last_decrease < (self.baseline_latency or 0.0):
+            return
+        self._last_decrease = now
+        self._successes = 0
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+
+class AdaptiveFetchScheduler:
+    """Fetches Polygon pages through an AIMD limiter with jittered retries.
+
+    Pages that still fail after ``max_retries`` are recorded in
+    ``dropped_pages`` instead of disappearing silently.
+    """
+
+    def __init__(self, api_key: str, initial_limit: int = 16, max_limit: int = 500,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_cap: float = 30.0):
+        self.api_key = api_key
+        self.limiter = AdaptiveConcurrencyLimiter(initial_limit=initial_limit, max_limit=max_limit)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.pages_fetched = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.dropped_pages: List[Dict] = []
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when sent"""
+        if retry_after:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str,
+                    params: Optional[Dict] = None, progress=None) -> Optional[Dict]:
+        """Fetch one page; returns the decoded JSON or None if the page was dropped.
+
+        ``progress`` (a FetchProgress) is credited with the page or the drop,
+        which is how a scheduler shared by several symbols attributes them.
+        """
+        request_params = {**(params or {}), "apiKey": self.api_key}
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+
+            await self.limiter.acquire()
+            started = time.monotonic()
+            overloaded = False
+            retry_after = None
+            status = "error"
+            nbytes = 0
+            try:
+                async with session.get(url, params=request_params) as response:
+                    status = str(response.status)
+                    if response.status == 200:
+                        body = await response.read()
+                        nbytes = len(body)
+                        data = json.loads(body)
+                        self.pages_fetched += 1
+                        self.bytes_received += nbytes
+                        if progress is not None:
+                            progress.add_page(nbytes)
+                        return data
+
+                    last_error = f"HTTP {response.status}"
+                    if response.status not in RETRYABLE_STATUSES:
+                        # 4xx other than 429 will not get better by retrying
+                        break
+                    overloaded = True
+                    retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                overloaded = True
+                status = "timeout" if isinstance(e, asyncio.TimeoutError) else "client_error"
+                last_error = f"{type(e).__name__}: {e}"
+            except ValueError as e:
+                # Truncated or malformed body; retried like a transport error, not overload
+                status = "decode_error"
+                last_error = f"Invalid JSON: {e}"
+            finally:
+                latency = time.monotonic() - started
+                await self.limiter.release(latency, overloaded)
+                observe_request(status, latency, nbytes, progress)
+                CONCURRENCY_LIMIT.set(self.limiter.limit)
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+
+        dropped = {
+            "url": url,
+            "params": params,
+            "error": last_error,
+            "attempts": attempt + 1
+        }
+        self.dropped_pages.append(dropped)
+        if progress is not None:
+            progress.add_dropped(dropped)
+        return None
+
+    def report(self) -> Dict:
+        return {
+            "pages_fetched": self.pages_fetched,
+            "bytes_received": self.bytes_received,
+            "pages_dropped": len(self.dropped_pages),
+            "retries": self.retries,
+            "final_concurrency": int(self.limiter.limit),
+            "dropped_pages": self.dropped_pages
+        }
@@ -0,0 +1,65 @@
+"""Prometheus instrumentation for the ingest pipeline.
+
+Process-wide series are exported at /metrics; the same observations are
+also credited to the fetch's FetchProgress so each job records its own
+stage breakdown.
+"""
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BATCH_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BATCH_ROWS_BUCKETS = (100, 1_000, 10_000, 50_000, 100_000, 200_000, 500_000, 1_000_000)
+
+REQUEST_SECONDS = Histogram(
+    "polygon_request_seconds", "Latency of each Polygon HTTP attempt", ["status"], buckets=LATENCY_BUCKETS
+)
+RESPONSES = Counter("polygon_responses_total", "Polygon HTTP attempts by status", ["status"])
+RESPONSE_BYTES = Counter("polygon_response_bytes_total", "Bytes of successful Polygon responses")
+CONCURRENCY_LIMIT = Gauge("polygon_concurrency_limit", "Current AIMD limit on in-flight Polygon requests")
+
+QUEUE_DEPTH = Gauge("ingest_write_queue_depth", "Pages waiting in the writer queue")
+ENQUEUE_WAIT_SECONDS = Counter(
+    "ingest_enqueue_wait_seconds_total", "Time fetchers spent blocked on a full writer queue"
+)
+BATCH_SECONDS = Histogram(
+    "ingest_batch_stage_seconds", "Writer batch time by stage", ["stage"], buckets=BATCH_SECONDS_BUCKETS
+)
+BATCH_ROWS = Histogram("ingest_copy_batch_rows", "Rows per COPY batch", buckets=BATCH_ROWS_BUCKETS)
+ROWS_WRITTEN = Counter("ingest_rows_written_total", "Rows COPY'd into tick_data or a staging table")
+JOBS = Counter("ingest_jobs_total", "Finished fetch jobs by outcome", ["status"])
+LAST_JOB_ROWS_PER_SECOND = Gauge("ingest_last_job_rows_per_second", "Throughput of the most recent fetch job")
+
+
+def observe_request(status: str, seconds: float, nbytes: int = 0, progress=None):
+    REQUEST_SECONDS.labels(status).observe(seconds)
+    RESPONSES.labels(status).inc()
+    if nbytes:
+        RESPONSE_BYTES.inc(nbytes)
+    if progress is not None:
+        progress.add_stage("http", seconds)
+        progress.add_status(status)
+
+
+def observe_enqueue(depth: int, waited: float, progress=None):
+    QUEUE_DEPTH.set(depth)
+    ENQUEUE_WAIT_SECONDS.inc(waited)
+    if progress is not None:
+        progress.add_stage("enqueue_wait", waited)
+
+
+def observe_batch(rows: int, stages: dict, progress=None):
+    """One writer batch; stages maps stage name ('encode', 'copy', 'bars', 'commit') to seconds"""
+    BATCH_ROWS.observe(rows)
+    ROWS_WRITTEN.inc(rows)
+    for stage, seconds in stages.items():
+        BATCH_SECONDS.labels(stage).observe(seconds)
+        if progress is not None:
+            progress.add_stage(stage, seconds)
+
+
+def observe_job(status: str, rows: int, seconds: Optional[float]):
+    JOBS.labels(status).inc()
+    if seconds:
+        LAST_JOB_ROWS_PER_SECOND.set(rows / seconds)
@@ -1,108 +1,277 @@
 import httpx
-from datetime import datetime
-from typing import List, Dict
+from datetime import datetime, timezone
+from typing import Callable, List, Dict, Optional, Tuple
 from app.config import get_settings
 from sqlalchemy.orm import Session
 import asyncio
 import time
 import psycopg2
 import io
-from asyncio import Queue, Semaphore
 import aiohttp
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
+from app.services.fetch_scheduler import AdaptiveFetchScheduler
+from app.services.coverage_ledger import CoverageLedger, NS_PER_DAY, ns_to_naive_utc
+from app.services.tick_partitions import get_partition_manager
+from app.services.staging_loader import StagingLoader
+from app.services.copy_encoder import (
+    COPY_COLUMNS, binary_copy_sql, encode_columns_binary, encode_trades_text, trades_to_columns
+)
+from app.services.bar_rollups import BarRollups, parse_intervals, upsert_bars
+from app.services.fetch_jobs import FetchProgress
+from app.services.ingest_metrics import observe_batch, observe_enqueue
 
 settings = get_settings()
 
+def _lap(started):
+    """(seconds since started, now) for timing consecutive stages"""
+    now = time.perf_counter()
+    return now - started, now
+
 class PolygonService:
-    def __init__(self):
+    def __init__(self, on_ranges_changed: Optional[Callable[[str, List[List[str]]], None]] = None):
+        # Called with (symbol, [[start_iso, end_iso], ...]) once a fetch has cleared ranges
+        self.on_ranges_changed = on_ranges_changed
         self.api_key = settings.polygon_api_key
         self.base_url = "https://api.polygon.io"
         self.executor = ThreadPoolExecutor(max_workers=4)
+        self.coverage = CoverageLedger(settle_seconds=settings.coverage_settle_seconds)
+        self.partitions = get_partition_manager()
+        self.staging = StagingLoader(self.partitions)
+        self.bars = BarRollups(parse_intervals(settings.bar_intervals))
         
-    async def fetch_page_ultra(self, session, url):
-        """Ultra-fast fetch without semaphore"""
-        try:
-            async with session.get(url, params={"apiKey": self.api_key}) as response:
-                return await response.json()
-        except:
-            return None
+    async def fetch_page_ultra(self, session, scheduler, url, params=None, progress=None):
+        """Fetch a page through the adaptive scheduler (None means the page was dropped)"""
+        return await scheduler.fetch(session, url, params, progress=progress)
     
-    def db_writer_thread(self, queue, symbol, conn):
-        """Dedicated thread for DB writes"""
-        total = 0
-        buffer = []
+    def db_writer_thread(self, queue, table="tick_data", progress=None):
+        """Writer worker - owns its own connection and commits each COPY batch independently.
         
-        while True:
-            item = queue.get()
-            if item is None:
-                break
-            
-            buffer.extend(item)
-            
-            # Write when buffer is large
-            if len(buffer) >= 200000:
-                total += self._sync_bulk_insert(buffer[:200000], symbol, conn)
-                buffer = buffer[200000:]
+        Queue items are (symbol, trades); each symbol is buffered separately so
+        one writer pool can serve a whole batch of symbols.
+        """
+        batch_rows = settings.ingest_batch_rows
+        stats = {"rows": {}, "batches": {}, "rows_lost": {}, "error": None}
+        buffers = {}
+        buffered = 0
+        conn = None
+        
+        def flush(symbol, batch):
+            try:
+                written = self._sync_bulk_insert(
+                    batch, symbol, conn, table, progress[symbol] if progress is not None else None
+                )
+            except Exception:
+                lose(symbol, len(batch))
+                raise
+            stats["rows"][symbol] = stats["rows"].get(symbol, 0) + written
+            stats["batches"][symbol] = stats["batches"].get(symbol, 0) + 1
+            if progress is not None:
+                progress[symbol].add_rows(written)
         
-        # Final flush
-        if buffer:
-            total += self._sync_bulk_insert(buffer, symbol, conn)
+        def lose(symbol, rows):
+            stats["rows_lost"][symbol] = stats["rows_lost"].get(symbol, 0) + rows
+        
+        try:
+            conn = self._get_db_connection()
+            while True:
+                item = queue.get()
+                if item is None:
+                    break
+                
+                symbol, trades = item
+                buffers.setdefault(symbol, []).extend(trades)
+                buffered += len(trades)
+                
+                # Write when buffers are large - biggest symbol first, which
+                # bounds a writer's memory however many symbols it holds
+                while buffered >= batch_rows:
+                    symbol = max(buffers, key=lambda s: len(buffers[s]))
+                    buffer = buffers[symbol]
+                    batch = buffer[:batch_rows]
+                    del buffer[:batch_rows]
+                    if not buffer:
+                        del buffers[symbol]
+                    buffered -= len(batch)
+                    flush(symbol, batch)
+            
+            # Final flush
+            for symbol in list(buffers):
+                flush(symbol, buffers.pop(symbol))
+        except Exception as e:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            stats["error"] = f"{type(e).__name__}: {e}"
+            for symbol, buffer in buffers.items():
+                lose(symbol, len(buffer))
+            # Keep draining until our sentinel so fetchers never block on a
+            # full queue; whatever this worker receives now is lost and counted
+            item = queue.get()
+            while item is not None:
+                lose(item[0], len(item[1]))
+                item = queue.get()
+        finally:
+            if conn is not None:
+                conn.close()
         
-        return total
+        return stats
     
-    def _sync_bulk_insert(self, trades, symbol, conn):
-        """Synchronous bulk insert for thread"""
+    def _sync_bulk_insert(self, trades, symbol, conn, table="tick_data", progress=None):
+        """Synchronous bulk insert for thread - COPY plus bar rollups in one transaction"""
         if not trades:
             return 0
         
-        buffer = io.StringIO()
-        count = 0
-        
-        for trade in trades:
-            ts = trade.get("participant_timestamp") or trade.get("sip_timestamp", 0)
-            if not ts:
-                continue
-            
-            seconds = ts // 1_000_000_000
-            microseconds = (ts % 1_000_000_000) // 1000
-            dt = datetime.utcfromtimestamp(seconds)
-            
-            buffer.write(
-                f"{symbol}\t"
-                f"{dt.strftime('%Y-%m-%d %H:%M:%S')}.{microseconds:06d}\t"
-                f"{float(trade.get('price', 0))}\t"
-                f"{int(float(trade.get('size', 0)))}\t"
-                f"{trade.get('exchange', '') or ''}\t"
-                f"{str(trade.get('conditions', []))}\n"
-            )
-            count += 1
-        
+        cur = conn.cursor()
+        stages = {}
+        started = time.perf_counter()
+        cols = trades_to_columns(trades)
+        count = len(cols["timestamp_ns"])
         if count > 0:
-            buffer.seek(0)
-            cur = conn.cursor()
-            cur.copy_from(
-                buffer,
-                'tick_data',
-                columns=('symbol', 'timestamp', 'price', 'size', 'exchange', 'conditions'),
-                sep='\t',
-                size=16384
-            )
+            if settings.ingest_copy_format == "binary":
+                payload, _ = encode_columns_binary(cols, symbol)
+                stages["encode"], started = _lap(started)
+                cur.copy_expert(binary_copy_sql(table), io.BytesIO(payload), size=1 << 20)
+            else:
+                buffer, _ = encode_trades_text(trades, symbol)
+                stages["encode"], started = _lap(started)
+                cur.copy_from(buffer, table, columns=COPY_COLUMNS, sep='\t', size=16384)
+                buffer.close()
+            stages["copy"], started = _lap(started)
+            
+            if self.bars.intervals:
+                upsert_bars(cur, symbol, cols, self.bars.intervals)
+                stages["bars"], started = _lap(started)
             conn.commit()
-            cur.close()
-        
-        buffer.close()
+            stages["commit"], started = _lap(started)
+            observe_batch(count, stages, progress)
+        cur.close()
         return count
     
-    async def pipeline_fetch(self, symbol: str, start_date: str, end_date: str, conn):
-        """Pipeline architecture - fetch and write in parallel"""
-        
-        initial_url = f"{self.base_url}/v3/trades/{symbol}"
-        initial_params = {
-            "timestamp.gte": f"{start_date}T00:00:00Z",
-            "timestamp.lte": f"{end_date}T23:59:59Z",
+    def _date_to_ns(self, date_str: str) -> int:
+        """Midnight UTC of a YYYY-MM-DD date as Polygon nanosecond timestamp"""
+        dt = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        return int(dt.timestamp()) * 1_000_000_000
+    
+    def _time_slices(self, ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Split half-open nanosecond ranges into fetch windows of fetch_slice_minutes"""
+        step = settings.fetch_slice_minutes * 60 * 1_000_000_000
+        return [
+            (lo, min(lo + step, range_hi))
+            for range_lo, range_hi in ranges
+            for lo in range(range_lo, range_hi, step)
+        ]
+    
+    async def _enqueue(self, write_queue, symbol, results, progress=None):
+        """Hand a page to the writer without blocking the event loop on a full queue"""
+        if results:
+            started = time.perf_counter()
+            await asyncio.to_thread(write_queue.put, (symbol, results))
+            observe_enqueue(write_queue.qsize(), time.perf_counter() - started, progress)
+    
+    async def _fetch_window(self, session, scheduler, symbol, lo, hi, write_queue, progress=None):
+        """Fetch one time window; returns sub-windows to schedule if it was split"""
+        url = f"{self.base_url}/v3/trades/{symbol}"
+        params = {
+            "timestamp.gte": lo,
+            "timestamp.lt": hi,
             "limit": 50000,
             "order": "asc"
         }
+        data = await self.fetch_page_ultra(session, scheduler, url, params, progress)
+        if data is None:
+            return []
+        
+        results = data.get("results") or []
+        next_url = data.get("next_url")
+        
+        # Dense window: the first page covered [lo, last_ts], so estimate how
+        # many pages the rest needs and split it into independent windows
+        # instead of walking a long serial cursor chain
+        if next_url and results and hi - lo > settings.fetch_min_slice_seconds * 1_000_000_000:
+            last_ts = results[-1].get("sip_timestamp")
+            first_ts = results[0].get("sip_timestamp")
+            if last_ts and first_ts and lo <= first_ts < last_ts < hi:
+                # Trades sharing last_ts may continue on the next page, so
+                # they belong to the sub-windows rather than this page
+                cut = len(results) - 1
+                while cut >= 0 and results[cut].get("sip_timestamp") == last_ts:
+                    cut -= 1
+                await self._enqueue(write_queue, symbol, results[:cut + 1], progress)
+                
+                remaining = hi - last_ts
+                pages = -(-remaining // max(last_ts - lo, 1))
+                parts = max(2, min(settings.fetch_max_split, pages))
+                step = -(-remaining // parts)
+                return [(b, min(b + step, hi)) for b in range(last_ts, hi, step)]
+        
+        await self._enqueue(write_queue, symbol, results, progress)
+        
+        # Sparse window (or unsplittable): follow the cursor chain serially
+        while next_url:
+            data = await self.fetch_page_ultra(session, scheduler, next_url, progress=progress)
+            if data is None:
+                # Dropped page breaks the cursor chain - recorded in the report
+                break
+            await self._enqueue(write_queue, symbol, data.get("results"), progress)
+            next_url = data.get("next_url")
+        
+        return []
+    
+    async def _run_windows(self, session, scheduler, write_queue, windows, progress):
+        """Fetch every symbol's windows, interleaving symbols round-robin.
+        
+        At most fetch_max_concurrency windows exist at once and new ones are
+        started one symbol at a time, so a dense symbol that keeps splitting
+        can't starve the rest of the batch. Returns windows run per symbol.
+        """
+        queues = {symbol: deque(w) for symbol, w in windows.items() if w}
+        turn = deque(queues)  # symbols with windows waiting, in round-robin order
+        counts = {symbol: 0 for symbol in windows}
+        spans = {}
+        pending = set()
+        cap = max(1, settings.fetch_max_concurrency)
+        
+        try:
+            while turn or pending:
+                while turn and len(pending) < cap:
+                    symbol = turn.popleft()
+                    lo, hi = queues[symbol].popleft()
+                    task = asyncio.create_task(self._fetch_window(
+                        session, scheduler, symbol, lo, hi, write_queue, progress[symbol]
+                    ))
+                    spans[task] = (symbol, hi - lo)
+                    pending.add(task)
+                    counts[symbol] += 1
+                    if queues[symbol]:
+                        turn.append(symbol)
+                
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    symbol, finished_ns = spans.pop(task)
+                    sub_windows = task.result()
+                    if sub_windows and not queues[symbol]:
+                        turn.append(symbol)
+                    for lo, hi in sub_windows:
+                        finished_ns -= hi - lo
+                        queues[symbol].append((lo, hi))
+                    progress[symbol].add_span_done(finished_ns)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
+        
+        return counts
+    
+    async def pipeline_fetch(self, ranges_by_symbol: Dict[str, List[Tuple[int, int]]], table: str = "tick_data",
+                             progress: Optional[Dict[str, FetchProgress]] = None):
+        """Pipeline architecture - time-sliced parallel fetch with a DB writer pool.
+        
+        All symbols share one HTTP session, one adaptive scheduler and one
+        writer pool. Returns the shared report plus a per-symbol breakdown.
+        """
+        progress = dict(progress or {})
+        for symbol in ranges_by_symbol:
+            progress.setdefault(symbol, FetchProgress())
         
         # Ultra-high performance connector
         connector = aiohttp.TCPConnector(
@@ -118,72 +287,66 @@ class PolygonService:
         import queue
         write_queue = queue.Queue(maxsize=50)
         
-        # Start DB writer thread
-        from threading import Thread
-        writer_thread = Thread(
-            target=self.db_writer_thread,
-            args=(write_queue, symbol, conn)
+        # Start DB writer pool - one connection per worker
+        workers = max(1, settings.ingest_writer_workers)
+        writer_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-writer")
+        writer_futures = [
+            writer_pool.submit(self.db_writer_thread, write_queue, table, progress)
+            for _ in range(workers)
+        ]
+        
+        scheduler = AdaptiveFetchScheduler(
+            self.api_key,
+            initial_limit=settings.fetch_initial_concurrency,
+            max_limit=settings.fetch_max_concurrency,
+            max_retries=settings.fetch_max_retries
         )
-        writer_thread.start()
         
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            # Get first page
-            async with session.get(initial_url, params={**initial_params, "apiKey": self.api_key}) as resp:
-                first_data = await resp.json()
-            
-            # Queue first batch
-            if "results" in first_data:
-                write_queue.put(first_data["results"])
-            
-            # Collect URLs
-            all_urls = []
-            if "next_url" in first_data:
-                all_urls.append(first_data["next_url"])
-            
-            # Pre-fetch phase - get initial URLs quickly
-            if all_urls:
-                prefetch_batch = all_urls[:10]
-                all_urls = all_urls[10:]
-                
-                tasks = [self.fetch_page_ultra(session, url) for url in prefetch_batch]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for result in results:
-                    if result and not isinstance(result, Exception):
-                        if "results" in result:
-                            write_queue.put(result["results"])
-                        if "next_url" in result:
-                            all_urls.append(result["next_url"])
-            
-            # Main fetch loop - ABSOLUTE MAXIMUM PARALLELISM
-            while all_urls:
-                # Fetch 500 pages at once - PUSH THE LIMITS!
-                batch_size = min(500, len(all_urls))
-                batch = all_urls[:batch_size]
-                all_urls = all_urls[batch_size:]
-                
-                # Create all tasks without semaphore
-                tasks = [self.fetch_page_ultra(session, url) for url in batch]
-                
-                # Execute ALL at once
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # Process results
-                new_urls = []
-                for result in results:
-                    if result and not isinstance(result, Exception):
-                        if "results" in result:
-                            write_queue.put(result["results"])
-                        if "next_url" in result:
-                            new_urls.append(result["next_url"])
-                
-                all_urls.extend(new_urls)
+        windows = {}
+        for symbol, ranges in ranges_by_symbol.items():
+            windows[symbol] = self._time_slices(ranges)
+            progress[symbol].set_span(sum(hi - lo for lo, hi in ranges))
+        
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                # Every window runs its own cursor chain; the scheduler bounds
+                # how many requests are actually in flight
+                window_counts = await self._run_windows(session, scheduler, write_queue, windows, progress)
+        finally:
+            # Signal writers to stop - one sentinel each
+            for _ in writer_futures:
+                await asyncio.to_thread(write_queue.put, None)
+            writer_stats = await asyncio.gather(*[asyncio.wrap_future(f) for f in writer_futures])
+            writer_pool.shutdown(wait=False)
         
-        # Signal writer to stop
-        write_queue.put(None)
-        writer_thread.join()
+        write_errors = [w["error"] for w in writer_stats if w["error"]]
+        symbols = {}
+        for symbol in ranges_by_symbol:
+            rows_lost = sum(w["rows_lost"].get(symbol, 0) for w in writer_stats)
+            symbols[symbol] = {
+                "pages_fetched": progress[symbol].pages,
+                "bytes_received": progress[symbol].bytes_received,
+                "pages_dropped": len(progress[symbol].dropped_pages),
+                "dropped_pages": progress[symbol].dropped_pages,
+                "windows": window_counts[symbol],
+                "rows_written": sum(w["rows"].get(symbol, 0) for w in writer_stats),
+                "copy_batches": sum(w["batches"].get(symbol, 0) for w in writer_stats),
+                "rows_lost": rows_lost,
+                "write_errors": write_errors if rows_lost else [],
+                "stage_seconds": {
+                    stage: round(seconds, 3) for stage, seconds in progress[symbol].stage_seconds.items()
+                }
+            }
         
-        return 0  # Return value handled by thread
+        return {
+            **scheduler.report(),
+            "windows": sum(window_counts.values()),
+            "rows_written": sum(sum(w["rows"].values()) for w in writer_stats),
+            "copy_batches": sum(sum(w["batches"].values()) for w in writer_stats),
+            "rows_lost": sum(sum(w["rows_lost"].values()) for w in writer_stats),
+            "write_errors": write_errors,
+            "symbols": symbols
+        }
     
     def _get_db_connection(self):
         """Get optimized psycopg2 connection"""
@@ -207,48 +370,142 @@ class PolygonService:
         conn.set_session(autocommit=False)
         return conn
     
-    async def fetch_and_store_data(self, symbol: str, start_date: str, end_date: str, db: Session):
-        """ULTIMATE PIPELINE - 300 CONCURRENT REQUESTS + PARALLEL DB WRITES"""
+    async def fetch_and_store_data(self, symbol: str, start_date: str, end_date: str, db: Session,
+                                   force: bool = False, bulk: Optional[bool] = None,
+                                   progress: Optional[FetchProgress] = None):
+        """ULTIMATE PIPELINE - only the ranges missing from the coverage ledger are fetched"""
+        batch = await self.fetch_and_store_batch(
+            [symbol], start_date, end_date, db, force=force, bulk=bulk,
+            progress={symbol: progress} if progress is not None else None
+        )
+        return batch["symbols"][symbol]
+    
+    async def fetch_and_store_batch(self, symbols: List[str], start_date: str, end_date: str, db: Session,
+                                    force: bool = False, bulk: Optional[bool] = None,
+                                    progress: Optional[Dict[str, FetchProgress]] = None):
+        """Fetch several symbols through one shared session, scheduler and writer pool.
+        
+        Returns {"symbols": {symbol: summary}, **shared totals}; each summary
+        has the same shape fetch_and_store_data returns for one symbol.
+        """
         start_time = time.time()
+        progress = dict(progress or {})
+        for symbol in symbols:
+            progress.setdefault(symbol, FetchProgress())
         
-        # Clear data
-        from sqlalchemy import text
-        db.execute(text("""
-            DELETE FROM tick_data 
-            WHERE symbol = :symbol 
-            AND timestamp BETWEEN :start_ts AND :end_ts
-        """), {
-            "symbol": symbol,
-            "start_ts": f"{start_date} 00:00:00",
-            "end_ts": f"{end_date} 23:59:59"
-        })
-        db.commit()
+        ranges_by_symbol = {}
+        for symbol in symbols:
+            if force:
+                ranges = [(self._date_to_ns(start_date), self._date_to_ns(end_date) + NS_PER_DAY)]
+            else:
+                ranges = self.coverage.missing_ranges(db, symbol, start_date, end_date)
+            if ranges:
+                ranges_by_symbol[symbol] = ranges
+            else:
+                print(f"{symbol} {start_date} to {end_date} already covered - nothing to fetch")
+                progress[symbol].phase = "done"
         
-        # Get DB connection
-        conn = self._get_db_connection()
+        summaries = {
+            symbol: {
+                "records": 0,
+                "complete": True,
+                "already_covered": True,
+                "ranges_fetched": []
+            }
+            for symbol in symbols if symbol not in ranges_by_symbol
+        }
+        if not ranges_by_symbol:
+            return {"symbols": summaries, "records": 0, "complete": True}
         
-        # Pipeline fetch
-        await self.pipeline_fetch(symbol, start_date, end_date, conn)
+        all_ranges = [r for ranges in ranges_by_symbol.values() for r in ranges]
         
-        # Count records
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT COUNT(*) FROM tick_data 
-            WHERE symbol = %s 
-            AND timestamp BETWEEN %s AND %s
-        """, (symbol, f"{start_date} 00:00:00", f"{end_date} 23:59:59"))
-        total_records = cur.fetchone()[0]
-        cur.close()
+        # Large backfills go through the unindexed staging table
+        if bulk is None:
+            bulk = StagingLoader.span_days(all_ranges) >= settings.ingest_bulk_min_days
         
-        conn.close()
+        if not bulk:
+            # COPY fails on rows with no matching partition, so create them up front
+            created = self.partitions.ensure_partitions(db, all_ranges)
+            if created:
+                print(f"Created tick_data partitions: {', '.join(created)}")
         
+        # Clear whatever a previous partial run left inside the gaps
+        from sqlalchemy import text
+        for symbol, ranges in ranges_by_symbol.items():
+            for lo, hi in ranges:
+                db.execute(text("""
+                    DELETE FROM tick_data 
+                    WHERE symbol = :symbol 
+                    AND timestamp >= :start_ts AND timestamp < :end_ts
+                """), {
+                    "symbol": symbol,
+                    "start_ts": ns_to_naive_utc(lo),
+                    "end_ts": ns_to_naive_utc(hi)
+                })
+            self.bars.clear_ranges(db, symbol, ranges)
+            # Same transaction, so a forced refetch that dies leaves those days missing, not covered
+            self.coverage.clear_ranges(db, symbol, ranges)
+        db.commit()
+        
+        try:
+            # Pipeline fetch
+            if bulk:
+                stage = self.staging.create_stage(db)
+                try:
+                    report = await self.pipeline_fetch(ranges_by_symbol, table=stage, progress=progress)
+                    for symbol in ranges_by_symbol:
+                        progress[symbol].phase = "merging"
+                    merge_started = time.time()
+                    # Rows were counted as they reached the stage; the merge moves all of them
+                    await asyncio.to_thread(self.staging.merge, db, stage, all_ranges)
+                    report["merge_seconds"] = time.time() - merge_started
+                finally:
+                    self.staging.drop_stage(db, stage)
+            else:
+                report = await self.pipeline_fetch(ranges_by_symbol, progress=progress)
+        
+            for symbol, ranges in ranges_by_symbol.items():
+                symbol_report = report["symbols"][symbol]
+                self.bars.rebuild_boundaries(db, symbol, ranges)
+                complete = symbol_report["pages_dropped"] == 0 and symbol_report["rows_lost"] == 0
+            
+                # Only a complete fetch advances the ledger, so gaps get retried next time
+                if complete:
+                    self.coverage.mark_covered(db, symbol, ranges)
+            
+                summaries[symbol] = {
+                    "records": symbol_report["rows_written"],
+                    "complete": complete,
+                    "already_covered": False,
+                    "bulk": bulk,
+                    "ranges_fetched": [
+                        [ns_to_naive_utc(lo).isoformat(), ns_to_naive_utc(hi).isoformat()] for lo, hi in ranges
+                    ],
+                    **symbol_report,
+                    "retries": report["retries"],
+                    "final_concurrency": report["final_concurrency"]
+                }
+                if bulk:
+                    summaries[symbol]["merge_seconds"] = report["merge_seconds"]
+        finally:
+            # The gaps were emptied above, so cached results and tick files over them are
+            # stale whether or not the refetch succeeded
+            if self.on_ranges_changed is not None:
+                for symbol, ranges in ranges_by_symbol.items():
+                    self.on_ranges_changed(symbol, [
+                        [ns_to_naive_utc(lo).isoformat(), ns_to_naive_utc(hi).isoformat()] for lo, hi in ranges
+                    ])
+        
+        total_records = report["rows_written"]
+        symbol_list = ", ".join(ranges_by_symbol) if len(ranges_by_symbol) <= 5 else f"{len(ranges_by_symbol)} symbols"
         elapsed = time.time() - start_time
         records_per_second = total_records / elapsed if elapsed > 0 else 0
         
         print(f"\n{'='*60}")
         print(f"⚡⚡⚡ ULTIMATE PIPELINE ARCHITECTURE!")
-        print(f"   500 CONCURRENT API REQUESTS")
+        print(f"   ADAPTIVE CONCURRENCY (settled at {report['final_concurrency']} in flight)")
         print(f"   PARALLEL DB WRITES")
+        print(f"   Symbols: {symbol_list}")
         print(f"   Records: {total_records:,}")
         print(f"   Time: {elapsed:.1f} seconds")
         print(f"   Speed: {records_per_second:,.0f} records/second")
@@ -259,6 +516,31 @@ class PolygonService:
                 print(f"   🔥 UNDER 10 SECONDS PER MILLION!")
             if seconds_per_million < 5:
                 print(f"   ⚡⚡⚡ UNDER 5 SECONDS PER MILLION!")
+        print(f"   Pages: {report['pages_fetched']:,} fetched across {report['windows']:,} time windows, {report['retries']:,} retries")
+        print(f"   Writers: {settings.ingest_writer_workers} workers, {report['copy_batches']:,} COPY batches")
+        stage_totals = {}
+        for symbol_report in report["symbols"].values():
+            for stage, seconds in symbol_report["stage_seconds"].items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+        if stage_totals:
+            print(f"   Stage time (summed across workers): "
+                  + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in stage_totals.items()))
+        if bulk:
+            print(f"   Bulk mode: staged + merged in {report['merge_seconds']:.1f} seconds")
+        if report["pages_dropped"]:
+            print(f"   ⚠️  INCOMPLETE: {report['pages_dropped']} page(s) dropped")
+            for page in report["dropped_pages"]:
+                print(f"      {page['url']} ({page['error']}, {page['attempts']} attempts)")
+        if report["write_errors"]:
+            print(f"   ⚠️  INCOMPLETE: {report['rows_lost']:,} rows lost on write")
+            for error in report["write_errors"]:
+                print(f"      {error}")
         print(f"{'='*60}\n")
         
-        return total_records
\ No newline at end of file
+        return {
+            "symbols": summaries,
+            "records": total_records,
+            "complete": all(summary["complete"] for summary in summaries.values()),
+            "elapsed_seconds": elapsed,
+            **{k: v for k, v in report.items() if k != "symbols"}
+        }
@@ -0,0 +1,185 @@
+"""Prompt cache for template generation.
+
+A prompt is looked up by the hash of its normalized text first, then by
+Jaccard similarity of its content-word and word-pair shingles against every
+known prompt with the same numbers and operators (saved AnalyticsTemplates
+plus recent generations), found through an inverted shingle index. Concurrent generations of the same prompt
+share one LLM call.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.models import AnalyticsTemplate
+
+# Words and numbers, plus operators and symbols that change a prompt's meaning ("size > 1000"
+# vs "size < 1000"); a hyphen inside a word ("5-minute") is not a minus sign
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?|[<>!=]=|[<>=]|(?<![a-z0-9])[-+]|[%$*/]")
+# Filler words only dilute similarity ("show me the volume by hour" ~ "volume by hour")
+STOPWORDS = frozenset(
+    "a an and as at be by can for from give i in into is it me my of on over please show "
+    "that the their then this to using what with would you".split()
+)
+
+
+def normalize(prompt: str) -> str:
+    """Lowercased words, numbers and operators; other punctuation and spacing dropped"""
+    return " ".join(_TOKEN.findall(prompt.lower()))
+
+
+def literals(text: str) -> FrozenSet[str]:
+    """Numbers, operators and other non-word tokens, which a near-duplicate must share exactly"""
+    return frozenset(token for token in text.split() if not token.isalpha())
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """Content words and adjacent content-word pairs"""
+    tokens = [token for token in text.split() if token not in STOPWORDS]
+    return frozenset(tokens) | frozenset(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+
+class PromptCache:
+    """Generated template code by prompt, exact or near-duplicate"""
+
+    def __init__(self, similarity: float = 0.9, max_entries: int = 10000):
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._index: Dict[str, set] = defaultdict(set)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._last_template_id = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        return hashlib.sha256(normalize(prompt).encode()).hexdigest()
+
+    def lookup(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """The cached generation for prompt, with 'match' ('exact'/'similar') and 'similarity'"""
+        key = self.key(prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return self._hit(entry, "exact", 1.0)
+
+            text = normalize(prompt)
+            wanted, wanted_literals = shingles(text), literals(text)
+            shared: Dict[str, int] = defaultdict(int)
+            for shingle in wanted:
+                for candidate in self._index.get(shingle, ()):
+                    shared[candidate] += 1
+            best, best_score = None, 0.0
+            for candidate, count in shared.items():
+                if self._entries[candidate]["literals"] != wanted_literals:
+                    continue
+                score = count / (len(wanted) + len(self._entries[candidate]["shingles"]) - count)
+                if score > best_score:
+                    best, best_score = candidate, score
+            if best is not None and best_score >= self.similarity:
+                self._entries.move_to_end(best)
+                self.similar_hits += 1
+                return self._hit(self._entries[best], "similar", best_score)
+            self.misses += 1
+            return None
+
+    @staticmethod
+    def _hit(entry: Dict[str, Any], match: str, score: float) -> Dict[str, Any]:
+        return {
+            "prompt": entry["prompt"],
+            "code": entry["code"],
+            "output_type": entry["output_type"],
+            "template_id": entry["template_id"],
+            "match": match,
+            "similarity": round(score, 3),
+        }
+
+    def add(self, prompt: str, code: str, output_type: Optional[str], template_id: Optional[int] = None):
+        key = self.key(prompt)
+        text = normalize(prompt)
+        entry = {
+            "prompt": prompt,
+            "code": code,
+            "output_type": output_type,
+            "template_id": template_id,
+            "shingles": shingles(text),
+            "literals": literals(text),
+        }
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            for shingle in entry["shingles"]:
+                self._index[shingle].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, prompt: str):
+        """Forget a generation (e.g. one that failed validation)"""
+        with self._lock:
+            self._remove(self.key(prompt))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for shingle in entry["shingles"]:
+            keys = self._index.get(shingle)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[shingle]
+
+    def sync(self, db: Session) -> int:
+        """Index templates saved since the last sync (by any API process); returns how many"""
+        rows = db.query(
+            AnalyticsTemplate.id, AnalyticsTemplate.prompt,
+            AnalyticsTemplate.python_code, AnalyticsTemplate.output_type
+        ).filter(AnalyticsTemplate.id > self._last_template_id).order_by(AnalyticsTemplate.id).all()
+        for row in rows:
+            self.add(row.prompt, row.python_code, row.output_type, template_id=row.id)
+            self._last_template_id = max(self._last_template_id, row.id)
+        return len(rows)
+
+    def generate_once(self, prompt: str, generate: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """generate(prompt), shared with any concurrent call for the same prompt"""
+        key = self.key(prompt)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.deduplicated += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = generate(prompt)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._inflight),
+        }
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+# Invalidation counters a lookup saw for the symbol: (this process, Redis). Local
+# entries only compare the Redis one; this process drops its own entries by range
+Generation = Tuple[int, int]
+
+try:
+    import redis
+except ImportError:  # Redis tier is optional
+    redis = None
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
+def _parse_bound(value: str, end: bool) -> datetime:
+    """Template date bound as a datetime; bare dates cover the whole day"""
+    if len(value) == 10:
+        value = f"{value} 23:59:59.999999" if end else f"{value} 00:00:00"
+    return datetime.fromisoformat(value.replace("T", " "))
+
+
+def _overlaps(a: Tuple[datetime, datetime], b: Tuple[datetime, datetime]) -> bool:
+    return a[0] <= b[1] and b[0] <= a[1]
+
+
+class ResultCache:
+    """Two-tier cache of template execution results.
+
+    Keys are the template code hash plus symbol and date range. Entries are
+    invalidated when the data underneath them changes: the Redis tier
+    keeps a per-symbol index so only entries overlapping the changed range
+    are deleted, and in-process entries remember the symbol's generation
+    counter so invalidations made by other workers are noticed too.
+
+    Calls block on Redis, so async callers run them in a thread. After a
+    Redis error the Redis tier is skipped for ``redis_retry_seconds``.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, max_entries: int = 256,
+                 ttl_seconds: int = 3600, prefix: str = "result_cache", redis_retry_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.redis_retry_seconds = redis_retry_seconds
+        self._local: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._local_generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_down_until = 0.0
+        if redis_url and redis is not None:
+            self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, code: str, symbol: str, start_date: str, end_date: str) -> str:
+        return f"{self.prefix}:{symbol}:{code_hash(code)}:{start_date}:{end_date}"
+
+    # -- Redis helpers; any Redis failure degrades to the local tier only --
+
+    def _redis_call(self, method: str, *args):
+        if self._redis is None or time.time() < self._redis_down_until:
+            return None
+        try:
+            return getattr(self._redis, method)(*args)
+        except redis.RedisError as e:
+            print(f"Result cache: Redis unavailable ({e}), using in-process cache only "
+                  f"for {self.redis_retry_seconds:g}s")
+            self._redis_down_until = time.time() + self.redis_retry_seconds
+            return None
+
+    def generation(self, symbol: str) -> Generation:
+        symbol = symbol.upper()
+        value = self._redis_call("get", f"{self.prefix}:gen:{symbol}")
+        return self._local_generations.get(symbol, 0), int(value) if value else 0
+
+    # -- public API --
+
+    def get(self, code: str, symbol: str, start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
+        return self.lookup(code, symbol, start_date, end_date)[0]
+
+    def lookup(self, code: str, symbol: str, start_date: str,
+               end_date: str) -> Tuple[Optional[Dict[str, Any]], Generation]:
+        """Cached result (or None) plus the generation to pass to set() for a result computed now"""
+        symbol = symbol.upper()
+        key = self.make_key(code, symbol, start_date, end_date)
+        generation = self.generation(symbol)
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry and entry["expires"] > time.time() and entry["generation"] == generation[1]:
+                self._local.move_to_end(key)
+                self.hits += 1
+                return entry["result"], generation
+
+        cached = self._redis_call("get", key)
+        if cached is not None:
+            result = json.loads(cached)
+            self._store_local(key, symbol, start_date, end_date, result, generation)
+            self.hits += 1
+            return result, generation
+
+        self.misses += 1
+        return None, generation
+
+    def set(self, code: str, symbol: str, start_date: str, end_date: str, result: Dict[str, Any],
+            generation: Optional[Generation] = None):
+        """Cache result; with the generation from lookup(), skipped if the data changed since"""
+        symbol = symbol.upper()
+        if generation is None:
+            generation = self.generation(symbol)
+        elif generation != self.generation(symbol):
+            # Invalidated while the template ran, so the result may predate the change
+            return
+        key = self.make_key(code, symbol, start_date, end_date)
+        if not self._store_local(key, symbol, start_date, end_date, result, generation):
+            return
+        index_key = f"{self.prefix}:index:{symbol}"
+        self._redis_call("setex", key, self.ttl_seconds, json.dumps(result))
+        self._redis_call("hset", index_key, key, f"{start_date}|{end_date}")
+        self._redis_call("expire", index_key, self.ttl_seconds)
+
+    def _store_local(self, key, symbol, start_date, end_date, result, generation) -> bool:
+        try:
+            bounds = (_parse_bound(start_date, False), _parse_bound(end_date, True))
+        except ValueError:
+            # Templates accept any date string; results for ranges invalidate() can't match aren't cached
+            return False
+        with self._lock:
+            self._local[key] = {
+                "symbol": symbol,
+                "range": bounds,
+                "result": result,
+                "generation": generation[1],
+                "expires": time.time() + self.ttl_seconds,
+            }
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+        return True
+
+    def invalidate(self, symbol: str, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Drop cached results for symbol overlapping [start, end] (whole symbol if omitted)"""
+        symbol = symbol.upper()
+        changed = None
+        if start is not None and end is not None:
+            changed = (_parse_bound(start, False), _parse_bound(end, True))
+
+        removed = 0
+        with self._lock:
+            self._local_generations[symbol] = self._local_generations.get(symbol, 0) + 1
+            for key in [k for k, e in self._local.items() if e["symbol"] == symbol]:
+                if changed is None or _overlaps(self._local[key]["range"], changed):
+                    del self._local[key]
+                    removed += 1
+
+        index_key = f"{self.prefix}:index:{symbol}"
+        index = self._redis_call("hgetall", index_key) or {}
+        stale = []
+        for key, bounds in index.items():
+            entry_start, entry_end = bounds.decode().split("|")
+            entry_range = (_parse_bound(entry_start, False), _parse_bound(entry_end, True))
+            if changed is None or _overlaps(entry_range, changed):
+                stale.append(key)
+        if stale:
+            self._redis_call("delete", *stale)
+            self._redis_call("hdel", index_key, *stale)
+            removed += len(stale)
+
+        # Other workers' in-process tiers compare against this counter
+        self._redis_call("incr", f"{self.prefix}:gen:{symbol}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local_entries": len(self._local),
+            "redis": self._redis is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
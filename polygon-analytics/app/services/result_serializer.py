@@ -0,0 +1,173 @@
+"""JSON-safe conversion of template results.
+
+DataFrames, Series and ndarrays returned by templates are converted a column
+at a time (vectorized NaN/NaT and timestamp handling) and only then zipped
+into row dicts. Everything else goes through a walker that dispatches on the
+exact type, so plain Python values cost one dict lookup instead of a chain
+of isinstance checks and a pd.isna call.
+"""
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_float_dtype, is_integer_dtype
+
+
+def to_jsonable(obj: Any) -> Any:
+    """obj with DataFrames as records, timestamps as strings and NaN/NaT as None"""
+    convert = _CONVERTERS.get(type(obj))
+    if convert is not None:
+        return convert(obj)
+    return _convert_other(obj)
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """DataFrame rows as dicts; a meaningful index (e.g. a groupby key) becomes a column"""
+    if not isinstance(df.index, pd.RangeIndex) or df.index.name is not None:
+        df = df.reset_index()
+    columns = [_key(c) for c in df.columns]
+    values = [column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def column_values(values) -> List[Any]:
+    """One column (Series or 1-D array) as a JSON-safe list"""
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    dtype = series.dtype
+    if is_datetime64_any_dtype(dtype):
+        return _datetime_values(series)
+    if dtype.kind == "m":
+        out = series.astype(str).to_numpy(dtype=object)
+        out[series.isna().to_numpy()] = None
+        return out.tolist()
+    if isinstance(dtype, np.dtype) and is_float_dtype(dtype):
+        array = series.to_numpy()
+        missing = np.isnan(array)
+        if missing.any():
+            out = array.astype(object)
+            out[missing] = None
+            return out.tolist()
+        return array.tolist()
+    if isinstance(dtype, np.dtype) and (is_integer_dtype(dtype) or is_bool_dtype(dtype)):
+        return series.to_numpy().tolist()
+    # Object, nullable and categorical columns: mask missing values at once, convert the rest
+    missing = series.isna().to_numpy()
+    return [None if m else to_jsonable(v) for v, m in zip(series.astype(object).tolist(), missing)]
+
+
+def _datetime_values(series: pd.Series) -> List[Any]:
+    """Timestamps as str(Timestamp) would write them, formatted for the whole column at once"""
+    missing = series.isna().to_numpy()
+    if getattr(series.dtype, "tz", None) is not None:
+        return [None if m else str(v) for v, m in zip(series.tolist(), missing)]
+    # astype(str) would shorten an all-midnight column to bare dates
+    out = series.dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy(dtype=object)
+    fractional = ((series.dt.microsecond != 0) | (series.dt.nanosecond != 0)).to_numpy() & ~missing
+    for i in np.flatnonzero(fractional):
+        out[i] = str(series.iloc[i])
+    out[missing] = None
+    return out.tolist()
+
+
+def _array(array: np.ndarray) -> List[Any]:
+    if array.ndim == 0:
+        return to_jsonable(array.item())
+    if array.ndim == 1:
+        return column_values(array)
+    return [_array(row) for row in array]
+
+
+def _float(value: float):
+    return None if value != value else value  # NaN
+
+
+def _dict(d: dict) -> Dict[Any, Any]:
+    # to_jsonable and _key inlined: this runs once per value of a record list
+    out = {}
+    for k, v in d.items():
+        if type(k) not in _PLAIN_KEYS:
+            k = _key(k)
+        if type(v) in _PASSTHROUGH:
+            out[k] = v
+        else:
+            convert = _CONVERTERS.get(type(v))
+            out[k] = convert(v) if convert is not None else _convert_other(v)
+    return out
+
+
+def _list(items) -> List[Any]:
+    return [v if type(v) in _PASSTHROUGH else to_jsonable(v) for v in items]
+
+
+def _identity(value):
+    return value
+
+
+_PASSTHROUGH = frozenset((str, int, bool, type(None)))
+
+_CONVERTERS = {
+    str: _identity,
+    int: _identity,
+    bool: _identity,
+    type(None): _identity,
+    float: _float,
+    dict: _dict,
+    list: _list,
+    tuple: _list,
+    pd.DataFrame: frame_records,
+    pd.Series: lambda s: frame_records(s.to_frame()),
+    np.ndarray: _array,
+    pd.Timestamp: str,
+    type(pd.NaT): lambda value: None,
+    datetime: str,
+    date: str,
+    np.float64: lambda v: _float(float(v)),
+    np.float32: lambda v: _float(float(v)),
+    np.int64: int,
+    np.int32: int,
+    np.bool_: bool,
+}
+
+
+def _convert_other(obj: Any) -> Any:
+    """Subclasses and rarer types the exact-type table doesn't cover"""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return _float(float(obj))
+    if isinstance(obj, (datetime, date)):
+        return str(obj)
+    if isinstance(obj, dict):
+        return _dict(obj)
+    if isinstance(obj, (list, tuple)):
+        return _list(obj)
+    if isinstance(obj, pd.DataFrame):
+        return frame_records(obj)
+    if isinstance(obj, pd.Series):
+        return frame_records(obj.to_frame())
+    if isinstance(obj, np.ndarray):
+        return _array(obj)
+    try:
+        if pd.isna(obj):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return obj
+
+
+_PLAIN_KEYS = frozenset((str, int))
+
+
+def _key(key: Any) -> Any:
+    if type(key) in _PLAIN_KEYS:
+        return key
+    if isinstance(key, (datetime, date)):
+        return str(key)
+    if isinstance(key, np.integer):
+        return int(key)
+    if isinstance(key, np.floating):
+        return float(key)
+    if isinstance(key, tuple):
+        return str(key)
+    return key
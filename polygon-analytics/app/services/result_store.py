@@ -0,0 +1,134 @@
+"""Server-side storage for large tabular template results.
+
+Tables over ``result_inline_max_rows`` are written by the worker that
+produced them as Arrow IPC files; the response (and query_history) only
+carries a preview and a handle. Pages and streams are read back through a
+memory map, so serving a slice doesn't load the whole table.
+"""
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+HANDLE_ID = re.compile(r"^[0-9a-f]{32}$")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+
+
+def as_table(data: Any) -> Optional[pd.DataFrame]:
+    """DataFrame view of a template's tabular output, or None if it isn't a table"""
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, pd.Series):
+        return data.to_frame()
+    if isinstance(data, list) and data and all(isinstance(row, dict) for row in data):
+        return pd.DataFrame(data)
+    if isinstance(data, dict) and data and all(isinstance(v, (dict, list)) for v in data.values()):
+        # Column-oriented, e.g. df.to_dict() or df.to_dict('list')
+        try:
+            return pd.DataFrame(data)
+        except ValueError:
+            return None
+    return None
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    # Keep meaningful indexes (e.g. a groupby key, even a range-like one) as columns
+    df = df.reset_index(drop=isinstance(df.index, pd.RangeIndex) and df.index.name is None)
+    df.columns = [str(c) for c in df.columns]
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns: keep them, as text
+        mixed = {c: df[c].astype(str) for c in df.columns if df[c].dtype == object}
+        return pa.Table.from_pandas(df.assign(**mixed), preserve_index=False)
+
+
+def preview_records(df: pd.DataFrame, rows: int) -> List[Dict[str, Any]]:
+    """First rows of a table as records, with the same columns the stored copy has"""
+    return _to_arrow(df.head(rows)).to_pylist()
+
+
+class ResultStore:
+    """Arrow IPC files of large results, addressed by handle id"""
+
+    def __init__(self, directory: str, ttl_seconds: int = 86400, chunk_rows: int = 10000):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.chunk_rows = chunk_rows
+        self._last_purge = 0.0
+
+    def path(self, handle_id: str) -> str:
+        if not HANDLE_ID.match(handle_id):
+            raise KeyError(handle_id)
+        return os.path.join(self.directory, f"{handle_id}.arrow")
+
+    def put(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Write a table and return its handle"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._maybe_purge()
+        table = _to_arrow(df)
+        handle_id = uuid.uuid4().hex
+        tmp_path = os.path.join(self.directory, f".{handle_id}.tmp")
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=self.chunk_rows)
+        # Readers never see a half-written file
+        os.replace(tmp_path, self.path(handle_id))
+        return {
+            "id": handle_id,
+            "rows": table.num_rows,
+            "columns": table.column_names,
+            "bytes": os.path.getsize(self.path(handle_id)),
+        }
+
+    def _open(self, handle_id: str) -> pa.Table:
+        path = self.path(handle_id)
+        if not os.path.exists(path):
+            raise KeyError(handle_id)
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+    def info(self, handle_id: str) -> Dict[str, Any]:
+        table = self._open(handle_id)
+        return {"id": handle_id, "rows": table.num_rows, "columns": table.column_names}
+
+    def page(self, handle_id: str, offset: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        return self._open(handle_id).slice(offset, limit).to_pylist()
+
+    def iter_ndjson(self, handle_id: str) -> Iterator[bytes]:
+        """One JSON object per line, encoded a record batch at a time"""
+        for batch in self._open(handle_id).to_batches(max_chunksize=self.chunk_rows):
+            if batch.num_rows == 0:
+                continue
+            lines = [json.dumps(row, default=str) for row in batch.to_pylist()]
+            yield ("\n".join(lines) + "\n").encode()
+
+    def delete(self, handle_id: str) -> bool:
+        try:
+            os.remove(self.path(handle_id))
+            return True
+        except (KeyError, FileNotFoundError):
+            return False
+
+    def _maybe_purge(self):
+        # At most every few minutes; several worker processes share the directory
+        if time.time() - self._last_purge > 300:
+            self._last_purge = time.time()
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
@@ -1,3 +1,4 @@
+import ast
 import pandas as pd
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
@@ -6,11 +7,82 @@ from io import BytesIO
 import base64
 from typing import Dict, Any, Optional
 from datetime import datetime
+import json
+import threading
+import time
 import traceback
+from collections import OrderedDict
 from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.services.analytics_spec import run_spec
+from app.services.bar_rollups import load_bars
+from app.services.chart_store import ChartStore, is_plotly_figure, render_figure
+from app.services.tick_cache import load_cached_ticks
+from app.services.tick_loader import bind_session, load_ticks
+from app.services.result_cache import code_hash
+from app.services.result_serializer import to_jsonable
+from app.services.result_store import ResultStore, as_table, preview_records
+from app.services.template_lint import lint_template, rewrite_select_star
+from app.services.template_profiler import ExecutionProfile, current_profile
+
+# Builtins and modules templates may not use. Matched against names in the parsed code,
+# so comments, strings and dict keys such as bars["open"] are fine. Attributes are matched
+# on their name whatever they hang off: pd.io.common.os.system reaches os without importing it
+DANGEROUS_NAMES = {'__import__', '__builtins__', 'eval', 'exec', 'compile', 'open', 'file', 'input', 'raw_input'}
+DANGEROUS_MODULES = {'os', 'subprocess'}
+DANGEROUS_ATTRIBUTES = {('sys', 'exit')}
+DANGEROUS_ATTRIBUTE_NAMES = DANGEROUS_NAMES | DANGEROUS_MODULES | {
+    'system', 'popen', 'spawnv', 'spawnl', 'execv', 'execve', 'execl', 'execvp', 'fork', 'kill', 'exit', '_exit'
+}
+
+
+def dangerous_attribute(name: str) -> bool:
+    """Forbidden as an attribute anywhere in a chain; dunders reach __globals__, __subclasses__ and friends"""
+    return name in DANGEROUS_ATTRIBUTE_NAMES or (name.startswith('__') and name.endswith('__'))
+
+
+def dangerous_operation(tree: ast.AST) -> Optional[str]:
+    """The first forbidden builtin, module or call a template's AST uses, if any"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id in DANGEROUS_NAMES | DANGEROUS_MODULES:
+            return node.id
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split('.')[0] in DANGEROUS_MODULES:
+                    return alias.name
+        if isinstance(node, ast.ImportFrom) and (node.module or '').split('.')[0] in DANGEROUS_MODULES:
+            return node.module
+        if isinstance(node, ast.Attribute):
+            if isinstance(node.value, ast.Name) and (node.value.id, node.attr) in DANGEROUS_ATTRIBUTES:
+                return f"{node.value.id}.{node.attr}"
+            if dangerous_attribute(node.attr):
+                return node.attr
+        # getattr(builtins_module, 'eval') reaches the same functions by name
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'getattr'
+                and len(node.args) > 1 and isinstance(node.args[1], ast.Constant)
+                and isinstance(node.args[1].value, str) and dangerous_attribute(node.args[1].value)):
+            return node.args[1].value
+    return None
+
 
 class TemplateExecutor:
-    def __init__(self):
+    def __init__(self, cache_size: Optional[int] = None, profile_memory: Optional[bool] = None,
+                 result_store: Optional[ResultStore] = None, chart_store: Optional[ChartStore] = None):
+        settings = get_settings()
+        self.result_store = result_store or ResultStore(
+            settings.result_store_dir, ttl_seconds=settings.result_store_ttl_seconds
+        )
+        self.chart_store = chart_store or ChartStore(
+            settings.chart_store_dir, ttl_seconds=settings.chart_store_ttl_seconds
+        )
+        self.chart_format = settings.chart_format
+        self.inline_max_rows = settings.result_inline_max_rows
+        self.preview_rows = settings.result_preview_rows
+        self.profile_memory = profile_memory if profile_memory is not None else settings.template_profile_memory
+        # Compiled templates by code hash: {'code': code object, 'func': analyze_data or None}
+        self.cache_size = cache_size if cache_size is not None else settings.template_cache_size
+        self._compiled: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._compiled_lock = threading.Lock()
         self.globals_dict = {
             'pd': pd,
             'plt': plt,
@@ -18,122 +90,175 @@ class TemplateExecutor:
             'np': np,
             'datetime': datetime,
             'BytesIO': BytesIO,
-            'base64': base64
+            'base64': base64,
+            'load_bars': load_bars,
+            'load_ticks': load_ticks,
+            'load_cached_ticks': load_cached_ticks,
+            'run_spec': run_spec
         }
     
     def execute_template(self, code: str, db_session: Session, symbol: str, 
                         start_date: str, end_date: str) -> Dict[str, Any]:
-        """Execute a Python template and return results"""
+        """Execute a Python template and return results (with a 'profile' of the run)"""
+        profile = ExecutionProfile(trace_memory=self.profile_memory)
         try:
-            # Create a local namespace for execution
-            local_namespace = self.globals_dict.copy()
-            
-            # Add helper function for converting figures to base64
-            local_namespace['fig_to_base64'] = self._fig_to_base64
-            
-            # Convert dates to full timestamps if they're just dates
-            if len(start_date) == 10:  # Format: YYYY-MM-DD
-                start_date = f"{start_date} 00:00:00"
-            if len(end_date) == 10:  # Format: YYYY-MM-DD
-                end_date = f"{end_date} 23:59:59"
-            
-            # Execute the code to define the function
-            exec(code, local_namespace)
-            
-            # Check if analyze_data function was defined
-            if 'analyze_data' not in local_namespace:
-                raise ValueError("Template must define an 'analyze_data' function")
-            
-            # Call the analyze_data function
-            result = local_namespace['analyze_data'](
-                db_session, symbol, start_date, end_date
-            )
-            
-            # Ensure result is properly formatted
-            if not isinstance(result, dict):
-                result = {'type': 'table', 'data': result}
-            
-            # Convert any non-serializable objects in the result
-            result = self._make_json_serializable(result)
+            with profile:
+                analyze_data = self._load_function(code)
+                
+                # Convert dates to full timestamps if they're just dates
+                if len(start_date) == 10:  # Format: YYYY-MM-DD
+                    start_date = f"{start_date} 00:00:00"
+                if len(end_date) == 10:  # Format: YYYY-MM-DD
+                    end_date = f"{end_date} 23:59:59"
+                
+                # Call the analyze_data function
+                started = time.perf_counter()
+                with bind_session(db_session):
+                    result = analyze_data(db_session, symbol, start_date, end_date)
+                profile.analyze_seconds = time.perf_counter() - started
+                
+                # Ensure result is properly formatted
+                if not isinstance(result, dict):
+                    result = {'type': 'table', 'data': result}
+                
+                # Convert any non-serializable objects in the result
+                started = time.perf_counter()
+                result = self._store_large_table(result)
+                result = self._store_chart(result)
+                result = to_jsonable(result)
+                profile.payload_bytes = len(json.dumps(result, default=str))
+                profile.serialize_seconds = time.perf_counter() - started
             
             return {
                 'success': True,
                 'result': result,
-                'error': None
+                'error': None,
+                'profile': profile.as_dict()
             }
             
         except Exception as e:
             return {
                 'success': False,
                 'result': None,
-                'error': f"Execution error: {str(e)}\n{traceback.format_exc()}"
+                'error': f"Execution error: {str(e)}\n{traceback.format_exc()}",
+                'profile': profile.as_dict()
             }
     
+    def _store_large_table(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Large tables go to the result store; the response keeps a preview and a handle"""
+        table = as_table(result.get('data'))
+        if table is None or len(table) <= self.inline_max_rows:
+            return result
+        handle = self.result_store.put(table)
+        return {**result, 'data': preview_records(table, self.preview_rows), 'data_handle': handle}
+    
+    def _store_chart(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Inline base64 PNGs (fig_to_base64, hand-rolled savefig) go to the chart store as well"""
+        chart = result.get('chart')
+        if self.chart_format == 'inline' or not isinstance(chart, str):
+            return result
+        started = time.perf_counter()
+        ref = self.chart_store.put_base64(chart)
+        profile = current_profile()
+        if profile is not None:
+            profile.add_chart(time.perf_counter() - started)
+        return result if ref is None else {**result, 'chart': ref}
+    
+    def _cache_entry(self, code: str) -> Dict[str, Any]:
+        """Compiled code object for a template, from the LRU or freshly compiled"""
+        key = code_hash(code)
+        with self._compiled_lock:
+            entry = self._compiled.get(key)
+            if entry is not None:
+                self._compiled.move_to_end(key)
+                return entry
+        
+        # Compile outside the lock; a racing duplicate compile is harmless
+        entry = {'code': compile(code, '<template>', 'exec'), 'func': None}
+        with self._compiled_lock:
+            self._compiled[key] = entry
+            while len(self._compiled) > self.cache_size:
+                self._compiled.popitem(last=False)
+        return entry
+    
+    def _load_function(self, code: str):
+        """analyze_data defined by a template, executing its module body only once"""
+        entry = self._cache_entry(code)
+        if entry['func'] is None:
+            # Create a namespace for the template's module-level definitions
+            namespace = self.globals_dict.copy()
+            
+            # Add helper functions for rendering figures
+            namespace['fig_to_base64'] = self._fig_to_base64
+            namespace['render_chart'] = self._render_chart
+            
+            exec(entry['code'], namespace)
+            
+            # Check if analyze_data function was defined
+            if not callable(namespace.get('analyze_data')):
+                raise ValueError("Template must define an 'analyze_data' function")
+            entry['func'] = namespace['analyze_data']
+        return entry['func']
+    
+    def cache_info(self) -> Dict[str, int]:
+        return {'entries': len(self._compiled), 'max_entries': self.cache_size}
+    
     def _fig_to_base64(self, fig) -> str:
         """Convert matplotlib figure to base64 string"""
+        started = time.perf_counter()
         buffer = BytesIO()
         fig.savefig(buffer, format='png', bbox_inches='tight')
         buffer.seek(0)
         img_str = base64.b64encode(buffer.getvalue()).decode()
         plt.close(fig)
+        profile = current_profile()
+        if profile is not None:
+            profile.add_chart(time.perf_counter() - started)
         return img_str
     
-    def _make_json_serializable(self, obj):
-        """Convert non-JSON-serializable objects to serializable format"""
-        import pandas as pd
-        import numpy as np
-        from datetime import datetime, date
+    def _render_chart(self, fig, format: Optional[str] = None, dpi: Optional[int] = None):
+        """Template helper: a chart reference for fig.
         
-        if isinstance(obj, dict):
-            # Convert both keys and values to be JSON serializable
-            result = {}
-            for k, v in obj.items():
-                # Convert key if it's a non-serializable type
-                if isinstance(k, (pd.Timestamp, datetime, date)):
-                    key = str(k)
-                elif isinstance(k, (np.integer, np.int64)):
-                    key = int(k)
-                elif isinstance(k, (np.floating, np.float64)):
-                    key = float(k)
-                else:
-                    key = k
-                # Convert value recursively
-                result[key] = self._make_json_serializable(v)
-            return result
-        elif isinstance(obj, list):
-            return [self._make_json_serializable(item) for item in obj]
-        elif isinstance(obj, (pd.Timestamp, datetime, date)):
-            return str(obj)
-        elif isinstance(obj, (np.integer, np.int64)):
-            return int(obj)
-        elif isinstance(obj, (np.floating, np.float64)):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif pd.isna(obj):
-            return None
-        else:
-            return obj
+        matplotlib figures are rendered (PNG, or SVG with format='svg') into the
+        chart store and come back as {'chart_id', 'format', 'url', 'bytes'};
+        plotly figures and Vega-Lite spec dicts are returned as a spec for the
+        frontend to draw.
+        """
+        if is_plotly_figure(fig):
+            return {'format': 'plotly', 'spec': json.loads(fig.to_json())}
+        if isinstance(fig, dict):
+            return {'format': 'vega-lite', 'spec': fig}
+        
+        fmt = format or self.chart_format
+        started = time.perf_counter()
+        try:
+            if fmt == 'inline':
+                return base64.b64encode(render_figure(fig, 'png', dpi)).decode()
+            return self.chart_store.put(render_figure(fig, fmt, dpi), fmt)
+        finally:
+            plt.close(fig)
+            profile = current_profile()
+            if profile is not None:
+                profile.add_chart(time.perf_counter() - started)
     
-    def validate_template(self, code: str) -> Dict[str, Any]:
-        """Validate that a template is safe and properly formatted"""
+    def validate_template(self, code: str, rewrite: bool = False) -> Dict[str, Any]:
+        """Validate that a template is safe and properly formatted.
+        
+        Valid templates also get performance 'warnings' (see template_lint); with
+        rewrite, SELECT * over tick_data is narrowed to the columns the code uses
+        and the new 'code' is returned along with 'rewritten_columns'.
+        """
         try:
             # Check for dangerous operations
-            dangerous_keywords = [
-                '__import__', 'eval', 'exec', 'compile', 
-                'open', 'file', 'input', 'raw_input',
-                'os.', 'subprocess', 'sys.exit'
-            ]
-            
-            for keyword in dangerous_keywords:
-                if keyword in code:
-                    return {
-                        'valid': False,
-                        'error': f"Template contains potentially dangerous operation: {keyword}"
-                    }
+            keyword = dangerous_operation(ast.parse(code))
+            if keyword is not None:
+                return {
+                    'valid': False,
+                    'error': f"Template contains potentially dangerous operation: {keyword}"
+                }
             
-            # Try to compile the code
-            compile(code, '<string>', 'exec')
+            # Try to compile the code (cached, so a later execution reuses it)
+            self._cache_entry(code)
             
             # Check if it defines analyze_data function
             if 'def analyze_data' not in code:
@@ -142,7 +267,13 @@ class TemplateExecutor:
                     'error': "Template must define an 'analyze_data' function"
                 }
             
-            return {'valid': True, 'error': None}
+            result = {'valid': True, 'error': None, 'warnings': lint_template(code)}
+            if rewrite:
+                rewritten, columns = rewrite_select_star(code)
+                if columns:
+                    self._cache_entry(rewritten)
+                    result.update(code=rewritten, warnings=lint_template(rewritten), rewritten_columns=columns)
+            return result
             
         except SyntaxError as e:
             return {
@@ -0,0 +1,165 @@
+"""Performance lint for template code.
+
+Flags the query patterns that make templates scan far more of tick_data
+than they use:
+
+    select-star             SELECT * FROM tick_data (drags conditions JSON and created_at along)
+    missing-symbol-filter   a tick_data query without a symbol predicate
+    missing-time-filter     a tick_data query without a timestamp predicate
+    python-aggregation      groupby/resample in pandas over raw ticks that SQL or load_bars could do
+    row-loop                iterrows/itertuples or apply(axis=1)
+
+SQL is found in the template's string literals (f-strings included). The
+only rewrite offered is replacing ``SELECT *`` with the tick_data columns
+the code actually references.
+"""
+import ast
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+TICK_COLUMNS = ['id', 'symbol', 'timestamp', 'price', 'size', 'exchange', 'conditions', 'created_at']
+
+_TICK_SQL = re.compile(r"\bfrom\s+tick_data\b", re.IGNORECASE)
+_SELECT_STAR = re.compile(r"\bselect\s+\*", re.IGNORECASE)
+_GROUP_BY = re.compile(r"\bgroup\s+by\b", re.IGNORECASE)
+_SYMBOL_FILTER = re.compile(r"\bsymbol\s*(=|in\b)", re.IGNORECASE)
+_TIME_FILTER = re.compile(r"\btimestamp\s*(>=?|<=?|between\b)", re.IGNORECASE)
+
+TICK_LOADERS = {'load_ticks', 'load_cached_ticks'}
+AGGREGATIONS = {'groupby', 'resample', 'pivot_table'}
+ROW_LOOPS = {'iterrows', 'itertuples'}
+SQL_CALLS = {'execute', 'read_sql', 'read_sql_query'}
+
+
+def _sql_text(node: ast.AST) -> Optional[str]:
+    """A string literal's text; an f-string's literal parts with {} for each placeholder"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        return "".join(v.value if isinstance(v, ast.Constant) else "{}" for v in node.values)
+    return None
+
+
+def _call_name(node: ast.Call) -> Optional[str]:
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return None
+
+
+def _parse(code: str) -> ast.AST:
+    tree = ast.parse(code)
+    for parent in ast.walk(tree):
+        for child in ast.iter_child_nodes(parent):
+            child.parent = parent
+    return tree
+
+
+def _tick_queries(tree: ast.AST) -> List[Tuple[ast.AST, str]]:
+    nodes = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(getattr(node, 'parent', None), ast.JoinedStr):
+            continue  # judged as part of its f-string
+        text = _sql_text(node)
+        if text and _TICK_SQL.search(text):
+            nodes.append((node, text))
+    return sorted(nodes, key=lambda item: (item[0].lineno, item[0].col_offset))
+
+
+def _warning(rule: str, node: ast.AST, message: str) -> Dict[str, Any]:
+    return {'rule': rule, 'line': getattr(node, 'lineno', None), 'message': message}
+
+
+def lint_template(code: str) -> List[Dict[str, Any]]:
+    """Warnings ({'rule', 'line', 'message'}) for slow query patterns; code must parse"""
+    tree = _parse(code)
+    warnings = []
+
+    raw_ticks = False
+    for node, sql in _tick_queries(tree):
+        if _SELECT_STAR.search(sql):
+            columns = used_columns(tree)
+            hint = f"select only {', '.join(columns)}" if columns else "name the columns you need"
+            warnings.append(_warning('select-star', node, f"SELECT * reads every tick_data column; {hint}"))
+        if not _SYMBOL_FILTER.search(sql):
+            warnings.append(_warning('missing-symbol-filter', node,
+                                     "tick_data query without a symbol predicate scans every symbol"))
+        if not _TIME_FILTER.search(sql):
+            warnings.append(_warning('missing-time-filter', node,
+                                     "tick_data query without a timestamp range scans every partition"))
+        raw_ticks = raw_ticks or not _GROUP_BY.search(sql)
+
+    calls = sorted((node for node in ast.walk(tree) if isinstance(node, ast.Call)),
+                   key=lambda node: (node.lineno, node.col_offset))
+    raw_ticks = raw_ticks or any(_call_name(node) in TICK_LOADERS for node in calls)
+    for node in calls:
+        name = _call_name(node)
+        if name in AGGREGATIONS and raw_ticks:
+            warnings.append(_warning('python-aggregation', node,
+                                     f".{name}() over raw ticks in pandas; aggregate in SQL (GROUP BY, "
+                                     f"DATE_TRUNC) or read pre-aggregated bars with load_bars"))
+        elif name in ROW_LOOPS:
+            warnings.append(_warning('row-loop', node, f".{name}() loops in Python; use vectorized column operations"))
+        elif name == 'apply' and any(
+            kw.arg == 'axis' and isinstance(kw.value, ast.Constant) and kw.value.value in (1, 'columns')
+            for kw in node.keywords
+        ):
+            warnings.append(_warning('row-loop', node,
+                                     ".apply(axis=1) calls Python per row; use vectorized column operations"))
+    return sorted(warnings, key=lambda warning: warning['line'])
+
+
+def used_columns(tree: ast.AST) -> List[str]:
+    """tick_data columns the code names (df['price'], df.price, columns=[...]), in table order"""
+    # Keys of a query's bind parameters ({'symbol': symbol}) aren't column reads
+    params = {
+        id(key) for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and _call_name(node) in SQL_CALLS
+        for arg in list(node.args) + [kw.value for kw in node.keywords] if isinstance(arg, ast.Dict)
+        for key in arg.keys
+    }
+    named = {
+        node.value for node in ast.walk(tree)
+        if isinstance(node, ast.Constant) and node.value in TICK_COLUMNS and id(node) not in params
+    }
+    named |= {node.attr for node in ast.walk(tree) if isinstance(node, ast.Attribute) and node.attr in TICK_COLUMNS}
+    return [column for column in TICK_COLUMNS if column in named]
+
+
+def _positional_access(tree: ast.AST) -> bool:
+    return any(
+        (isinstance(node, ast.Attribute) and node.attr in ('iloc', 'iat'))
+        or (isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant)
+            and type(node.slice.value) is int)
+        for node in ast.walk(tree)
+    )
+
+
+def _offset(lines: List[str], lineno: int, col_offset: int) -> int:
+    # ast column offsets count UTF-8 bytes
+    line = lines[lineno - 1]
+    return sum(len(l) for l in lines[:lineno - 1]) + len(line.encode()[:col_offset].decode(errors='ignore'))
+
+
+def rewrite_select_star(code: str) -> Tuple[str, List[str]]:
+    """code with each SELECT * over tick_data narrowed to the referenced columns, and those columns.
+
+    Left unchanged (with an empty list) when no tick_data column is referenced
+    by name or rows/columns are read by position (row[3], iloc), since the
+    needed columns can't be told then.
+    """
+    tree = _parse(code)
+    columns = used_columns(tree)
+    targets = [node for node, sql in _tick_queries(tree) if _SELECT_STAR.search(sql)]
+    if not columns or not targets or _positional_access(tree):
+        return code, []
+
+    lines = code.splitlines(keepends=True)
+    for node in reversed(targets):
+        start = _offset(lines, node.lineno, node.col_offset)
+        end = _offset(lines, node.end_lineno, node.end_col_offset)
+        segment = _SELECT_STAR.sub(lambda m: m.group(0)[:-1] + ", ".join(columns), code[start:end])
+        code = code[:start] + segment + code[end:]
+    return code, columns
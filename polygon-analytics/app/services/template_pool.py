@@ -0,0 +1,178 @@
+import asyncio
+import multiprocessing
+import uuid
+from typing import Any, Dict, Optional
+
+
+class TemplatePoolFull(Exception):
+    """More executions are waiting than the pool's queue limit allows"""
+
+
+class TemplateTimeout(Exception):
+    """An execution ran past its timeout and its worker was killed"""
+
+
+class TemplateCancelled(Exception):
+    """An execution was cancelled through TemplateWorkerPool.cancel"""
+
+
+def _worker_main(conn):
+    """Worker process loop: one TemplateExecutor and DB session factory per process"""
+    import matplotlib
+    matplotlib.use("Agg")
+
+    from app.models.database import SessionLocal
+    from app.services.template_executor import TemplateExecutor
+
+    executor = TemplateExecutor()
+    conn.send("ready")
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        db = SessionLocal()
+        try:
+            result = executor.execute_template(
+                job["code"], db, job["symbol"], job["start_date"], job["end_date"]
+            )
+        finally:
+            db.close()
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class TemplateWorkerPool:
+    """Runs templates in dedicated worker processes, off the event loop.
+
+    matplotlib and most template code aren't thread-safe, so each worker is
+    a separate process with its own executor (and compiled-template cache).
+    A worker whose execution times out or is cancelled is killed and
+    replaced, since there's no safe way to interrupt arbitrary template code.
+    """
+
+    def __init__(self, workers: int = 2, timeout_seconds: float = 60.0,
+                 max_queue: int = 32, start_method: str = "spawn"):
+        self.size = workers
+        self.timeout_seconds = timeout_seconds
+        self.max_queue = max_queue
+        self.startup_timeout_seconds = 120.0
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled = set()
+
+    def start(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._add_worker()
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.kill()
+        self._workers = []
+
+    def _add_worker(self):
+        worker = _Worker(self._ctx)
+        self._workers.append(worker)
+        self._idle.put_nowait(worker)
+
+    async def _replace(self, worker: _Worker):
+        self._workers.remove(worker)
+        self._add_worker()
+        # terminate() + join() can take seconds on a stuck worker; keep serving meanwhile
+        await asyncio.to_thread(worker.kill)
+
+    async def execute(self, code: str, symbol: str, start_date: str, end_date: str,
+                      execution_id: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run a template on the next free worker; returns the executor's result dict"""
+        if self._idle is None:
+            self.start()
+        queued = len(self._running) - self.size
+        if queued >= self.max_queue:
+            raise TemplatePoolFull(f"{queued} template executions already queued")
+
+        execution_id = execution_id or uuid.uuid4().hex
+        job = {"code": code, "symbol": symbol, "start_date": start_date, "end_date": end_date}
+        task = asyncio.ensure_future(self._run(job, timeout or self.timeout_seconds))
+        self._running[execution_id] = task
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if execution_id in self._cancelled:
+                raise TemplateCancelled(f"Execution {execution_id} cancelled")
+            # The request itself went away; don't leave the template running
+            task.cancel()
+            raise
+        finally:
+            self._running.pop(execution_id, None)
+            self._cancelled.discard(execution_id)
+
+    async def _run(self, job: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        worker = await self._idle.get()
+        healthy = False
+        try:
+            if not worker.ready:
+                # Importing pandas/matplotlib doesn't count against the template's timeout
+                await self._recv(worker, self.startup_timeout_seconds)
+                worker.ready = True
+            worker.conn.send(job)
+            result = await self._recv(worker, timeout)
+            healthy = True
+            return result
+        except asyncio.TimeoutError:
+            raise TemplateTimeout(f"Template execution exceeded {timeout:.0f}s")
+        except EOFError:
+            raise RuntimeError("Template worker exited unexpectedly")
+        finally:
+            if healthy:
+                self._idle.put_nowait(worker)
+            else:
+                await self._replace(worker)
+
+    async def _recv(self, worker: _Worker, timeout: float):
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = worker.conn.fileno()
+        loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            await asyncio.wait_for(readable, timeout)
+        finally:
+            loop.remove_reader(fd)
+        # The message may still be arriving, so finish reading off the loop
+        return await asyncio.to_thread(worker.conn.recv)
+
+    def cancel(self, execution_id: str) -> bool:
+        task = self._running.get(execution_id)
+        if task is None or task.done():
+            return False
+        self._cancelled.add(execution_id)
+        task.cancel()
+        return True
+
+    def _busy(self) -> int:
+        return self.size - self._idle.qsize() if self._idle is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.size,
+            "running": self._busy(),
+            "queued": max(0, len(self._running) - self.size),
+            "max_queue": self.max_queue,
+        }
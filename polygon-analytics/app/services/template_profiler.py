@@ -0,0 +1,103 @@
+"""Per-execution profiling for template runs.
+
+DB time and rows fetched are measured with SQLAlchemy cursor events, chart
+time by the chart helpers (render_chart, fig_to_base64), and peak memory
+with tracemalloc (which sees numpy and pandas buffers too). Whatever is left
+of analyze_data's wall time is attributed to pandas/Python work.
+"""
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class ExecutionProfile:
+    """Timings and sizes collected while one template executes"""
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.wall_seconds = 0.0
+        self.analyze_seconds = 0.0
+        self.db_seconds = 0.0
+        self.chart_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.queries = 0
+        self.rows_fetched = 0
+        self.payload_bytes = 0
+        self.peak_memory_bytes: Optional[int] = None
+        self._started = None
+        self._tracing = False
+
+    def __enter__(self):
+        _local.profile = self
+        # Another tracer (e.g. a debugging session) keeps ownership of tracemalloc
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_seconds = time.perf_counter() - self._started
+        if self._tracing:
+            self.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._tracing = False
+        _local.profile = None
+        return False
+
+    def add_query(self, seconds: float, rows: int):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.rows_fetched += rows
+
+    def add_chart(self, seconds: float):
+        self.chart_seconds += seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        pandas_seconds = max(0.0, self.analyze_seconds - self.db_seconds - self.chart_seconds)
+        return {
+            'wall_seconds': round(self.wall_seconds, 4),
+            'db_seconds': round(self.db_seconds, 4),
+            'pandas_seconds': round(pandas_seconds, 4),
+            'chart_seconds': round(self.chart_seconds, 4),
+            'serialize_seconds': round(self.serialize_seconds, 4),
+            'queries': self.queries,
+            'rows_fetched': self.rows_fetched,
+            'payload_bytes': self.payload_bytes,
+            'peak_memory_bytes': self.peak_memory_bytes,
+        }
+
+
+def current_profile() -> Optional[ExecutionProfile]:
+    return getattr(_local, 'profile', None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None:
+        conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    starts = conn.info.get('profile_query_start')
+    if profile is None or not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+    # psycopg2 buffers the whole result on execute, so rowcount is the rows returned
+    rows = cursor.rowcount if cursor.description is not None and cursor.rowcount > 0 else 0
+    profile.add_query(seconds, rows)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    starts = context.connection.info.get('profile_query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
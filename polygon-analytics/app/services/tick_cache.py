@@ -0,0 +1,261 @@
+"""Columnar cache of tick_data for hot symbols.
+
+One uncompressed Arrow IPC file per symbol per UTC day, written once the
+coverage ledger says the day is fully ingested. Reads memory-map the files,
+so a week of ticks costs page-cache reads rather than a row-by-row fetch;
+days without a file fall back to a COPY from tick_data.
+
+    python -m app.services.tick_cache build AAPL 2024-01-02 2024-01-31
+    python -m app.services.tick_cache prune --days 30
+"""
+import argparse
+import os
+import shutil
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.models import IngestCoverage
+from app.services.coverage_ledger import NS_PER_DAY, day_start_ns
+from app.services.tick_loader import copy_ticks, tick_bounds
+
+TICK_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('price', pa.float64()),
+    ('size', pa.int64()),
+    ('exchange', pa.string()),
+    ('conditions', pa.string()),  # JSON text
+])
+
+
+def query_ticks(db: Session, symbol: str, start: datetime, end: datetime,
+                columns: Optional[List[str]] = None) -> pa.Table:
+    """[start, end) of a symbol's ticks from tick_data, in (a subset of) TICK_SCHEMA"""
+    schema = pa.schema([TICK_SCHEMA.field(name) for name in columns or TICK_SCHEMA.names])
+    arrays = copy_ticks(db, symbol, start, end, schema.names)
+    if 'timestamp' in arrays:
+        arrays['timestamp'] = arrays['timestamp'].astype('datetime64[us]')
+    return pa.Table.from_arrays(
+        [pa.array(arrays[field.name], type=field.type, from_pandas=True) for field in schema],
+        schema=schema
+    )
+
+
+class TickColumnCache:
+    """Per symbol/day Arrow IPC files of tick_data.
+
+    ``symbols`` is a comma-separated list of symbols to cache, ``*`` for
+    every symbol, or empty to disable the tier.
+    """
+
+    def __init__(self, directory: str, symbols: str = ""):
+        self.directory = directory
+        spec = {s.strip().upper() for s in symbols.split(",") if s.strip()}
+        self.all_symbols = "*" in spec
+        self.symbols = spec - {"*"}
+        self._building = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.all_symbols or bool(self.symbols)
+
+    def caches(self, symbol: str) -> bool:
+        return self.all_symbols or symbol.upper() in self.symbols
+
+    def path(self, symbol: str, day: date) -> str:
+        return os.path.join(self.directory, symbol.upper(), f"{day:%Y%m%d}.arrow")
+
+    def read_day(self, symbol: str, day: date) -> Optional[pa.Table]:
+        """The day's ticks, memory-mapped (zero-copy), or None if not cached"""
+        try:
+            source = pa.memory_map(self.path(symbol, day), "r")
+        except FileNotFoundError:
+            return None
+        return pa.ipc.open_file(source).read_all()
+
+    def _fully_covered(self, db: Session, symbol: str, day: date) -> bool:
+        covered = db.query(IngestCoverage.covered_until_ns).filter(
+            IngestCoverage.symbol == symbol.upper(),
+            IngestCoverage.day == day
+        ).scalar()
+        return covered is not None and covered >= day_start_ns(day) + NS_PER_DAY
+
+    def build_day(self, db: Session, symbol: str, day: date) -> bool:
+        """Write the day's file from tick_data; only fully ingested days are cached"""
+        symbol = symbol.upper()
+        key = (symbol, day)
+        with self._lock:
+            if key in self._building:
+                return False
+            self._building.add(key)
+        try:
+            if not self._fully_covered(db, symbol, day):
+                return False
+            start = datetime(day.year, day.month, day.day)
+            table = query_ticks(db, symbol, start, start + timedelta(days=1))
+            path = self.path(symbol, day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp.{os.getpid()}"
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, TICK_SCHEMA) as writer:
+                    writer.write_table(table)
+            # Readers see either the old file or the whole new one
+            os.replace(tmp_path, path)
+            return True
+        finally:
+            with self._lock:
+                self._building.discard(key)
+
+    def invalidate_days(self, symbol: str, days: List[date]):
+        for day in days:
+            try:
+                os.remove(self.path(symbol, day))
+            except FileNotFoundError:
+                pass
+
+    def refresh(self, symbol: str, ranges_fetched: List[List[str]]) -> int:
+        """Rewrite the files for every day a fetch touched; returns files written"""
+        from app.models.database import SessionLocal
+
+        if not self.caches(symbol):
+            return 0
+        days = set()
+        for start_ts, end_ts in ranges_fetched:
+            lo = datetime.fromisoformat(start_ts).date()
+            # Ranges are half-open, so an end at midnight doesn't touch that day
+            hi = (datetime.fromisoformat(end_ts) - timedelta(microseconds=1)).date()
+            days.update(lo + timedelta(days=i) for i in range((hi - lo).days + 1))
+        self.invalidate_days(symbol, sorted(days))
+
+        db = SessionLocal()
+        try:
+            return sum(self.build_day(db, symbol, day) for day in sorted(days))
+        except Exception as e:
+            print(f"Tick cache refresh for {symbol} failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def clear_symbol(self, symbol: str):
+        shutil.rmtree(os.path.join(self.directory, symbol.upper()), ignore_errors=True)
+
+    def _remove_days(self, start: str, end: str) -> int:
+        """Delete every symbol's files for YYYYMMDD days in [start, end)"""
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".arrow") and start <= name[:8] < end:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
+
+    def prune(self, days: int) -> int:
+        """Delete files for days older than ``days`` (mirrors partition retention)"""
+        return self._remove_days("", f"{date.today() - timedelta(days=days):%Y%m%d}")
+
+    def evict_range(self, start: date, end: date) -> int:
+        """Delete every symbol's files for days in [start, end), e.g. a dropped partition's"""
+        return self._remove_days(f"{start:%Y%m%d}", f"{end:%Y%m%d}")
+
+    def load(self, db: Session, symbol: str, start_date: str, end_date: str,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Ticks for [start_date, end_date] from cached days, tick_data for the rest"""
+        symbol = symbol.upper()
+        columns = list(columns or TICK_SCHEMA.names)
+        start, end = tick_bounds(start_date, end_date)
+        pieces = []
+        missing_start = None
+        day = start.date()
+        while datetime(day.year, day.month, day.day) < end:
+            day_start = datetime(day.year, day.month, day.day)
+            lo, hi = max(start, day_start), min(end, day_start + timedelta(days=1))
+            table = self.read_day(symbol, day) if self.caches(symbol) else None
+            if table is None:
+                missing_start = missing_start or lo
+            else:
+                if missing_start is not None:
+                    # Consecutive uncached days are copied from tick_data in one go
+                    pieces.append(query_ticks(db, symbol, missing_start, lo, columns))
+                    missing_start = None
+                pieces.append(self._slice(table, lo, hi).select(columns))
+            day += timedelta(days=1)
+        if missing_start is not None:
+            pieces.append(query_ticks(db, symbol, missing_start, end, columns))
+
+        if not pieces:
+            pieces.append(pa.schema([TICK_SCHEMA.field(name) for name in columns]).empty_table())
+        table = pa.concat_tables(pieces)
+        # split_blocks keeps single-chunk numeric columns as views on the mapped file
+        return table.to_pandas(split_blocks=True, coerce_temporal_nanoseconds=True)
+
+    @staticmethod
+    def _slice(table: pa.Table, lo: datetime, hi: datetime) -> pa.Table:
+        """Rows with lo <= timestamp < hi; day files are sorted, so two binary searches"""
+        ts = table.column('timestamp').combine_chunks().cast(pa.int64()).to_numpy()
+        bounds = np.array([lo, hi], dtype='datetime64[us]').astype(np.int64)
+        first, last = np.searchsorted(ts, bounds, side='left')
+        return table.slice(first, last - first)
+
+
+_default_cache: Optional[TickColumnCache] = None
+
+
+def get_tick_cache() -> TickColumnCache:
+    global _default_cache
+    if _default_cache is None:
+        settings = get_settings()
+        _default_cache = TickColumnCache(settings.tick_cache_dir, settings.tick_cache_symbols)
+    return _default_cache
+
+
+def load_cached_ticks(db_session, symbol: str, start_date: str, end_date: str,
+                      columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Template helper: ticks for a symbol/range, memory-mapped from the columnar cache.
+
+    Columns are timestamp, price, size, exchange and conditions (JSON text);
+    days not in the cache are read from tick_data.
+    """
+    return get_tick_cache().load(db_session, symbol, start_date, end_date, columns)
+
+
+def main():
+    from app.models.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Columnar tick cache maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="write files for fully ingested days")
+    build.add_argument("symbol")
+    build.add_argument("start_date")
+    build.add_argument("end_date")
+    prune = sub.add_parser("prune", help="delete files older than N days")
+    prune.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    cache = get_tick_cache()
+    if args.command == "prune":
+        print(f"Removed {cache.prune(args.days)} file(s)")
+        return
+
+    start = datetime.strptime(args.start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(args.end_date, "%Y-%m-%d").date()
+    db = SessionLocal()
+    try:
+        written: Dict[str, bool] = {}
+        for i in range((end - start).days + 1):
+            day = start + timedelta(days=i)
+            written[f"{day}"] = cache.build_day(db, args.symbol, day)
+        built = [day for day, ok in written.items() if ok]
+        print(f"Cached {len(built)} day(s) for {args.symbol.upper()}: {', '.join(built) or '-'}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
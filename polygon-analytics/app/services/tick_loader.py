@@ -0,0 +1,181 @@
+"""Fast tick loading for templates: COPY TO straight into NumPy columns.
+
+Fixed-width column sets (id, timestamp, price, size) are copied in
+PostgreSQL's binary format and read in place through a structured dtype, so
+no per-row Python objects are ever built. Asking for a text column
+(exchange, conditions) switches to CSV, which pandas' C reader parses with
+explicit dtypes.
+"""
+import io
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as time_of_day, timedelta
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from app.services.template_profiler import current_profile
+
+PG_EPOCH_US = 946_684_800_000_000  # 2000-01-01 in Unix microseconds
+BINARY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+# name: (binary COPY expression, big-endian dtype or None for variable width, CSV expression)
+TICK_COLUMNS = {
+    'id': ('id', '>i8', 'id'),
+    'timestamp': ('timestamp', '>i8', 'CAST(EXTRACT(EPOCH FROM timestamp) * 1000000 AS BIGINT)'),
+    'price': ('price', '>f8', 'price'),
+    'size': ('size', '>i4', 'size'),
+    'exchange': (None, None, 'exchange'),
+    'conditions': (None, None, 'conditions::text'),
+}
+DEFAULT_COLUMNS = ['timestamp', 'price', 'size']
+CSV_DTYPES = {'id': 'int64', 'timestamp': 'int64', 'price': 'float64', 'size': 'int64',
+              'exchange': object, 'conditions': object}
+
+_local = threading.local()
+
+
+@contextmanager
+def bind_session(db_session):
+    """Make db_session the one load_ticks uses on this thread (set per template execution)"""
+    previous = getattr(_local, 'session', None)
+    _local.session = db_session
+    try:
+        yield
+    finally:
+        _local.session = previous
+
+
+def tick_bounds(start_date: str, end_date: str):
+    """Template date bounds as a half-open [start, end) datetime range.
+
+    Bare end dates cover the day, and so does an end of exactly 23:59:59 (what
+    TemplateExecutor expands bare dates to), which would otherwise drop the
+    day's last second.
+    """
+    start = datetime.fromisoformat(start_date if len(start_date) > 10 else f"{start_date} 00:00:00")
+    end = datetime.fromisoformat(end_date if len(end_date) > 10 else f"{end_date} 23:59:59.999999")
+    if end.time() == time_of_day(23, 59, 59):
+        end = end.replace(microsecond=999999)
+    return start, end + timedelta(microseconds=1)
+
+
+def _parse_binary(payload: bytes, columns: List[str]) -> Dict[str, np.ndarray]:
+    if not payload.startswith(BINARY_SIGNATURE):
+        raise ValueError("Unexpected COPY BINARY header")
+    offset = 19 + struct.unpack_from(">i", payload, 15)[0]
+    fields = [('nfields', '>i2')]
+    for name in columns:
+        fields += [(f'{name}__len', '>i4'), (name, TICK_COLUMNS[name][1])]
+    row = np.dtype(fields)
+    count = (len(payload) - offset - 2) // row.itemsize  # 2-byte trailer
+    records = np.frombuffer(payload, dtype=row, count=count, offset=offset)
+    for name in columns:
+        # NULLs would shift the fixed layout; these columns are NOT NULL
+        if count and not (records[f'{name}__len'] == row[name].itemsize).all():
+            raise ValueError(f"Unexpected NULL or width in column {name}")
+    return {name: records[name].astype(row[name].newbyteorder('=')) for name in columns}
+
+
+def _parse_csv(payload: bytes, columns: List[str]) -> Dict[str, np.ndarray]:
+    if not payload:
+        return {name: np.array([], dtype=CSV_DTYPES[name]) for name in columns}
+    # round_trip: PostgreSQL prints the shortest exact float text, keep it bit-identical
+    frame = pd.read_csv(io.BytesIO(payload), header=None, names=columns, float_precision='round_trip',
+                        dtype={name: CSV_DTYPES[name] for name in columns})
+    return {name: frame[name].to_numpy() for name in columns}
+
+
+def copy_ticks(db_session, symbol: str, start: datetime, end: datetime, columns: List[str],
+               after: Optional[tuple] = None, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """[start, end) of a symbol's ticks as typed arrays, ordered by timestamp.
+
+    ``after`` = (timestamp, id) resumes a keyset scan; timestamps come back
+    as datetime64[ns].
+    """
+    binary = all(TICK_COLUMNS[name][1] for name in columns)
+    select = ", ".join(TICK_COLUMNS[name][0 if binary else 2] for name in columns)
+    where = "symbol = %(symbol)s AND timestamp >= %(start)s AND timestamp < %(end)s"
+    params = {"symbol": symbol, "start": start, "end": end}
+    order = "timestamp"
+    if after is not None:
+        where += " AND (timestamp, id) > (%(after_ts)s, %(after_id)s)"
+        params.update(after_ts=after[0], after_id=after[1])
+    if after is not None or limit is not None:
+        order = "timestamp, id"
+    query = f"SELECT {select} FROM tick_data WHERE {where} ORDER BY {order}"
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+
+    cursor = db_session.connection().connection.cursor()
+    try:
+        started = time.perf_counter()
+        buffer = io.BytesIO()
+        sql = cursor.mogrify(query, params).decode()
+        cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT {'binary' if binary else 'csv'})", buffer)
+        seconds = time.perf_counter() - started
+    finally:
+        cursor.close()
+
+    payload = buffer.getvalue()
+    arrays = _parse_binary(payload, columns) if binary else _parse_csv(payload, columns)
+    profile = current_profile()
+    if profile is not None:
+        # COPY bypasses SQLAlchemy's cursor events, so credit the profile directly
+        profile.add_query(seconds, len(next(iter(arrays.values()))) if arrays else 0)
+
+    if 'timestamp' in arrays:
+        micros = arrays['timestamp'] + (PG_EPOCH_US if binary else 0)
+        arrays['timestamp'] = micros.astype('datetime64[us]').astype('datetime64[ns]')
+    if 'size' in arrays:
+        arrays['size'] = arrays['size'].astype(np.int64)
+    return arrays
+
+
+def _iter_chunks(db_session, symbol: str, start: datetime, end: datetime,
+                 columns: List[str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    # Keyset pagination on (timestamp, id), so each chunk is its own COPY
+    scan = list(dict.fromkeys(columns + ['timestamp', 'id']))
+    after = None
+    while True:
+        arrays = copy_ticks(db_session, symbol, start, end, scan, after=after, limit=chunk_rows)
+        rows = len(arrays['id'])
+        if rows == 0:
+            return
+        yield pd.DataFrame({name: arrays[name] for name in columns})
+        if rows < chunk_rows:
+            return
+        after = (pd.Timestamp(arrays['timestamp'][-1]).to_pydatetime(), int(arrays['id'][-1]))
+
+
+def load_ticks(symbol: str, start_date: str, end_date: str, columns: Optional[List[str]] = None,
+               chunk_rows: Optional[int] = None, db_session=None) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Template helper: a symbol's ticks between start_date and end_date (inclusive).
+
+    columns defaults to timestamp, price, size; id, exchange and conditions
+    (JSON text) are also available. With chunk_rows, returns an iterator of
+    DataFrames of at most that many rows instead of one DataFrame. Days held
+    by the columnar tick cache are memory-mapped instead of queried.
+    """
+    from app.services.tick_cache import get_tick_cache
+
+    db_session = db_session or getattr(_local, 'session', None)
+    if db_session is None:
+        raise RuntimeError("load_ticks needs a database session (db_session=...)")
+    # Once here, so the cached and the COPY paths see the same symbol
+    symbol = symbol.upper()
+    columns = list(columns or DEFAULT_COLUMNS)
+    unknown = set(columns) - set(TICK_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown tick column(s): {', '.join(sorted(unknown))}")
+
+    start, end = tick_bounds(start_date, end_date)
+    if chunk_rows:
+        return _iter_chunks(db_session, symbol, start, end, columns, chunk_rows)
+    cache = get_tick_cache()
+    if cache.caches(symbol) and 'id' not in columns:
+        return cache.load(db_session, symbol, start_date, end_date, columns)
+    return pd.DataFrame(copy_ticks(db_session, symbol, start, end, columns))
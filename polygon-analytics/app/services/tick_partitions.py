@@ -0,0 +1,287 @@
+"""Partition management for the range-partitioned tick_data table.
+
+Run as a script for maintenance:
+    python -m app.services.tick_partitions retention --days 30
+    python -m app.services.tick_partitions migrate
+    python -m app.services.tick_partitions list
+    python -m app.services.tick_partitions indexes
+"""
+import argparse
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.services.coverage_ledger import ns_to_naive_utc
+from app.services.result_cache import ResultCache
+from app.services.tick_cache import TickColumnCache, get_tick_cache
+
+settings = get_settings()
+
+PARTITION_NAME = re.compile(r"^tick_data_p(\d{6}|\d{8})$")
+
+# Every index name tick_data has carried; anything here but not in the model gets dropped
+MANAGED_INDEXES = {
+    'ix_tick_data_id', 'ix_tick_data_symbol', 'ix_tick_data_timestamp',
+    'idx_symbol_timestamp', 'idx_tick_data_timestamp_brin'
+}
+
+
+class TickPartitionManager:
+    """Creates, lists and drops the time partitions of tick_data.
+
+    Partitions are per day (``tick_data_pYYYYMMDD``) or per month
+    (``tick_data_pYYYYMM``). With ``hash_partitions`` > 0 each one is
+    further split by ``HASH (symbol)`` so single-symbol scans touch one
+    child per period.
+    """
+
+    def __init__(self, interval: str = "day", hash_partitions: int = 0):
+        if interval not in ("day", "month"):
+            raise ValueError("tick partition interval must be 'day' or 'month'")
+        self.interval = interval
+        self.hash_partitions = hash_partitions
+
+    def _period_start(self, day: date) -> date:
+        return day if self.interval == "day" else day.replace(day=1)
+
+    def next_period(self, start: date) -> date:
+        if self.interval == "day":
+            return start + timedelta(days=1)
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def partition_name(self, start: date) -> str:
+        fmt = "%Y%m%d" if self.interval == "day" else "%Y%m"
+        return f"tick_data_p{start.strftime(fmt)}"
+
+    def previous_period(self, start: date) -> date:
+        return self._period_start(start - timedelta(days=1))
+
+    def periods_for(self, ranges: List[Tuple[int, int]]) -> List[date]:
+        """Partition start dates covering half-open nanosecond ranges, plus one period either side.
+
+        Ranges are requested by SIP timestamp but rows are stored by participant
+        timestamp, which can fall just across a period boundary (after-hours
+        trades around UTC midnight); without the neighbours such a row has no
+        partition and fails the whole COPY batch.
+        """
+        periods = []
+        for lo, hi in ranges:
+            period = self.previous_period(self._period_start(ns_to_naive_utc(lo).date()))
+            last = self.next_period(self._period_start(ns_to_naive_utc(hi - 1).date()))
+            while period <= last:
+                if period not in periods:
+                    periods.append(period)
+                period = self.next_period(period)
+        return periods
+
+    def ensure_partitions(self, db: Session, ranges: List[Tuple[int, int]]) -> List[str]:
+        """Create any missing partitions for the ranges about to be ingested"""
+        # Not cached: retention may drop partitions from another process
+        periods = self.periods_for(ranges)
+        if {self.partition_name(p) for p in periods} <= self.existing_partitions(db):
+            return []
+
+        # Serialise DDL between concurrent fetches of overlapping ranges
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext('tick_data_partitions'))"))
+        existing = self.existing_partitions(db)
+        created = []
+        for start in periods:
+            name = self.partition_name(start)
+            if name not in existing:
+                self.create_partition(db, name, start, self.next_period(start))
+                created.append(name)
+        db.commit()
+        return created
+
+    def create_partition(self, db: Session, name: str, start: date, end: date):
+        bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        if self.hash_partitions > 0:
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF tick_data "
+                f"FOR VALUES {bounds} PARTITION BY HASH (symbol)"
+            ))
+            for i in range(self.hash_partitions):
+                db.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name}_h{i} PARTITION OF {name} "
+                    f"FOR VALUES WITH (MODULUS {self.hash_partitions}, REMAINDER {i})"
+                ))
+        else:
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF tick_data FOR VALUES {bounds}"
+            ))
+
+    def existing_partitions(self, db: Session) -> Set[str]:
+        rows = db.execute(text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'tick_data'
+        """)).fetchall()
+        return {r[0] for r in rows if PARTITION_NAME.match(r[0])}
+
+    def _partition_bounds(self, name: str) -> Tuple[date, date]:
+        """[start, end) of a partition from its name (works for either interval)"""
+        suffix = PARTITION_NAME.match(name).group(1)
+        if len(suffix) == 8:
+            start = datetime.strptime(suffix, "%Y%m%d").date()
+            return start, start + timedelta(days=1)
+        start = datetime.strptime(suffix, "%Y%m").date()
+        return start, (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def drop_older_than(self, db: Session, days: int, tick_cache: Optional[TickColumnCache] = None,
+                        result_cache: Optional[ResultCache] = None) -> List[str]:
+        """Retention: drop whole partitions that end before now - days.
+
+        Everything derived from those days goes too: their tick_bars rows,
+        the columnar tick cache's files (``tick_cache`` defaults to the
+        configured one) and cached template results overlapping them
+        (``result_cache`` defaults to one on the configured Redis, which API
+        workers check), or they would keep being served.
+        """
+        tick_cache = tick_cache or get_tick_cache()
+        if result_cache is None:
+            result_cache = ResultCache(settings.redis_url)
+        cutoff = datetime.utcnow().date() - timedelta(days=days)
+        dropped = []
+        affected = {}
+        evicted = 0
+        for name in sorted(self.existing_partitions(db)):
+            start, end = self._partition_bounds(name)
+            if end > cutoff:
+                continue
+            bounds = {"start": start, "end": end}
+            symbols = {row[0] for row in db.execute(text(
+                "SELECT DISTINCT symbol FROM tick_bars WHERE bucket >= :start AND bucket < :end"
+            ), bounds)}
+            db.execute(text(f"ALTER TABLE tick_data DETACH PARTITION {name}"))
+            db.execute(text(f"DROP TABLE {name}"))
+            db.execute(text("DELETE FROM tick_bars WHERE bucket >= :start AND bucket < :end"), bounds)
+            # Those days are no longer stored, so they must be refetched on demand
+            symbols.update(row[0] for row in db.execute(text(
+                "DELETE FROM ingest_coverage WHERE day >= :start AND day < :end RETURNING symbol"
+            ), bounds))
+            affected[name] = symbols
+            dropped.append(name)
+        db.commit()
+        # After the commit, so a failed drop leaves the caches consistent with what is still stored
+        for name in dropped:
+            start, end = self._partition_bounds(name)
+            evicted += tick_cache.evict_range(start, end)
+            for symbol in affected[name]:
+                result_cache.invalidate(symbol, start.isoformat(), (end - timedelta(days=1)).isoformat())
+        if evicted:
+            print(f"Removed {evicted} cached tick file(s) for dropped partitions")
+        return dropped
+
+    def is_partitioned(self, db: Session) -> bool:
+        return bool(db.execute(text("""
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = 'tick_data'
+        """)).fetchone())
+
+    def require_partitioned(self, db: Session):
+        """Raise if tick_data is still a pre-partitioning heap table; ingest's partition DDL fails on it"""
+        if not self.is_partitioned(db):
+            raise RuntimeError(
+                "tick_data is not partitioned; convert it once with "
+                "`python -m app.services.tick_partitions migrate` before starting the API"
+            )
+
+    def migrate_heap_table(self, db: Session) -> int:
+        """One-off conversion of a pre-partitioning tick_data heap table"""
+        from app.models.models import TickData
+
+        if self.is_partitioned(db):
+            return 0
+
+        db.execute(text("ALTER TABLE tick_data RENAME TO tick_data_heap"))
+        db.execute(text("ALTER TABLE tick_data_heap RENAME CONSTRAINT tick_data_pkey TO tick_data_heap_pkey"))
+        # Index names are global, so the old ones must go before create() reuses them
+        for name in MANAGED_INDEXES:
+            db.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        db.execute(text("ALTER SEQUENCE IF EXISTS tick_data_id_seq RENAME TO tick_data_heap_id_seq"))
+        TickData.__table__.create(bind=db.connection())
+
+        bounds = db.execute(text("SELECT MIN(timestamp), MAX(timestamp) FROM tick_data_heap")).fetchone()
+        if bounds[0] is not None:
+            period = self._period_start(bounds[0].date())
+            while period <= bounds[1].date():
+                name = self.partition_name(period)
+                self.create_partition(db, name, period, self.next_period(period))
+                period = self.next_period(period)
+
+        moved = db.execute(text("""
+            INSERT INTO tick_data (symbol, timestamp, price, size, exchange, conditions, created_at)
+            SELECT symbol, timestamp, price, size, exchange, conditions, created_at FROM tick_data_heap
+        """)).rowcount
+        db.execute(text("DROP TABLE tick_data_heap"))
+        db.commit()
+        return moved
+
+
+def apply_index_mode(db: Session) -> Tuple[List[str], List[str]]:
+    """Bring tick_data's secondary indexes in line with settings.tick_index_mode"""
+    from app.models.models import TickData
+
+    desired = {index.name: index for index in TickData.__table__.indexes}
+    existing = {r[0] for r in db.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'tick_data'"
+    )).fetchall()}
+
+    dropped = sorted((existing & MANAGED_INDEXES) - set(desired))
+    for name in dropped:
+        db.execute(text(f"DROP INDEX {name}"))
+    created = sorted(set(desired) - existing)
+    for name in created:
+        desired[name].create(bind=db.connection())
+    db.commit()
+    return dropped, created
+
+
+def get_partition_manager() -> TickPartitionManager:
+    return TickPartitionManager(
+        interval=settings.tick_partition_interval,
+        hash_partitions=settings.tick_partition_symbol_hash
+    )
+
+
+def main():
+    from app.models.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="tick_data partition maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    retention = sub.add_parser("retention", help="drop partitions older than N days")
+    retention.add_argument("--days", type=int, default=30)
+    sub.add_parser("migrate", help="convert an unpartitioned tick_data table in place")
+    sub.add_parser("list", help="list existing partitions")
+    sub.add_parser("indexes", help="apply TICK_INDEX_MODE to an existing tick_data")
+    args = parser.parse_args()
+
+    manager = get_partition_manager()
+    db = SessionLocal()
+    try:
+        if args.command == "retention":
+            dropped = manager.drop_older_than(db, args.days)
+            print(f"Dropped {len(dropped)} partition(s): {', '.join(dropped) or '-'}")
+        elif args.command == "migrate":
+            moved = manager.migrate_heap_table(db)
+            print(f"Migrated {moved:,} rows into partitioned tick_data")
+        elif args.command == "indexes":
+            dropped, created = apply_index_mode(db)
+            print(f"Dropped: {', '.join(dropped) or '-'}")
+            print(f"Created: {', '.join(created) or '-'}")
+        else:
+            for name in sorted(manager.existing_partitions(db)):
+                print(name)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
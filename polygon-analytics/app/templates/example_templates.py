@@ -4,8 +4,6 @@ VOLUME_BY_HOUR = """
 import pandas as pd
 import matplotlib.pyplot as plt
 from sqlalchemy import text
-from io import BytesIO
-import base64
 
 def analyze_data(db_session, symbol, start_date, end_date):
     # Query tick data
@@ -49,45 +47,24 @@ def analyze_data(db_session, symbol, start_date, end_date):
     
     plt.tight_layout()
     
-    # Convert to base64
-    buffer = BytesIO()
-    fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-    buffer.seek(0)
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    plt.close(fig)
+    # Render into the chart store (built-in helper); the result carries its URL
+    chart = render_chart(fig, dpi=100)
     
     return {
         'type': 'both',
         'data': df.to_dict('records'),
-        'chart': img_str
+        'chart': chart
     }
 """
 
 VWAP_CALCULATION = """
 import pandas as pd
 import matplotlib.pyplot as plt
-from sqlalchemy import text
-from io import BytesIO
-import base64
 import numpy as np
 
 def analyze_data(db_session, symbol, start_date, end_date):
-    # Query tick data
-    query = text('''
-        SELECT timestamp, price, size
-        FROM tick_data
-        WHERE symbol = :symbol 
-            AND timestamp BETWEEN :start AND :end
-        ORDER BY timestamp
-    ''')
-    
-    result = db_session.execute(query, {
-        'symbol': symbol,
-        'start': start_date,
-        'end': end_date
-    })
-    
-    df = pd.DataFrame(result.fetchall(), columns=['timestamp', 'price', 'size'])
+    # Load tick data (built-in helper, ordered by timestamp)
+    df = load_ticks(symbol, start_date, end_date, columns=['timestamp', 'price', 'size'])
     
     # Calculate VWAP
     df['price_volume'] = df['price'] * df['size']
@@ -118,12 +95,8 @@ def analyze_data(db_session, symbol, start_date, end_date):
     # Format x-axis
     fig.autofmt_xdate()
     
-    # Convert to base64
-    buffer = BytesIO()
-    fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-    buffer.seek(0)
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    plt.close(fig)
+    # Render into the chart store (built-in helper); the result carries its URL
+    chart = render_chart(fig, dpi=100)
     
     # Summary statistics
     summary = pd.DataFrame({
@@ -139,34 +112,18 @@ def analyze_data(db_session, symbol, start_date, end_date):
     return {
         'type': 'both',
         'data': summary.to_dict('records'),
-        'chart': img_str
+        'chart': chart
     }
 """
 
 PRICE_DISTRIBUTION = """
 import pandas as pd
 import matplotlib.pyplot as plt
-from sqlalchemy import text
-from io import BytesIO
-import base64
 import numpy as np
 
 def analyze_data(db_session, symbol, start_date, end_date):
-    # Query tick data
-    query = text('''
-        SELECT price, size
-        FROM tick_data
-        WHERE symbol = :symbol 
-            AND timestamp BETWEEN :start AND :end
-    ''')
-    
-    result = db_session.execute(query, {
-        'symbol': symbol,
-        'start': start_date,
-        'end': end_date
-    })
-    
-    df = pd.DataFrame(result.fetchall(), columns=['price', 'size'])
+    # Load tick data (built-in helper)
+    df = load_ticks(symbol, start_date, end_date, columns=['price', 'size'])
     
     # Statistical analysis
     stats = {
@@ -207,12 +164,8 @@ def analyze_data(db_session, symbol, start_date, end_date):
     
     plt.tight_layout()
     
-    # Convert to base64
-    buffer = BytesIO()
-    fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-    buffer.seek(0)
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    plt.close(fig)
+    # Render into the chart store (built-in helper); the result carries its URL
+    chart = render_chart(fig, dpi=100)
     
     # Convert stats to DataFrame
     stats_df = pd.DataFrame(list(stats.items()), columns=['Metric', 'Value'])
@@ -220,6 +173,21 @@ def analyze_data(db_session, symbol, start_date, end_date):
     return {
         'type': 'both',
         'data': stats_df.to_dict('records'),
-        'chart': img_str
+        'chart': chart
     }
-"""
\ No newline at end of file
+"""
+# The same analyses as declarative specs (see app.services.analytics_spec); run one with
+# spec_template(spec) as template code, or run_spec(db_session, symbol, start, end, spec)
+
+VOLUME_BY_HOUR_SPEC = {
+    'interval': '1h',
+    'aggregations': ['volume', 'trade_count', 'avg_price'],
+    'charts': [{'mark': 'bar', 'y': 'volume'}, {'mark': 'line', 'y': 'trade_count'}]
+}
+
+VWAP_CALCULATION_SPEC = {
+    'interval': '5m',
+    'aggregations': ['avg_price', 'cumulative_vwap', 'volume', 'price_std'],
+    'totals': True,
+    'charts': [{'mark': 'line', 'y': 'cumulative_vwap'}, {'mark': 'line', 'y': 'avg_price'}]
+}
@@ -0,0 +1,109 @@
+"""Benchmark: binary vs text COPY encoding of Polygon trade pages.
+
+Encode-only (no database needed):
+    python -m benchmarks.bench_copy_encoder --rows 200000
+
+Include the COPY itself (uses DATABASE_URL, writes into a TEMP shadow of tick_data):
+    python -m benchmarks.bench_copy_encoder --rows 200000 --copy
+"""
+import argparse
+import io
+import random
+import time
+
+from app.services.copy_encoder import (
+    BINARY_COPY_SQL, COPY_COLUMNS, encode_trades_binary, encode_trades_text
+)
+
+CONDITIONS = [[], [12], [12, 37], [14, 41], [37], [12, 37, 41]]
+EXCHANGES = [1, 4, 8, 10, 11, 12, 15, 19, 21]
+
+
+def make_trades(rows, seed=42):
+    """Synthetic page shaped like /v3/trades results"""
+    rnd = random.Random(seed)
+    ts = 1_700_000_000_000_000_000
+    trades = []
+    for _ in range(rows):
+        ts += rnd.randrange(1_000, 5_000_000)
+        trades.append({
+            "participant_timestamp": ts,
+            "sip_timestamp": ts + rnd.randrange(1_000, 100_000),
+            "price": round(rnd.uniform(150, 200), 4),
+            "size": rnd.choice([1, 5, 100, 100, 200, 0.5]),
+            "exchange": rnd.choice(EXCHANGES),
+            "conditions": rnd.choice(CONDITIONS),
+        })
+    return trades
+
+
+def time_best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_encode(trades, symbol, repeat):
+    text_time = time_best(lambda: encode_trades_text(trades, symbol), repeat)
+    binary_time = time_best(lambda: encode_trades_binary(trades, symbol), repeat)
+    return text_time, binary_time
+
+
+def bench_copy(trades, symbol, repeat):
+    import psycopg2
+
+    conn = psycopg2.connect(_settings_database_url())
+    cur = conn.cursor()
+    # Temp table shadows public.tick_data on the search_path, indexes included
+    cur.execute("CREATE TEMP TABLE tick_data (LIKE public.tick_data INCLUDING DEFAULTS INCLUDING INDEXES)")
+
+    def copy_text():
+        buffer, _ = encode_trades_text(trades, symbol)
+        cur.copy_from(buffer, "tick_data", columns=COPY_COLUMNS, sep="\t", size=16384)
+        conn.commit()
+
+    def copy_binary():
+        payload, _ = encode_trades_binary(trades, symbol)
+        cur.copy_expert(BINARY_COPY_SQL, io.BytesIO(payload), size=1 << 20)
+        conn.commit()
+
+    try:
+        return time_best(copy_text, repeat), time_best(copy_binary, repeat)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _settings_database_url():
+    from app.config import get_settings
+    return get_settings().database_url.replace("+psycopg2", "")
+
+
+def report(label, rows, text_time, binary_time):
+    print(f"{label}")
+    print(f"   text:   {rows / text_time:>12,.0f} rows/sec  ({text_time:.3f}s)")
+    print(f"   binary: {rows / binary_time:>12,.0f} rows/sec  ({binary_time:.3f}s)")
+    print(f"   speedup: {text_time / binary_time:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--symbol", default="AAPL")
+    parser.add_argument("--copy", action="store_true", help="also time encode + COPY against DATABASE_URL")
+    args = parser.parse_args()
+
+    trades = make_trades(args.rows)
+    report(f"Encode {args.rows:,} trades (best of {args.repeat})", args.rows,
+           *bench_encode(trades, args.symbol, args.repeat))
+    if args.copy:
+        report(f"Encode + COPY {args.rows:,} trades (best of {args.repeat})", args.rows,
+               *bench_copy(trades, args.symbol, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
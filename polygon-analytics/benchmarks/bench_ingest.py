@@ -0,0 +1,265 @@
+"""End-to-end ingest benchmark against the local mock Polygon server.
+
+Each stage runs in its own process so its peak RSS is its own:
+
+    fetch   HTTP + JSON decode through the adaptive scheduler, writers only count rows
+    encode  trades_to_columns + binary COPY encoding of generated pages
+    copy    COPY of pre-encoded batches into a TEMP shadow of tick_data
+    e2e     fetch_and_store_batch into the real tables (benchmark symbols are deleted afterwards)
+
+    python -m benchmarks.bench_ingest --trades-per-day 1000000 --days 1 --symbols 2
+    python -m benchmarks.bench_ingest --stages fetch --latency-ms 30 --rate-limit-rate 0.05
+    python -m benchmarks.bench_ingest --json results.json
+    python -m benchmarks.bench_ingest --baseline results.json --tolerance 0.2   # exit 1 on regression
+
+The copy and e2e stages use DATABASE_URL.
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import resource
+import sys
+import time
+
+from benchmarks import mock_polygon
+
+STAGES = ("fetch", "encode", "copy", "e2e")
+START_DATE = "2024-01-02"
+
+
+def _symbols(count):
+    return [f"BENCH{i}" for i in range(count)]
+
+
+def _end_date(days):
+    from datetime import datetime, timedelta
+    return (datetime.strptime(START_DATE, "%Y-%m-%d") + timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _service(port, counting=False):
+    from app.services.polygon_service import PolygonService
+
+    class CountingService(PolygonService):
+        """Writers drain the queue without touching the database"""
+
+        def db_writer_thread(self, queue, table="tick_data", progress=None):
+            rows = {}
+            item = queue.get()
+            while item is not None:
+                symbol, trades = item
+                rows[symbol] = rows.get(symbol, 0) + len(trades)
+                item = queue.get()
+            return {"rows": rows, "batches": {}, "rows_lost": {}, "error": None}
+
+    service = CountingService() if counting else PolygonService()
+    service.base_url = f"http://127.0.0.1:{port}"
+    return service
+
+
+def stage_fetch(args):
+    service = _service(args.port, counting=True)
+    first = service._date_to_ns(START_DATE)
+    ranges = [(first, service._date_to_ns(_end_date(args.days)) + mock_polygon.NS_PER_DAY)]
+
+    started = time.perf_counter()
+    report = asyncio.run(service.pipeline_fetch({symbol: ranges for symbol in _symbols(args.symbols)}))
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": report["rows_written"],
+        "seconds": elapsed,
+        "bytes": report["bytes_received"],
+        "pages": report["pages_fetched"],
+        "pages_dropped": report["pages_dropped"],
+        "retries": report["retries"],
+        "final_concurrency": report["final_concurrency"],
+    }
+
+
+def _generated_batches(args):
+    """Trades as the writers would see them, in ingest_batch_rows batches"""
+    from app.config import get_settings
+
+    generator = mock_polygon.TradeGenerator(args.trades_per_day)
+    batch_rows = get_settings().ingest_batch_rows
+    total = min(args.trades_per_day * args.days, args.encode_rows)
+    for k in range(0, total, batch_rows):
+        yield generator.trades("BENCH0", k, min(total, k + batch_rows))
+
+
+def stage_encode(args):
+    from app.services.copy_encoder import encode_columns_binary, trades_to_columns
+
+    rows = payload_bytes = 0
+    seconds = 0.0
+    for trades in _generated_batches(args):
+        started = time.perf_counter()
+        payload, _ = encode_columns_binary(trades_to_columns(trades), "BENCH0")
+        seconds += time.perf_counter() - started
+        rows += len(trades)
+        payload_bytes += len(payload)
+    return {"rows": rows, "seconds": seconds, "bytes": payload_bytes}
+
+
+def stage_copy(args):
+    import psycopg2
+    from app.services.copy_encoder import encode_columns_binary, trades_to_columns, BINARY_COPY_SQL
+    from benchmarks.bench_copy_encoder import _settings_database_url
+
+    payloads = [
+        (len(trades), encode_columns_binary(trades_to_columns(trades), "BENCH0")[0])
+        for trades in _generated_batches(args)
+    ]
+    conn = psycopg2.connect(_settings_database_url())
+    cur = conn.cursor()
+    # Temp table shadows public.tick_data on the search_path, indexes included
+    cur.execute("CREATE TEMP TABLE tick_data (LIKE public.tick_data INCLUDING DEFAULTS INCLUDING INDEXES)")
+    conn.commit()
+    try:
+        started = time.perf_counter()
+        for _, payload in payloads:
+            cur.copy_expert(BINARY_COPY_SQL, io.BytesIO(payload), size=1 << 20)
+            conn.commit()
+        elapsed = time.perf_counter() - started
+    finally:
+        cur.close()
+        conn.close()
+    return {
+        "rows": sum(count for count, _ in payloads),
+        "seconds": elapsed,
+        "bytes": sum(len(payload) for _, payload in payloads),
+    }
+
+
+def _clear_benchmark_symbols(service, db, symbols):
+    from sqlalchemy import text
+
+    for symbol in symbols:
+        db.execute(text("DELETE FROM tick_data WHERE symbol = :symbol"), {"symbol": symbol})
+        service.coverage.clear(db, symbol)
+        service.bars.clear_symbol(db, symbol)
+    db.commit()
+
+
+def stage_e2e(args):
+    from app.models.database import SessionLocal
+
+    service = _service(args.port)
+    symbols = _symbols(args.symbols)
+    db = SessionLocal()
+    try:
+        _clear_benchmark_symbols(service, db, symbols)
+        started = time.perf_counter()
+        batch = asyncio.run(service.fetch_and_store_batch(
+            symbols, START_DATE, _end_date(args.days), db, force=True, bulk=args.bulk
+        ))
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": batch["records"],
+            "seconds": elapsed,
+            "bytes": batch["bytes_received"],
+            "complete": batch["complete"],
+            "copy_batches": batch["copy_batches"],
+        }
+    finally:
+        _clear_benchmark_symbols(service, db, symbols)
+        db.close()
+
+
+def _run_stage(name, args, results):
+    result = globals()[f"stage_{name}"](args)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    results.put(result)
+
+
+def run_stage(name, args):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=_run_stage, args=(name, args, results))
+    process.start()
+    result = results.get()
+    process.join()
+    rows, seconds = result["rows"], result["seconds"]
+    result["rows_per_sec"] = rows / seconds if seconds else 0.0
+    result["seconds_per_million"] = seconds / (rows / 1_000_000) if rows else None
+    result["mb_per_sec"] = result["bytes"] / 1e6 / seconds if seconds else 0.0
+    return result
+
+
+def print_results(results):
+    print(f"{'stage':<8}{'rows':>12}{'rows/sec':>14}{'s/million':>11}{'MB/s':>9}{'peak RSS MB':>13}")
+    for name, r in results.items():
+        per_million = f"{r['seconds_per_million']:.2f}" if r["seconds_per_million"] is not None else "-"
+        print(f"{name:<8}{r['rows']:>12,}{r['rows_per_sec']:>14,.0f}{per_million:>11}"
+              f"{r['mb_per_sec']:>9.1f}{r['peak_rss_mb']:>13,.0f}")
+    for name, r in results.items():
+        extras = {k: v for k, v in r.items()
+                  if k not in ("rows", "seconds", "bytes", "rows_per_sec", "seconds_per_million",
+                               "mb_per_sec", "peak_rss_mb")}
+        if extras:
+            print(f"   {name}: {extras}")
+
+
+def compare(results, baseline, tolerance):
+    """Stages whose throughput fell more than tolerance below the baseline"""
+    regressions = []
+    for name, r in results.items():
+        before = baseline.get(name, {}).get("rows_per_sec")
+        if before and r["rows_per_sec"] < before * (1 - tolerance):
+            regressions.append(f"{name}: {r['rows_per_sec']:,.0f} rows/sec vs baseline {before:,.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--symbols", type=int, default=1)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--encode-rows", type=int, default=1_000_000, help="rows for the encode and copy stages")
+    parser.add_argument("--bulk", action="store_true", default=None, help="force the staging-table path in e2e")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server-workers", type=int, default=2)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    mock_polygon.add_arguments(parser)
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    servers = []
+    if {"fetch", "e2e"} & set(stages):
+        servers = mock_polygon.start_in_background(
+            args.port, args.server_workers, **mock_polygon.server_options(args)
+        )
+        mock_polygon.wait_until_listening(args.port)
+
+    try:
+        results = {name: run_stage(name, args) for name in stages}
+    finally:
+        for server in servers:
+            server.terminate()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Template result serialization: the old recursive walker vs result_serializer.
+
+Three output shapes a template commonly returns, over a synthetic tick table:
+
+    records    df.to_dict('records')
+    columns    df.to_dict()
+    dataframe  the DataFrame itself (the old walker needed to_dict('records') first)
+
+    python -m benchmarks.bench_serialize --rows 100000
+"""
+import argparse
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from app.services.result_serializer import to_jsonable
+
+
+def legacy_make_json_serializable(obj):
+    """TemplateExecutor._make_json_serializable as it was before result_serializer"""
+    if isinstance(obj, dict):
+        result = {}
+        for k, v in obj.items():
+            if isinstance(k, (pd.Timestamp, datetime, date)):
+                key = str(k)
+            elif isinstance(k, (np.integer, np.int64)):
+                key = int(k)
+            elif isinstance(k, (np.floating, np.float64)):
+                key = float(k)
+            else:
+                key = k
+            result[key] = legacy_make_json_serializable(v)
+        return result
+    elif isinstance(obj, list):
+        return [legacy_make_json_serializable(item) for item in obj]
+    elif isinstance(obj, (pd.Timestamp, datetime, date)):
+        return str(obj)
+    elif isinstance(obj, (np.integer, np.int64)):
+        return int(obj)
+    elif isinstance(obj, (np.floating, np.float64)):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif pd.isna(obj):
+        return None
+    else:
+        return obj
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-01-02T09:30:00", "ns")
+    offsets = np.sort(rng.integers(0, 6 * 3_600 * 10**9, rows))
+    # Whole microseconds, so per-value and per-column timestamp text agree
+    timestamps = start + (offsets // 1_000 * 1_000 + 1_000).astype("timedelta64[ns]")
+    price = 100 + rng.standard_normal(rows).cumsum() / 100
+    price[rng.random(rows) < 0.01] = np.nan
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "price": price,
+        "size": rng.integers(1, 500, rows),
+        "exchange": rng.choice(["4", "8", "10", "11", "12"], rows),
+        "hour": pd.DatetimeIndex(timestamps).hour,
+    })
+
+
+def _time(func, arg, repeat: int):
+    best, out = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = func(arg)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def run(rows: int, repeat: int):
+    df = make_frame(rows)
+    cases = {
+        "records": (df.to_dict("records"), df.to_dict("records")),
+        "columns": (df.to_dict(), df.to_dict()),
+        "dataframe": (df, df),
+    }
+    legacy_for = {
+        "records": legacy_make_json_serializable,
+        "columns": legacy_make_json_serializable,
+        "dataframe": lambda frame: legacy_make_json_serializable(frame.to_dict("records")),
+    }
+    results = {}
+    for name, (legacy_input, new_input) in cases.items():
+        legacy_seconds, legacy_out = _time(legacy_for[name], legacy_input, repeat)
+        new_seconds, new_out = _time(to_jsonable, new_input, repeat)
+        results[name] = {
+            "legacy_seconds": legacy_seconds,
+            "new_seconds": new_seconds,
+            "speedup": legacy_seconds / new_seconds if new_seconds else None,
+            "identical": legacy_out == new_out,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+
+    print(f"{args.rows:,} rows, best of {args.repeat}")
+    print(f"{'shape':<11}{'legacy s':>10}{'new s':>9}{'speedup':>9}  identical")
+    for name, r in run(args.rows, args.repeat).items():
+        print(f"{name:<11}{r['legacy_seconds']:>10.3f}{r['new_seconds']:>9.3f}{r['speedup']:>8.1f}x  {r['identical']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Example templates as exec'd Python vs the same analyses as analytics specs.
+
+Runs VOLUME_BY_HOUR and VWAP_CALCULATION, then their *_SPEC counterparts
+(through spec_template, so both go through TemplateExecutor.execute_template
+in-process) against the configured database, and compares the numbers they
+share. Needs ticks for the symbol/range already fetched.
+
+    python -m benchmarks.bench_spec AAPL 2024-01-02 2024-01-05 --repeat 3
+"""
+import argparse
+import time
+
+from app.models.database import SessionLocal
+from app.services.analytics_spec import spec_template
+from app.services.template_executor import TemplateExecutor
+from app.templates import example_templates
+
+CASES = {
+    'volume_by_hour': ('VOLUME_BY_HOUR', 'VOLUME_BY_HOUR_SPEC'),
+    'vwap': ('VWAP_CALCULATION', 'VWAP_CALCULATION_SPEC'),
+}
+
+
+def _time(executor, code, db, symbol, start, end, repeat):
+    best, out = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = executor.execute_template(code, db, symbol, start, end)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    if not out['success']:
+        raise RuntimeError(out['error'])
+    return best, out['result']
+
+
+def _max_relative_diff(pairs):
+    return max((abs(a - b) / max(abs(a), abs(b), 1e-12) for a, b in pairs), default=0.0)
+
+
+def compare(case, template_result, spec_result):
+    """Largest relative difference between the values both versions report"""
+    if case == 'volume_by_hour':
+        by_bucket = {row['bucket']: row for row in spec_result['data']}
+        pairs = []
+        for row in template_result['data']:
+            spec_row = by_bucket.get(row['hour'], {})
+            pairs += [(row['total_volume'], spec_row.get('volume', 0)),
+                      (row['trade_count'], spec_row.get('trade_count', 0)),
+                      (row['avg_price'], spec_row.get('avg_price', 0))]
+        return _max_relative_diff(pairs)
+    summary = {row['Metric']: row['Value'] for row in template_result['data']}
+    totals = spec_result['totals']
+    return _max_relative_diff([
+        (summary['Total Volume'], totals['volume']),
+        (summary['Average Price'], totals['avg_price']),
+        (summary['VWAP'], totals['cumulative_vwap']),
+        (summary['Price Std Dev'], totals['price_std']),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("symbol")
+    parser.add_argument("start_date")
+    parser.add_argument("end_date")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+
+    executor = TemplateExecutor()
+    db = SessionLocal()
+    try:
+        print(f"{args.symbol} {args.start_date}..{args.end_date}, best of {args.repeat}")
+        print(f"{'case':<16}{'template s':>11}{'spec s':>9}{'speedup':>9}  source        max rel diff")
+        for case, (template_name, spec_name) in CASES.items():
+            try:
+                template_seconds, template_result = _time(
+                    executor, getattr(example_templates, template_name), db,
+                    args.symbol, args.start_date, args.end_date, args.repeat
+                )
+                spec_seconds, spec_result = _time(
+                    executor, spec_template(getattr(example_templates, spec_name)), db,
+                    args.symbol, args.start_date, args.end_date, args.repeat
+                )
+            except RuntimeError as e:
+                print(f"{case:<16}failed: {str(e).splitlines()[0]}")
+                continue
+            diff = compare(case, template_result, spec_result)
+            print(f"{case:<16}{template_seconds:>11.3f}{spec_seconds:>9.3f}{template_seconds / spec_seconds:>8.1f}x"
+                  f"  {spec_result['source']:<13} {diff:.2e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
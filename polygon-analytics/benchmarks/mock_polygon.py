@@ -0,0 +1,188 @@
+"""Local stand-in for Polygon's /v3/trades endpoint.
+
+Trades are synthesised on the fly, deterministically per symbol: trade k of
+a symbol sits at k * spacing plus a fixed jitter, so any time window maps
+to an index range in O(1) and overlapping requests always agree.
+
+    python -m benchmarks.mock_polygon --port 8765 --trades-per-day 2000000 \\
+        --latency-ms 20 --error-rate 0.01 --rate-limit-rate 0.02
+
+Point PolygonService.base_url at http://127.0.0.1:8765 to use it.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import time
+import zlib
+
+import numpy as np
+from aiohttp import web
+
+NS_PER_DAY = 86_400 * 1_000_000_000
+EXCHANGES = np.array([1, 4, 8, 10, 11, 12, 15, 19, 21])
+CONDITIONS = [[], [12], [12, 37], [14, 41], [37], [12, 37, 41]]
+
+
+class TradeGenerator:
+    """Deterministic synthetic trade tape, ``trades_per_day`` per symbol"""
+
+    def __init__(self, trades_per_day: int):
+        self.spacing = max(1, NS_PER_DAY // trades_per_day)
+
+    def _seed(self, symbol: str) -> int:
+        return zlib.crc32(symbol.encode())
+
+    def _jitter(self, k: np.ndarray, seed: int) -> np.ndarray:
+        mixed = (k.astype(np.uint64) * np.uint64(2654435761) + np.uint64(seed)) % np.uint64(1 << 32)
+        return (mixed % np.uint64(self.spacing)).astype(np.int64)
+
+    def timestamp(self, k: int, seed: int) -> int:
+        return k * self.spacing + int(self._jitter(np.array([k]), seed)[0])
+
+    def first_index(self, ts: int, seed: int) -> int:
+        """Smallest k whose timestamp is >= ts"""
+        k = max(0, ts // self.spacing)
+        return k if self.timestamp(k, seed) >= ts else k + 1
+
+    def trades(self, symbol: str, k_start: int, k_end: int):
+        seed = self._seed(symbol)
+        k = np.arange(k_start, k_end, dtype=np.int64)
+        ts = k * self.spacing + self._jitter(k, seed)
+        price = 100 + ((k * 7919 + seed) % 10_000) / 100
+        size = 1 + (k * 31) % 500
+        exchange = EXCHANGES[k % len(EXCHANGES)]
+        return [
+            {
+                "sip_timestamp": t,
+                "participant_timestamp": t - 1_000,
+                "price": p,
+                "size": s,
+                "exchange": e,
+                "conditions": CONDITIONS[i % len(CONDITIONS)],
+            }
+            for i, (t, p, s, e) in enumerate(zip(ts.tolist(), price.tolist(), size.tolist(), exchange.tolist()))
+        ]
+
+    def expected_count(self, symbol: str, lo: int, hi: int) -> int:
+        seed = self._seed(symbol)
+        return self.first_index(hi, seed) - self.first_index(lo, seed)
+
+
+def create_app(trades_per_day: int = 1_000_000, page_size: int = 50_000, latency_ms: float = 0.0,
+               jitter_ms: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+               retry_after: float = 0.0, seed: int = 0) -> web.Application:
+    generator = TradeGenerator(trades_per_day)
+    rnd = random.Random(seed)
+
+    async def trades(request: web.Request) -> web.Response:
+        if latency_ms or jitter_ms:
+            await asyncio.sleep((latency_ms + rnd.uniform(0, jitter_ms)) / 1000)
+
+        roll = rnd.random()
+        if roll < error_rate:
+            return web.Response(status=503, text="mock upstream error")
+        if roll < error_rate + rate_limit_rate:
+            headers = {"Retry-After": str(retry_after)} if retry_after else {}
+            return web.Response(status=429, text="mock rate limit", headers=headers)
+
+        symbol = request.match_info["symbol"]
+        query = request.query
+        symbol_seed = generator._seed(symbol)
+        limit = min(int(query.get("limit", page_size)), page_size)
+        if "cursor" in query:
+            k_start, k_end = map(int, query["cursor"].split(","))
+        else:
+            k_start = generator.first_index(int(query["timestamp.gte"]), symbol_seed)
+            k_end = generator.first_index(int(query["timestamp.lt"]), symbol_seed)
+
+        page_end = min(k_end, k_start + limit)
+        body = {"status": "OK", "results": generator.trades(symbol, k_start, page_end)}
+        if page_end < k_end:
+            body["next_url"] = f"{request.scheme}://{request.host}/v3/trades/{symbol}?cursor={page_end},{k_end}"
+        return web.Response(body=json.dumps(body).encode(), content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/v3/trades/{symbol}", trades)
+    return app
+
+
+def serve(host: str, port: int, options: dict):
+    """Run one server process; several can share the port via SO_REUSEPORT"""
+    async def run():
+        runner = web.AppRunner(create_app(**options), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port, reuse_port=True).start()
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def start_in_background(port: int, workers: int = 2, host: str = "127.0.0.1", **options):
+    """Start mock server processes; returns them so the caller can terminate them"""
+    ctx = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(workers):
+        process = ctx.Process(target=serve, args=(host, port, {**options, "seed": i}), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def wait_until_listening(port: int, host: str = "127.0.0.1", timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Mock Polygon server did not start on port {port}")
+            time.sleep(0.1)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--trades-per-day", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=50_000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=0.0, help="Retry-After seconds sent with 429s")
+
+
+def server_options(args) -> dict:
+    return {
+        "trades_per_day": args.trades_per_day,
+        "page_size": args.page_size,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "retry_after": args.retry_after,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"Mock Polygon on http://{args.host}:{args.port} ({args.workers} process(es))")
+    if args.workers == 1:
+        serve(args.host, args.port, server_options(args))
+    else:
+        for process in start_in_background(args.port, args.workers, args.host, **server_options(args)):
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,33 @@ def init_session_state():
 
 init_session_state()
 
+@st.cache_data(show_spinner=False)
+def fetch_chart(url):
+    """Chart image bytes; URLs are content hashes, so a cached copy never goes stale"""
+    response = requests.get(f"{API_URL}{url}", timeout=30)
+    response.raise_for_status()
+    return response.content
+
+def stream_generation(payload, placeholder):
+    """POST to the streaming generate endpoint, showing code as it arrives; returns (result, error)"""
+    streamed, event = "", None
+    with requests.post(f"{API_URL}/api/generate-template/stream", json=payload, stream=True, timeout=30) as response:
+        if response.status_code != 200:
+            return None, response.json().get("detail", "Unknown error")
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "token":
+                    streamed += data["text"]
+                    placeholder.code(streamed, language="python")
+                elif event == "done":
+                    return data, None
+                elif event == "error":
+                    return None, data.get("detail", "Unknown error")
+    return None, "Generation stream ended unexpectedly"
+
 st.title("📈 Polygon Stock Analytics Platform")
 st.markdown("Fetch tick data from Polygon and generate analytics using AI")
 
@@ -89,31 +116,76 @@ if page == "Data Fetcher":
             max_value=datetime.now()
         )
     
+    force_refetch = st.checkbox(
+        "Force full refetch",
+        help="Ignore already-stored days and download the whole range again"
+    )
+    
     if st.button("🔄 Fetch Data", type="primary"):
         st.session_state.last_fetch_symbol = symbol.upper()
         
-        # Show spinner without artificial delays
-        with st.spinner(f"Fetching data for {symbol.upper()}... This may take a few moments for large date ranges."):
-            try:
-                # Make the API request without unnecessary progress updates
-                start_time = time.time()
-                
-                response = requests.post(
-                    f"{API_URL}/api/fetch-data",
-                    json={
-                        "symbol": symbol.upper(),
-                        "start_date": start_date.strftime("%Y-%m-%d"),
-                        "end_date": end_date.strftime("%Y-%m-%d")
-                    },
-                    timeout=600  # 10 minute timeout for large requests
-                )
+        try:
+            start_time = time.time()
+            
+            # The fetch runs as a background job; poll its status instead of
+            # holding one long request open
+            response = requests.post(
+                f"{API_URL}/api/fetch-data",
+                json={
+                    "symbol": symbol.upper(),
+                    "start_date": start_date.strftime("%Y-%m-%d"),
+                    "end_date": end_date.strftime("%Y-%m-%d"),
+                    "force": force_refetch
+                },
+                timeout=30
+            )
+            
+            if response.status_code == 200:
+                task_id = response.json()["task_id"]
+                progress_bar = st.progress(0.0, text=f"Queued {symbol.upper()}...")
+                stats_line = st.empty()
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    elapsed_time = time.time() - start_time
-                    
-                    st.success(f"✅ {result['message']} in {elapsed_time:.1f} seconds")
+                while True:
+                    status = requests.get(f"{API_URL}/api/fetch-status/{task_id}", timeout=10).json()
+                    progress = status.get("progress") or {}
+                    if status["status"] in ("completed", "incomplete", "failed", "not_found"):
+                        break
                     
+                    if progress:
+                        eta = progress.get("eta_seconds")
+                        progress_bar.progress(
+                            min(progress.get("fraction_done", 0.0), 1.0),
+                            text=f"{progress['phase'].capitalize()} {symbol.upper()}"
+                                 + (f" - about {eta:.0f}s left" if eta is not None else "")
+                        )
+                        stats_line.caption(
+                            f"{progress['pages_fetched']:,} pages · {progress['rows_written']:,} rows · "
+                            f"{progress['bytes_received'] / 1e6:,.1f} MB · "
+                            f"{progress['rows_per_second']:,} rows/sec"
+                        )
+                    time.sleep(1)
+                
+                progress_bar.empty()
+                stats_line.empty()
+                elapsed_time = time.time() - start_time
+                result = status.get("result") or {}
+                
+                if status["status"] == "completed":
+                    if result.get("already_covered"):
+                        st.success(f"✅ Range already stored - nothing to fetch ({elapsed_time:.1f} seconds)")
+                    else:
+                        st.success(f"✅ Fetched and stored {result['records']:,} records in {elapsed_time:.1f} seconds")
+                elif status["status"] == "incomplete":
+                    st.warning(
+                        f"⚠️ Stored {result['records']:,} records in {elapsed_time:.1f} seconds "
+                        f"(INCOMPLETE: {result.get('pages_dropped', 0)} page(s) dropped)"
+                    )
+                    with st.expander("Dropped pages"):
+                        st.json(result.get("dropped_pages", []))
+                else:
+                    st.error(f"Fetch failed: {status.get('error', 'unknown task')}")
+                
+                if status["status"] in ("completed", "incomplete"):
                     # Show data summary
                     summary_response = requests.get(
                         f"{API_URL}/api/data-summary",
@@ -134,19 +206,19 @@ if page == "Data Fetcher":
                                 st.metric("Date Range", 
                                     f"{summary['date_range']['start'][:10]} to {summary['date_range']['end'][:10]}")
                         with col4:
-                            if summary['record_count'] > 0:
-                                rate = summary['record_count'] / elapsed_time
+                            if result.get("records"):
+                                rate = result["records"] / elapsed_time
                                 st.metric("Fetch Rate", f"{rate:,.0f} records/sec")
-                else:
-                    error_detail = response.json().get('detail', 'Unknown error')
-                    st.error(f"Error: {error_detail}")
-                    
-            except requests.exceptions.Timeout:
-                st.error("⏱️ Request timed out. Try a smaller date range or check your connection.")
-            except requests.exceptions.ConnectionError:
-                st.error("❌ Could not connect to the API server. Make sure it's running.")
-            except Exception as e:
-                st.error(f"Failed to fetch data: {str(e)}")
+            else:
+                error_detail = response.json().get('detail', 'Unknown error')
+                st.error(f"Error: {error_detail}")
+                
+        except requests.exceptions.Timeout:
+            st.error("⏱️ Request timed out. Check that the API server is responsive.")
+        except requests.exceptions.ConnectionError:
+            st.error("❌ Could not connect to the API server. Make sure it's running.")
+        except Exception as e:
+            st.error(f"Failed to fetch data: {str(e)}")
 
 # Analytics Generator Page (unchanged but with minor optimization)
 elif page == "Analytics Generator":
@@ -179,19 +251,29 @@ elif page == "Analytics Generator":
             
             with st.spinner("Generating template with AI..."):
                 try:
-                    response = requests.post(
-                        f"{API_URL}/api/generate-template",
-                        json={
+                    # Code is shown while the model writes it, then replaced by the validated template
+                    live_code = st.empty()
+                    result, error = stream_generation(
+                        {
                             "prompt": prompt,
                             "save_template": save_template,
                             "template_name": template_name
                         },
-                        timeout=30
+                        live_code
                     )
+                    live_code.empty()
                     
-                    if response.status_code == 200:
-                        result = response.json()
+                    if result is not None:
                         st.success("✅ Template generated successfully!")
+                        if result.get("cache"):
+                            match = result["cache"]
+                            st.caption(f"♻️ Reused the template generated for \"{match['prompt']}\" "
+                                       f"({match['match']} match, similarity {match['similarity']:.2f})")
+                        
+                        if result.get("rewritten_columns"):
+                            st.caption(f"🔧 SELECT * narrowed to: {', '.join(result['rewritten_columns'])}")
+                        for warning in result.get("warnings") or []:
+                            st.warning(f"⚡ Line {warning['line']}: {warning['message']}")
                         
                         # Save to session state
                         st.session_state.generated_code = result["code"]
@@ -205,7 +287,7 @@ elif page == "Analytics Generator":
                         if save_template:
                             st.info(f"💾 Template saved with ID: {result.get('template_id')}")
                     else:
-                        st.error(f"Error: {response.json().get('detail', 'Unknown error')}")
+                        st.error(f"Error: {error}")
                         
                 except Exception as e:
                     st.error(f"Failed to generate template: {str(e)}")
@@ -272,15 +354,29 @@ elif page == "Analytics Generator":
                                         else:
                                             df = pd.DataFrame(data)
                                             
+                                            handle = output.get("data_handle")
                                             if not df.empty:
                                                 st.dataframe(df, use_container_width=True)
                                                 
+                                                if handle:
+                                                    # Large results stay on the server; this is the preview
+                                                    st.info(f"Showing the first {len(df):,} of {handle['rows']:,} rows")
+                                                    st.markdown(
+                                                        f"Full result: [NDJSON]({API_URL}/api/results/{handle['id']}/stream) · "
+                                                        f"[Arrow]({API_URL}/api/results/{handle['id']}/stream?format=arrow)"
+                                                    )
+                                                
                                                 col1, col2 = st.columns(2)
                                                 with col1:
-                                                    st.metric("Rows", len(df))
+                                                    st.metric("Rows", handle["rows"] if handle else len(df))
                                                 with col2:
                                                     st.metric("Columns", len(df.columns))
-                                                
+
+                                                if output.get("totals"):
+                                                    # Analytics specs with "totals": true
+                                                    st.caption(f"Totals · source: {output.get('source', 'ticks')}")
+                                                    st.dataframe(pd.DataFrame([output["totals"]]), use_container_width=True)
+
                                                 csv = df.to_csv(index=False)
                                                 st.download_button(
                                                     label="📥 Download CSV",
@@ -298,15 +394,27 @@ elif page == "Analytics Generator":
                             
                             if output.get("type") in ["chart", "both"]:
                                 st.subheader("📈 Visualization")
-                                if "chart" in output and output["chart"]:
-                                    img_data = base64.b64decode(output["chart"])
-                                    st.image(img_data)
+                                chart = output.get("chart")
+                                if isinstance(chart, dict) and chart.get("format") == "plotly":
+                                    st.plotly_chart(chart["spec"], use_container_width=True)
+                                elif isinstance(chart, dict) and chart.get("format") == "vega-lite":
+                                    st.vega_lite_chart(chart["spec"], use_container_width=True)
+                                elif chart:
+                                    # Stored charts arrive as a URL; inline base64 from CHART_FORMAT=inline
+                                    if isinstance(chart, dict):
+                                        img_data, fmt = fetch_chart(chart["url"]), chart["format"]
+                                    else:
+                                        img_data, fmt = base64.b64decode(chart), "png"
+                                    if fmt == "svg":
+                                        st.image(img_data.decode())
+                                    else:
+                                        st.image(img_data)
                                     
                                     st.download_button(
                                         label="📥 Download Chart",
                                         data=img_data,
-                                        file_name=f"{exec_symbol}_chart_{exec_start}.png",
-                                        mime="image/png"
+                                        file_name=f"{exec_symbol}_chart_{exec_start}.{fmt}",
+                                        mime="image/svg+xml" if fmt == "svg" else "image/png"
                                     )
                         else:
                             st.error(f"Execution failed: {result.get('error')}")
@@ -20,7 +20,7 @@ echo ""
 show_menu() {
     echo "Select a maintenance task:"
     echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-    echo "1) Clean old tick data (>30 days)"
+    echo "1) Drop old tick data partitions (>30 days)"
     echo "2) Optimize database (VACUUM and ANALYZE)"
     echo "3) Clear Redis cache"
     echo "4) Clean old logs"
@@ -36,26 +36,26 @@ show_menu() {
 
 # Function to clean old tick data
 clean_old_data() {
-    echo -e "${YELLOW}Cleaning tick data older than 30 days...${NC}"
-    
-    # Get count before deletion
-    COUNT=$(docker exec polygon-analytics-postgres-1 psql -U postgres -d $DB_NAME -t -c \
-        "SELECT COUNT(*) FROM tick_data WHERE created_at < NOW() - INTERVAL '30 days';")
-    
-    if [ "$COUNT" -gt 0 ]; then
-        echo "Found $COUNT records to delete"
-        echo -n "Proceed with deletion? (yes/no): "
-        read confirm
-        
-        if [ "$confirm" = "yes" ]; then
-            docker exec polygon-analytics-postgres-1 psql -U postgres -d $DB_NAME -c \
-                "DELETE FROM tick_data WHERE created_at < NOW() - INTERVAL '30 days';"
-            echo -e "${GREEN}✓ Deleted $COUNT old records${NC}"
-        else
-            echo "Deletion cancelled"
-        fi
+    echo -e "${YELLOW}Dropping tick data partitions older than 30 days...${NC}"
+    
+    # tick_data is range-partitioned by time, so retention is a partition drop
+    # (no DELETE, no table bloat, no VACUUM needed afterwards)
+    if [ ! -f venv/bin/activate ]; then
+        echo -e "${RED}Virtual environment not found${NC}"
+        return
+    fi
+    source venv/bin/activate
+    
+    echo "Current partitions:"
+    python -m app.services.tick_partitions list | sed 's/^/  /'
+    echo -n "Drop partitions older than 30 days? (yes/no): "
+    read confirm
+    
+    if [ "$confirm" = "yes" ]; then
+        python -m app.services.tick_partitions retention --days 30
+        echo -e "${GREEN}✓ Old partitions (and their cached tick files) dropped${NC}"
     else
-        echo "No old records found"
+        echo "Deletion cancelled"
     fi
 }
 
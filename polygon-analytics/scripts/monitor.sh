@@ -110,6 +110,20 @@ fi
 
 echo ""
 
+# Ingest metrics from the API's Prometheus endpoint
+echo -e "${YELLOW}⏱️  INGEST METRICS${NC}"
+echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+METRICS=$(curl -s --max-time 5 http://localhost:8000/metrics)
+if [ -n "$METRICS" ]; then
+    echo "$METRICS" | grep -E '^(polygon_responses_total|ingest_rows_written_total|ingest_write_queue_depth|polygon_concurrency_limit|ingest_last_job_rows_per_second|ingest_jobs_total)' | sed 's/^/  /'
+    echo "  Writer time by stage (seconds):"
+    echo "$METRICS" | grep -E '^ingest_batch_stage_seconds_sum' | sed 's/ingest_batch_stage_seconds_sum{stage="\(.*\)"}/    \1/'
+else
+    echo "  /metrics not reachable"
+fi
+
+echo ""
+
 # Recent Logs
 echo -e "${YELLOW}📋 RECENT LOG ENTRIES${NC}"
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
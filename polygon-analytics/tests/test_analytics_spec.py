@@ -0,0 +1,134 @@
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from app.services.analytics_spec import AnalyticsSpec, Filter, compile_spec, parse_spec, run_spec, spec_template
+from app.services.bar_rollups import BarRollups
+from app.services.tick_partitions import TickPartitionManager
+
+
+def test_filter_values_are_typed_like_their_column():
+    assert Filter(column="exchange", op="=", value=4).value == "4"
+    assert Filter(column="exchange", op="in", value=[4, 11.0, "12"]).value == ["4", "11", "12"]
+    assert Filter(column="size", op=">=", value="100").value == 100.0
+    assert Filter(column="price", op="<", value=10).value == 10
+    with pytest.raises(ValidationError):
+        Filter(column="size", op=">", value="large")
+    with pytest.raises(ValidationError):
+        Filter(column="price", op=">", value=[1, 2])
+
+
+def test_spec_validation():
+    with pytest.raises(ValidationError, match="aggregations"):
+        AnalyticsSpec(aggregations=[])
+    with pytest.raises(ValidationError, match="need an interval"):
+        AnalyticsSpec(aggregations=["cumulative_vwap"])
+    with pytest.raises(ValidationError, match="30s, 5m"):
+        AnalyticsSpec(interval="5x", aggregations=["volume"])
+    with pytest.raises(ValidationError, match="not one of the aggregations"):
+        AnalyticsSpec(interval="1h", aggregations=["volume"], charts=[{"y": "vwap"}])
+
+
+def test_compile_binds_exchange_filters_as_text():
+    spec = AnalyticsSpec(aggregations=["volume"], filters=[{"column": "exchange", "op": "=", "value": 4},
+                                                           {"column": "exchange", "op": "in", "value": [4, 11]}])
+    sql, params, source = compile_spec(spec, "aa", "2024-01-02", "2024-01-02")
+    assert source == "ticks"
+    assert params["symbol"] == "AA"
+    assert params["filter_0"] == "4" and params["filter_1"] == ["4", "11"]
+    assert "exchange = :filter_0" in sql and "exchange = ANY(:filter_1)" in sql
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ("2024-01-02", "2024-01-02", "bars:1h"),
+    ("2024-01-02", "2024-01-02 23:59:59", "bars:1h"),
+    ("2024-01-02 09:30:00", "2024-01-02", "bars:5m"),
+    ("2024-01-02 09:31:00", "2024-01-02", "bars:1m"),
+    ("2024-01-02 09:30:30", "2024-01-02", "bars:1s"),
+])
+def test_bars_are_used_only_when_the_range_aligns(start, end, expected):
+    spec = AnalyticsSpec(interval="1h", aggregations=["volume", "vwap"])
+    assert compile_spec(spec, "AA", start, end)[2] == expected
+
+
+def test_tick_only_aggregations_and_forced_bars():
+    assert compile_spec(AnalyticsSpec(interval="1h", aggregations=["avg_price"]), "AA", "2024-01-02", "2024-01-02")[2] == "ticks"
+    spec = AnalyticsSpec(source="bars", interval="1h", aggregations=["volume"],
+                         filters=[{"column": "size", "op": ">", "value": 100}])
+    with pytest.raises(ValueError, match="tick_bars"):
+        compile_spec(spec, "AA", "2024-01-02", "2024-01-02")
+
+
+def test_parse_spec_and_template_round_trip():
+    response = 'Here you go:\n```json\n{"interval": "5m", "aggregations": ["vwap"], "totals": true}\n```'
+    spec = parse_spec(response)
+    assert spec.interval == "5m" and spec.totals
+    assert parse_spec("```python\ndef analyze_data(): pass\n```") is None
+    assert parse_spec('{"not": "a spec"}') is None
+
+    namespace = {}
+    exec(spec_template(spec), namespace)
+    assert namespace["SPEC"] == {"interval": "5m", "aggregations": ["vwap"], "totals": True}
+
+
+def _ns(value):
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()) * 1_000_000_000
+
+
+@pytest.fixture
+def ticks(db_session):
+    """Six ZZTEST trades on 2031-03-10 across two hours and exchanges, with their bars"""
+    TickPartitionManager("day").ensure_partitions(db_session, [(_ns("2031-03-10"), _ns("2031-03-11"))])
+    trades = [("09:00:01", 10.0, 100, "4"), ("09:30:00", 12.0, 300, "11"), ("09:59:59", 11.0, 100, "4"),
+              ("10:00:00", 13.0, 200, "4"), ("10:15:00", 9.0, 100, "11"), ("23:59:59.5", 14.0, 100, "4")]
+    for ts, price, size, exchange in trades:
+        db_session.execute(text(
+            "INSERT INTO tick_data (symbol, timestamp, price, size, exchange) "
+            "VALUES ('ZZTEST', :ts, :price, :size, :exchange)"
+        ), {"ts": f"2031-03-10 {ts}", "price": price, "size": size, "exchange": exchange})
+    BarRollups(["1s", "1m", "5m", "1h", "1d"]).rebuild(db_session, "ZZTEST", _ns("2031-03-10"), _ns("2031-03-11"))
+    return db_session
+
+
+def test_run_spec_matches_between_ticks_and_bars(ticks):
+    spec = {"interval": "1h", "aggregations": ["volume", "trade_count", "vwap", "open", "close",
+                                               "cumulative_volume"], "totals": True}
+    from_ticks = run_spec(ticks, "ZZTEST", "2031-03-10", "2031-03-10", dict(spec, source="ticks"))
+    from_bars = run_spec(ticks, "ZZTEST", "2031-03-10 00:00:00", "2031-03-10 23:59:59", spec)
+
+    assert from_ticks["source"] == "ticks" and from_bars["source"] == "bars:1h"
+    assert [row["volume"] for row in from_ticks["data"]] == [500, 300, 100]
+    assert [row["cumulative_volume"] for row in from_bars["data"]] == [500, 800, 900]
+    for a, b in zip(from_ticks["data"], from_bars["data"]):
+        assert a["bucket"] == b["bucket"]
+        assert {k: v for k, v in a.items() if k != "bucket"} == pytest.approx({k: v for k, v in b.items() if k != "bucket"})
+    # The last trade, half a second before midnight, is in range
+    assert from_ticks["totals"]["trade_count"] == from_bars["totals"]["trade_count"] == 6
+    assert from_bars["totals"]["close"] == 14.0
+    assert from_bars["totals"]["vwap"] == pytest.approx((1000 + 3600 + 1100 + 2600 + 900 + 1400) / 900)
+
+
+def test_run_spec_groups_and_filters_by_exchange(ticks):
+    result = run_spec(ticks, "ZZTEST", "2031-03-10", "2031-03-10", {
+        "group_by": ["exchange"],
+        "aggregations": ["trade_count", "volume"],
+        "filters": [{"column": "exchange", "op": "=", "value": 11}, {"column": "size", "op": ">=", "value": "100"}],
+    })
+    assert result["data"] == [{"exchange": "11", "trade_count": 2, "volume": 400}]
+
+
+def test_spec_template_executes_with_a_chart(ticks, tmp_path):
+    from app.services.chart_store import ChartStore
+    from app.services.result_store import ResultStore
+    from app.services.template_executor import TemplateExecutor
+
+    executor = TemplateExecutor(result_store=ResultStore(str(tmp_path)), chart_store=ChartStore(str(tmp_path)))
+    code = spec_template({"interval": "1h", "aggregations": ["open", "volume"], "charts": [{"mark": "bar", "y": "volume"}]})
+    assert executor.validate_template(code)["valid"]
+    out = executor.execute_template(code, ticks, "ZZTEST", "2031-03-10", "2031-03-10")
+    assert out["success"], out["error"]
+    assert out["result"]["source"] == "bars:1h"
+    assert out["result"]["chart"]["format"] == "vega-lite"
+    assert [row["open"] for row in out["result"]["data"]] == [10.0, 13.0, 14.0]
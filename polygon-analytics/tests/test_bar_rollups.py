@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from app.services.bar_rollups import compute_bars, load_bars, parse_intervals
+
+MINUTE = 60 * 1_000_000_000
+
+
+def test_parse_intervals_keeps_canonical_order():
+    assert parse_intervals("1h, 1s,1m") == ["1s", "1m", "1h"]
+    assert parse_intervals("") == []
+    with pytest.raises(ValueError):
+        parse_intervals("1m,2m")
+
+
+def test_compute_bars_orders_trades_by_timestamp():
+    # Out of arrival order: open/close must follow trade time
+    cols = {
+        'timestamp_ns': np.array([MINUTE + 30, 10, MINUTE + 5, 20], dtype=np.int64),
+        'price': np.array([4.0, 1.0, 3.0, 2.0]),
+        'size': np.array([40, 10, 30, 20], dtype=np.int32),
+    }
+    rows = compute_bars(cols, ["1m"])
+    assert rows == [
+        ("1m", 0, 1.0, 2.0, 1.0, 2.0, 30, 2, 50.0, 10, 20),
+        ("1m", 60, 3.0, 4.0, 3.0, 4.0, 70, 2, 250.0, MINUTE + 5, MINUTE + 30),
+    ]
+
+
+def test_compute_bars_empty_batch():
+    assert compute_bars({'timestamp_ns': np.array([], dtype=np.int64)}, ["1s"]) == []
+
+
+def _insert_bar(db, bucket):
+    db.execute(text("""
+        INSERT INTO tick_bars (symbol, interval, bucket, open, high, low, close,
+                               volume, trade_count, pv_sum, first_ts, last_ts)
+        VALUES ('ZZTEST', '1h', :bucket, 1, 1, 1, 1, 100, 1, 100, 0, 0)
+    """), {"bucket": bucket})
+
+
+@pytest.mark.parametrize("end_date", ["2031-03-10", "2031-03-10 23:59:59"])
+def test_load_bars_includes_the_whole_end_day(db_session, end_date):
+    for bucket in ("2031-03-09 23:00", "2031-03-10 00:00", "2031-03-10 15:00", "2031-03-11 00:00"):
+        _insert_bar(db_session, bucket)
+    bars = load_bars(db_session, "ZZTEST", "2031-03-10", end_date, interval="1h")
+    assert [str(b) for b in bars['bucket']] == ["2031-03-10 00:00:00", "2031-03-10 15:00:00"]
+    assert bars['vwap'].tolist() == [1.0, 1.0]
@@ -0,0 +1,90 @@
+import base64
+import json
+import os
+
+import matplotlib.pyplot as plt
+import pytest
+
+from app.services.chart_store import ChartStore, render_figure
+from app.services.result_store import ResultStore
+from app.services.template_executor import TemplateExecutor
+
+
+def _figure():
+    fig, ax = plt.subplots()
+    ax.plot([1, 3, 2])
+    return fig
+
+
+def test_identical_images_share_one_file(tmp_path):
+    store = ChartStore(str(tmp_path))
+    first = store.put(b"\x89PNG\r\n\x1a\nimage")
+    second = store.put(b"\x89PNG\r\n\x1a\nimage")
+    assert first == second
+    assert first["url"] == f"/api/charts/{first['chart_id']}.png"
+    assert os.listdir(tmp_path) == [f"{first['chart_id']}.png"]
+    with pytest.raises(ValueError):
+        store.put(b"GIF89a", "gif")
+    with pytest.raises(KeyError):
+        store.path("../secret", "png")
+
+
+def test_legacy_base64_charts(tmp_path):
+    store = ChartStore(str(tmp_path))
+    png = base64.b64encode(b"\x89PNG\r\n\x1a\nimage").decode()
+    assert store.put_base64(png)["bytes"] == 13
+    assert store.put_base64("not base64!") is None
+    assert store.put_base64(base64.b64encode(b"plain text").decode()) is None
+
+
+@pytest.mark.parametrize("fmt", ["png", "svg"])
+def test_rendering_is_deterministic(fmt):
+    fig = _figure()
+    try:
+        assert render_figure(fig, fmt) == render_figure(fig, fmt)
+    finally:
+        plt.close(fig)
+
+
+def test_expired_charts_are_purged(tmp_path):
+    store = ChartStore(str(tmp_path), ttl_seconds=60)
+    old = store.put(b"old")
+    store.put(b"new")
+    os.utime(store.path(old["chart_id"], "png"), (0, 0))
+    assert store.purge_expired() == 1
+    # Storing a chart again refreshes it
+    store.put(b"new")
+    assert len(os.listdir(tmp_path)) == 1
+
+
+class FakePlotlyFigure:
+    def to_plotly_json(self):
+        return {"data": [{"type": "bar", "y": [1, 2]}]}
+
+    def to_json(self):
+        return json.dumps(self.to_plotly_json())
+
+
+def test_template_charts_become_references(tmp_path):
+    store = ChartStore(str(tmp_path))
+    executor = TemplateExecutor(result_store=ResultStore(str(tmp_path / "results")), chart_store=store)
+    executor.chart_format = "png"
+
+    svg = executor._render_chart(_figure(), format="svg")
+    assert svg["format"] == "svg" and os.path.exists(store.path(svg["chart_id"], "svg"))
+    assert executor._render_chart(FakePlotlyFigure()) == {"format": "plotly", "spec": FakePlotlyFigure().to_plotly_json()}
+    assert executor._render_chart({"mark": "bar"}) == {"format": "vega-lite", "spec": {"mark": "bar"}}
+
+    # Templates that still build base64 PNGs get a reference too
+    code = '''
+def analyze_data(db_session, symbol, start_date, end_date):
+    fig, ax = plt.subplots()
+    ax.bar([1, 2], [3, 4])
+    return {"type": "chart", "chart": fig_to_base64(fig)}
+'''
+    chart = executor.execute_template(code, None, "ZZTEST", "2031-03-10", "2031-03-10")["result"]["chart"]
+    assert chart["format"] == "png" and chart["url"].startswith("/api/charts/")
+
+    executor.chart_format = "inline"
+    inline = executor.execute_template(code, None, "ZZTEST", "2031-03-10", "2031-03-10")["result"]["chart"]
+    assert base64.b64decode(inline).startswith(b"\x89PNG")
@@ -0,0 +1,86 @@
+import json
+import struct
+from datetime import datetime, timedelta
+
+from app.services.copy_encoder import (
+    BINARY_HEADER, BINARY_TRAILER, COPY_COLUMNS, binary_copy_sql, encode_trades_binary, encode_trades_text
+)
+
+TRADES = [
+    {"participant_timestamp": 1_930_000_000_123_456_789, "price": 101.25, "size": 100, "exchange": 4,
+     "conditions": [12, 37]},
+    {"sip_timestamp": 1_930_000_001_000_000_000, "price": 101.5, "size": 7.0, "exchange": 11},
+    {"price": 99.0, "size": 1},  # no timestamp: skipped
+    {"participant_timestamp": 1_930_000_002_000_001_000, "price": 100.0, "size": 250, "exchange": 4,
+     "conditions": [12, 37]},
+    {"participant_timestamp": 1_930_000_003_000_000_000, "price": 100.5, "size": 3, "exchange": None,
+     "conditions": []},
+]
+
+
+def decode_binary(payload):
+    """Rows of a binary COPY payload as (symbol, timestamp, price, size, exchange, conditions)"""
+    assert payload.startswith(BINARY_HEADER) and payload.endswith(BINARY_TRAILER)
+    pos, end, rows = len(BINARY_HEADER), len(payload) - len(BINARY_TRAILER), []
+    while pos < end:
+        (nfields,), pos = struct.unpack_from(">h", payload, pos), pos + 2
+        fields = []
+        for _ in range(nfields):
+            (length,), pos = struct.unpack_from(">i", payload, pos), pos + 4
+            fields.append(payload[pos:pos + length])
+            pos += length
+        symbol, ts, price, size, exchange, conditions = fields
+        rows.append((
+            symbol.decode(),
+            datetime(2000, 1, 1) + timedelta(microseconds=struct.unpack(">q", ts)[0]),
+            struct.unpack(">d", price)[0],
+            struct.unpack(">i", size)[0],
+            exchange.decode(),
+            json.loads(conditions),
+        ))
+    return rows
+
+
+def decode_text(buffer):
+    rows = []
+    for line in buffer.read().splitlines():
+        symbol, ts, price, size, exchange, conditions = line.split("\t")
+        rows.append((symbol, datetime.fromisoformat(ts), float(price), int(size), exchange, json.loads(conditions)))
+    return rows
+
+
+def test_binary_and_text_encodings_agree():
+    payload, count = encode_trades_binary(TRADES, "ZZTEST")
+    buffer, text_count = encode_trades_text(TRADES, "ZZTEST")
+    assert count == text_count == 4
+    # Binary rows are grouped by tail width, so compare as sets of rows
+    assert sorted(decode_binary(payload)) == sorted(decode_text(buffer))
+    assert (("ZZTEST", datetime(2031, 2, 27, 23, 6, 40, 123456), 101.25, 100, "4", [12, 37])
+            in decode_binary(payload))
+
+
+def test_empty_page_encodes_to_nothing():
+    assert encode_trades_binary([], "ZZTEST") == (b"", 0)
+    assert encode_trades_binary([{"price": 1.0}], "ZZTEST") == (b"", 0)
+
+
+def test_binary_copy_sql_names_the_table_and_columns():
+    assert binary_copy_sql("tick_data_staging_1") == (
+        f"COPY tick_data_staging_1 ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+    )
+
+
+def test_binary_payload_loads_into_postgres(db_session):
+    import io
+    from sqlalchemy import text
+
+    db_session.execute(text("CREATE TEMP TABLE zz_copy (LIKE tick_data INCLUDING DEFAULTS)"))
+    payload, _ = encode_trades_binary(TRADES, "ZZTEST")
+    cursor = db_session.connection().connection.cursor()
+    cursor.copy_expert(binary_copy_sql("zz_copy"), io.BytesIO(payload))
+
+    rows = db_session.execute(text(
+        "SELECT timestamp, price, size, exchange, conditions FROM zz_copy ORDER BY timestamp"
+    )).fetchall()
+    assert [(r.size, r.exchange) for r in rows] == [(100, "4"), (7, "11"), (250, "4"), (3, "")]
+    assert rows[0].timestamp == datetime(2031, 2, 27, 23, 6, 40, 123456)
@@ -0,0 +1,63 @@
+from datetime import date, datetime, timezone
+
+from app.services.coverage_ledger import NS_PER_DAY, CoverageLedger, day_start_ns, ns_to_naive_utc
+
+HOUR = 3_600 * 1_000_000_000
+MAR_10 = day_start_ns(date(2031, 3, 10))
+
+
+def test_ns_to_naive_utc():
+    assert ns_to_naive_utc(MAR_10 + HOUR + 1_500) == datetime(2031, 3, 10, 1, 0, 0, 1)
+
+
+def test_settle_window_keeps_recent_data_missing():
+    ledger = CoverageLedger(settle_seconds=0)
+    # 2031 hasn't happened yet, so nothing in it may be marked covered
+    assert ledger._settled_ns() < MAR_10
+
+
+def test_missing_ranges_follow_coverage(db_session):
+    ledger = CoverageLedger(settle_seconds=-10 * 365 * 86_400)  # treat 2031 as settled
+    assert ledger.missing_ranges(db_session, "ZZTEST", "2031-03-10", "2031-03-12") == [
+        (MAR_10, MAR_10 + 3 * NS_PER_DAY)
+    ]
+
+    # Whole first day plus the first 6 hours of the second
+    ledger.mark_covered(db_session, "ZZTEST", [(MAR_10, MAR_10 + NS_PER_DAY + 6 * HOUR)])
+    assert ledger.missing_ranges(db_session, "ZZTEST", "2031-03-10", "2031-03-12") == [
+        (MAR_10 + NS_PER_DAY + 6 * HOUR, MAR_10 + 3 * NS_PER_DAY)
+    ]
+
+    # A shorter, later fetch of the same day never moves coverage backwards
+    ledger.mark_covered(db_session, "ZZTEST", [(MAR_10 + NS_PER_DAY, MAR_10 + NS_PER_DAY + HOUR)])
+    ledger.mark_covered(db_session, "ZZTEST", [(MAR_10 + 2 * NS_PER_DAY, MAR_10 + 3 * NS_PER_DAY)])
+    assert ledger.missing_ranges(db_session, "ZZTEST", "2031-03-10", "2031-03-12") == [
+        (MAR_10 + NS_PER_DAY + 6 * HOUR, MAR_10 + 2 * NS_PER_DAY)
+    ]
+
+    # Deleting rows from the middle of the second day keeps only the coverage before them
+    ledger.clear_ranges(db_session, "ZZTEST", [(MAR_10 + NS_PER_DAY + 2 * HOUR, MAR_10 + 3 * NS_PER_DAY)])
+    assert ledger.missing_ranges(db_session, "ZZTEST", "2031-03-10", "2031-03-12") == [
+        (MAR_10 + NS_PER_DAY + 2 * HOUR, MAR_10 + 3 * NS_PER_DAY)
+    ]
+    ledger.clear_ranges(db_session, "ZZTEST", [(MAR_10, MAR_10 + NS_PER_DAY)])
+    assert ledger.missing_ranges(db_session, "ZZTEST", "2031-03-10", "2031-03-12") == [
+        (MAR_10, MAR_10 + NS_PER_DAY), (MAR_10 + NS_PER_DAY + 2 * HOUR, MAR_10 + 3 * NS_PER_DAY)
+    ]
+
+    ledger.mark_covered(db_session, "ZZTEST", [(MAR_10, MAR_10 + NS_PER_DAY)])
+    ledger.clear(db_session, "ZZTEST")
+    assert len(ledger.missing_ranges(db_session, "ZZTEST", "2031-03-10", "2031-03-10")) == 1
+
+
+def test_unsettled_ranges_are_not_marked(db_session):
+    from app.models.models import IngestCoverage
+
+    ledger = CoverageLedger(settle_seconds=900)
+    today = datetime.now(timezone.utc).date()
+    ledger.mark_covered(db_session, "ZZTEST", [(day_start_ns(today), day_start_ns(today) + NS_PER_DAY)])
+    covered_until = db_session.query(IngestCoverage.covered_until_ns).filter(
+        IngestCoverage.symbol == "ZZTEST", IngestCoverage.day == today
+    ).scalar()
+    # Coverage stops at the settle cutoff, so the last 15 minutes are fetched again next time
+    assert covered_until is None or covered_until <= ledger._settled_ns()
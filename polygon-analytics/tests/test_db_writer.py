@@ -0,0 +1,95 @@
+import queue
+import threading
+
+import pytest
+
+from app.services import polygon_service
+from app.services.polygon_service import PolygonService
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self):
+        self.rollbacks = 0
+        self.close_calls = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.close_calls += 1
+
+
+class RecordingWriter(PolygonService):
+    """Records COPY batches instead of writing them; fails on a chosen batch"""
+
+    def __init__(self, fail_on=None):
+        super().__init__()
+        self.connections = []
+        self.batches = []
+        self.fail_on = fail_on
+
+    def _get_db_connection(self):
+        self.connections.append(FakeConnection())
+        return self.connections[-1]
+
+    def _sync_bulk_insert(self, trades, symbol, conn, table="tick_data", progress=None):
+        if len(self.batches) == self.fail_on:
+            raise RuntimeError("disk full")
+        self.batches.append((symbol, len(trades)))
+        return len(trades)
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(polygon_service.settings, "ingest_batch_rows", 5)
+
+
+def _run(writer, items):
+    work = queue.Queue()
+    for item in items + [None]:
+        work.put(item)
+    return writer.db_writer_thread(work)
+
+
+def test_biggest_symbol_is_flushed_first():
+    writer = RecordingWriter()
+    stats = _run(writer, [("AAA", [{}] * 2), ("BBB", [{}] * 4), ("AAA", [{}] * 1), ("BBB", [{}] * 3)])
+    # At 5 buffered rows BBB (4) goes first; the rest is flushed at the sentinel
+    assert writer.batches[0] == ("BBB", 4)
+    assert stats["rows"] == {"AAA": 3, "BBB": 7}
+    assert stats["rows_lost"] == {} and stats["error"] is None
+    assert writer.connections[0].close_calls == 1
+
+
+def test_failed_batch_counts_lost_rows_and_drains_the_queue():
+    writer = RecordingWriter(fail_on=0)
+    stats = _run(writer, [("AAA", [{}] * 6), ("AAA", [{}] * 2), ("BBB", [{}] * 4)])
+    assert stats["error"] == "RuntimeError: disk full"
+    assert writer.batches == []
+    # Every row handed to this writer is either written or counted as lost
+    assert stats["rows_lost"] == {"AAA": 8, "BBB": 4}
+    assert writer.connections[0].rollbacks == 1
+
+
+def test_writers_share_one_queue():
+    writer = RecordingWriter()
+    work = queue.Queue()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(writer.db_writer_thread(work))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for i in range(30):
+        work.put((f"S{i % 3}", [{}] * 2))
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+
+    assert len(writer.connections) == 3
+    totals = {}
+    for stats in results:
+        for symbol, rows in stats["rows"].items():
+            totals[symbol] = totals.get(symbol, 0) + rows
+    assert totals == {"S0": 20, "S1": 20, "S2": 20}
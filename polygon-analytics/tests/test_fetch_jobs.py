@@ -0,0 +1,132 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.models.database import SessionLocal
+from app.models.models import FetchJob
+from app.services import fetch_jobs
+from app.services.fetch_jobs import FetchJobManager, FetchProgress, combined_snapshot
+
+
+class FlakySession:
+    """Fails the first commit like a dropped connection, then succeeds"""
+
+    commits = 0
+    rollbacks = 0
+
+    def get(self, model, job_id):
+        return SimpleNamespace(symbol="AA", symbols=None, progress=None)
+
+    def commit(self):
+        FlakySession.commits += 1
+        if FlakySession.commits == 1:
+            raise OperationalError("UPDATE fetch_jobs", {}, Exception("server closed the connection"))
+
+    def rollback(self):
+        FlakySession.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+def test_progress_flusher_survives_a_database_error(monkeypatch):
+    monkeypatch.setattr(fetch_jobs, "SessionLocal", FlakySession)
+    manager = FetchJobManager(polygon_service=None, persist_seconds=0.01)
+
+    async def run():
+        flusher = asyncio.create_task(manager._flush_progress("job", {"AA": FetchProgress()}))
+        await asyncio.sleep(0.1)
+        assert not flusher.done()
+        flusher.cancel()
+
+    asyncio.run(run())
+    assert FlakySession.rollbacks == 1
+    assert FlakySession.commits > 1
+
+
+def test_progress_snapshot_rates_and_eta():
+    progress = FetchProgress()
+    progress.set_span(100)
+    progress.add_span_done(25)
+    progress.add_page(1000)
+    progress.add_rows(500)
+    progress.add_status("200")
+    snapshot = progress.snapshot()
+    assert snapshot["fraction_done"] == 0.25
+    assert snapshot["pages_fetched"] == 1
+    assert snapshot["rows_written"] == 500
+    assert snapshot["http_statuses"] == {"200": 1}
+    assert snapshot["eta_seconds"] is not None
+
+
+def test_combined_snapshot_sums_symbols():
+    a, b = FetchProgress(), FetchProgress()
+    a.set_span(100)
+    a.add_span_done(100)
+    a.phase = "done"
+    b.set_span(100)
+    a.add_rows(10)
+    b.add_rows(5)
+    b.add_stage("copy", 1.5)
+    snapshot = combined_snapshot({"AA": a, "BB": b})
+    assert snapshot["fraction_done"] == 0.5
+    assert snapshot["rows_written"] == 15
+    assert snapshot["symbols_done"] == 1
+    assert snapshot["phase"] == "fetching"
+    assert snapshot["stage_seconds"] == {"copy": 1.5}
+
+
+class SlowBatchService:
+    """Counts batch fetches; each one yields to the loop like a real fetch"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch_and_store_batch(self, symbols, start_date, end_date, db, force=False, bulk=None, progress=None):
+        self.calls += 1
+        await asyncio.sleep(0.2)
+        return {"complete": True, "records": 0, "elapsed_seconds": 0.2,
+                "symbols": {symbol: {"complete": True, "records": 0} for symbol in symbols}}
+
+
+@pytest.fixture
+def interrupted_job(db_session):
+    """A committed ZZTEST job left "running" by a restart; the manager's own sessions must see it"""
+    db = SessionLocal()
+    if db.query(FetchJob).filter(FetchJob.status.in_(fetch_jobs.UNFINISHED)).count():
+        db.close()
+        pytest.skip("database has unfinished fetch jobs of its own")
+    job = FetchJob(id=uuid.uuid4().hex, symbol="ZZTEST", start_date="2031-03-10", end_date="2031-03-10",
+                   status="running", attempts=1)
+    db.add(job)
+    db.commit()
+    try:
+        yield job.id
+    finally:
+        db.query(FetchJob).filter(FetchJob.id == job.id).delete()
+        db.commit()
+        db.close()
+
+
+def test_two_workers_resuming_the_same_job_run_it_once(interrupted_job):
+    service = SlowBatchService()
+
+    async def run():
+        # Two API workers starting together, each resuming every unfinished job
+        first, second = FetchJobManager(service), FetchJobManager(service)
+        assert first.resume_unfinished() == 1
+        assert second.resume_unfinished() == 1
+        await asyncio.gather(*first._tasks.values(), *second._tasks.values())
+        assert FetchJobManager(service).resume_unfinished() == 0
+
+    asyncio.run(run())
+    assert service.calls == 1
+    db = SessionLocal()
+    try:
+        job = db.get(FetchJob, interrupted_job)
+        assert job.status == "completed" and job.attempts == 2
+    finally:
+        db.close()
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from app.services.fetch_scheduler import AdaptiveConcurrencyLimiter, AdaptiveFetchScheduler
+
+
+class FakeResponse:
+    def __init__(self, status, body=b"", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def read(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Hands out the queued responses in order, one per GET"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def _scheduler(max_retries=2):
+    return AdaptiveFetchScheduler("key", initial_limit=4, max_retries=max_retries, backoff_base=0.0)
+
+
+def test_fetch_returns_decoded_page():
+    scheduler = _scheduler()
+    page = {"results": [{"price": 1.0}]}
+    data = asyncio.run(scheduler.fetch(FakeSession(FakeResponse(200, json.dumps(page).encode())), "/v3/trades/AA"))
+    assert data == page
+    assert scheduler.pages_fetched == 1
+    assert scheduler.retries == 0
+
+
+def test_retryable_status_then_success():
+    scheduler = _scheduler()
+    session = FakeSession(FakeResponse(503), FakeResponse(200, b'{"results": []}'))
+    assert asyncio.run(scheduler.fetch(session, "/v3/trades/AA")) == {"results": []}
+    assert session.calls == 2
+    assert scheduler.retries == 1
+
+
+def test_client_error_is_not_retried():
+    scheduler = _scheduler()
+    session = FakeSession(FakeResponse(404), FakeResponse(200, b"{}"))
+    assert asyncio.run(scheduler.fetch(session, "/v3/trades/AA")) is None
+    assert session.calls == 1
+    assert scheduler.dropped_pages[0]["error"] == "HTTP 404"
+
+
+def test_truncated_body_is_retried():
+    scheduler = _scheduler()
+    session = FakeSession(FakeResponse(200, b'{"results": [{"pri'), FakeResponse(200, b'{"results": []}'))
+    assert asyncio.run(scheduler.fetch(session, "/v3/trades/AA")) == {"results": []}
+    assert scheduler.retries == 1
+    assert scheduler.dropped_pages == []
+
+
+def test_malformed_body_is_dropped_after_retries():
+    scheduler = _scheduler(max_retries=2)
+    session = FakeSession(*(FakeResponse(200, b"<html>bad gateway</html>") for _ in range(3)))
+    assert asyncio.run(scheduler.fetch(session, "/v3/trades/AA", {"limit": 50000})) is None
+    assert session.calls == 3
+    dropped, = scheduler.dropped_pages
+    assert dropped["attempts"] == 3
+    assert dropped["params"] == {"limit": 50000}
+    assert dropped["error"].startswith("Invalid JSON")
+    assert scheduler.report()["pages_dropped"] == 1
+
+
+def test_limiter_grows_after_a_window_and_halves_on_overload():
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=10)
+        for _ in range(4):
+            await limiter.acquire()
+            await limiter.release(0.01, overloaded=False)
+        grown = limiter.limit
+        await limiter.acquire()
+        limiter._last_decrease = -1e9
+        await limiter.release(0.01, overloaded=True)
+        return grown, limiter.limit
+
+    grown, cut = asyncio.run(run())
+    assert grown == 5
+    assert cut == 2.5
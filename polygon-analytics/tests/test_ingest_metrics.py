@@ -0,0 +1,51 @@
+from prometheus_client import REGISTRY, generate_latest
+
+from app.services.fetch_jobs import FetchProgress
+from app.services.ingest_metrics import observe_batch, observe_enqueue, observe_job, observe_request
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_observations_reach_prometheus_and_the_job_progress():
+    progress = FetchProgress()
+    before = {
+        "ok": sample("polygon_responses_total", status="200"),
+        "limited": sample("polygon_responses_total", status="429"),
+        "bytes": sample("polygon_response_bytes_total"),
+        "rows": sample("ingest_rows_written_total"),
+        "batches": sample("ingest_copy_batch_rows_count"),
+        "copy": sample("ingest_batch_stage_seconds_count", stage="copy"),
+    }
+
+    observe_request("200", 0.05, 1_000, progress)
+    observe_request("200", 0.15, 3_000, progress)
+    observe_request("429", 0.01, 0, progress)
+    observe_enqueue(7, 0.5, progress)
+    observe_batch(200_000, {"encode": 0.1, "copy": 0.4, "commit": 0.05}, progress)
+    observe_batch(50_000, {"encode": 0.1, "copy": 0.1}, progress)
+
+    assert sample("polygon_responses_total", status="200") - before["ok"] == 2
+    assert sample("polygon_responses_total", status="429") - before["limited"] == 1
+    assert sample("polygon_response_bytes_total") - before["bytes"] == 4_000
+    assert sample("ingest_rows_written_total") - before["rows"] == 250_000
+    assert sample("ingest_copy_batch_rows_count") - before["batches"] == 2
+    assert sample("ingest_batch_stage_seconds_count", stage="copy") - before["copy"] == 2
+    assert sample("ingest_write_queue_depth") == 7
+
+    snapshot = progress.snapshot()
+    assert snapshot["http_statuses"] == {"200": 2, "429": 1}
+    assert snapshot["stage_seconds"] == {"http": 0.21, "enqueue_wait": 0.5, "encode": 0.2, "copy": 0.5, "commit": 0.05}
+
+
+def test_job_outcomes_and_throughput():
+    before = sample("ingest_jobs_total", status="completed")
+    observe_job("completed", 1_000_000, 4.0)
+    observe_job("completed", 0, None)
+    assert sample("ingest_jobs_total", status="completed") - before == 2
+    assert sample("ingest_last_job_rows_per_second") == 250_000
+
+    exported = generate_latest().decode()
+    for name in ("polygon_request_seconds", "polygon_concurrency_limit", "ingest_enqueue_wait_seconds_total"):
+        assert name in exported
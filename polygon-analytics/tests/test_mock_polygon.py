@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from app.services import polygon_service
+from benchmarks.bench_ingest import _service
+from benchmarks.mock_polygon import NS_PER_DAY, TradeGenerator, create_app
+
+
+def test_generator_is_deterministic_and_indexable():
+    generator = TradeGenerator(trades_per_day=86_400)
+    trades = generator.trades("ZZTEST", 100, 110)
+    assert trades == generator.trades("ZZTEST", 100, 110)
+    assert trades != generator.trades("OTHER", 100, 110)
+    assert [t["sip_timestamp"] for t in trades] == sorted(t["sip_timestamp"] for t in trades)
+
+    lo, hi = trades[2]["sip_timestamp"], trades[7]["sip_timestamp"]
+    assert generator.expected_count("ZZTEST", lo, hi) == 5
+    assert generator.expected_count("ZZTEST", 0, NS_PER_DAY) == 86_400
+
+
+async def _fetch_from_mock(symbols, **options):
+    runner = web.AppRunner(create_app(**options), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    port = runner.addresses[0][1]
+    try:
+        service = _service(port, counting=True)
+        ranges = [(service._date_to_ns("2031-03-10"), service._date_to_ns("2031-03-11"))]
+        return await service.pipeline_fetch({symbol: ranges for symbol in symbols}), ranges[0]
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.parametrize("error_rate", [0.0, 0.2])
+def test_pipeline_fetches_every_mock_trade(monkeypatch, error_rate):
+    monkeypatch.setattr(polygon_service.settings, "fetch_slice_minutes", 360)
+    options = {"trades_per_day": 20_000, "page_size": 1_000, "error_rate": error_rate, "seed": 7}
+    report, (lo, hi) = asyncio.run(_fetch_from_mock(["ZZTEST", "OTHER"], **options))
+
+    generator = TradeGenerator(options["trades_per_day"])
+    assert report["pages_dropped"] == 0
+    for symbol in ("ZZTEST", "OTHER"):
+        assert report["symbols"][symbol]["rows_written"] == generator.expected_count(symbol, lo, hi)
+    assert (report["retries"] > 0) == (error_rate > 0)
@@ -0,0 +1,175 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from app.models.models import IngestCoverage
+from app.services.coverage_ledger import NS_PER_DAY
+from app.services.polygon_service import PolygonService
+
+RANGE = [["2031-03-10T00:00:00", "2031-03-11T00:00:00"]]
+
+
+class StubFetch(PolygonService):
+    """Skips HTTP: the pipeline either fails or writes nothing"""
+
+    def __init__(self, fail: bool, **kwargs):
+        super().__init__(**kwargs)
+        self.fail = fail
+
+    async def pipeline_fetch(self, ranges_by_symbol, table="tick_data", progress=None):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        empty = {"rows_written": 0, "pages_dropped": 0, "rows_lost": 0, "stage_seconds": {}}
+        return {
+            "symbols": {symbol: dict(empty) for symbol in ranges_by_symbol},
+            "rows_written": 0, "pages_fetched": 0, "pages_dropped": 0, "dropped_pages": [],
+            "windows": 0, "retries": 0, "final_concurrency": 1, "copy_batches": 0,
+            "rows_lost": 0, "write_errors": [],
+        }
+
+
+def _fetch(service, db):
+    return asyncio.run(service.fetch_and_store_batch(["ZZTEST"], "2031-03-10", "2031-03-10", db,
+                                                     force=True, bulk=False))
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_cleared_ranges_are_reported_even_when_the_fetch_fails(db_session, fail):
+    changed = []
+    service = StubFetch(fail, on_ranges_changed=lambda symbol, ranges: changed.append((symbol, ranges)))
+    service.partitions.ensure_partitions(db_session, [(service._date_to_ns("2031-03-10"),
+                                                       service._date_to_ns("2031-03-11"))])
+    db_session.execute(text(
+        "INSERT INTO tick_data (symbol, timestamp, price, size, exchange) "
+        "VALUES ('ZZTEST', '2031-03-10 12:00:00', 1.0, 100, '4')"
+    ))
+    db_session.add(IngestCoverage(symbol="ZZTEST", day=date(2031, 3, 10),
+                                  covered_until_ns=service._date_to_ns("2031-03-10") + NS_PER_DAY))
+    db_session.flush()
+
+    if fail:
+        with pytest.raises(RuntimeError):
+            _fetch(service, db_session)
+    else:
+        assert _fetch(service, db_session)["symbols"]["ZZTEST"]["ranges_fetched"] == RANGE
+
+    # The old rows are gone either way, so caches over them had to be told
+    assert db_session.execute(text("SELECT COUNT(*) FROM tick_data WHERE symbol = 'ZZTEST'")).scalar() == 0
+    # ...and the ledger must not keep claiming the deleted day (2031 is unsettled, so a success doesn't re-mark it)
+    assert db_session.query(IngestCoverage).filter(IngestCoverage.symbol == "ZZTEST").count() == 0
+    assert changed == [("ZZTEST", RANGE)]
+
+
+class PagedService(PolygonService):
+    """Serves trades at the given SIP timestamps from memory, page_size per page"""
+
+    def __init__(self, timestamps, page_size=3):
+        super().__init__()
+        self.timestamps = sorted(timestamps)
+        self.page_size = page_size
+        self.requests = []
+
+    async def fetch_page_ultra(self, session, scheduler, url, params=None, progress=None):
+        if params is not None:
+            symbol = url.rsplit("/", 1)[1]
+            lo, hi, offset = params["timestamp.gte"], params["timestamp.lt"], 0
+        else:
+            symbol, lo, hi, offset = url.split(":")[1:]
+            lo, hi, offset = int(lo), int(hi), int(offset)
+        self.requests.append((symbol, lo, hi, offset))
+        window = [ts for ts in self.timestamps if lo <= ts < hi]
+        page = window[offset:offset + self.page_size]
+        more = offset + self.page_size < len(window)
+        return {
+            "results": [{"sip_timestamp": ts, "price": 1.0, "size": 1} for ts in page],
+            "next_url": f"cursor:{symbol}:{lo}:{hi}:{offset + self.page_size}" if more else None,
+        }
+
+
+def _drain(write_queue):
+    rows = []
+    while not write_queue.empty():
+        symbol, trades = write_queue.get()
+        rows.extend((symbol, t["sip_timestamp"]) for t in trades)
+    return rows
+
+
+def test_time_slices_cover_ranges_without_overlap():
+    service = PolygonService()
+    step = 60 * 60 * 1_000_000_000
+    lo = service._date_to_ns("2031-03-10")
+    slices = service._time_slices([(lo, lo + 2 * step + 5), (lo + 10 * step, lo + 11 * step)])
+    assert slices == [(lo, lo + step), (lo + step, lo + 2 * step), (lo + 2 * step, lo + 2 * step + 5),
+                      (lo + 10 * step, lo + 11 * step)]
+
+
+@pytest.mark.parametrize("page_size", [2, 3, 50])
+def test_split_windows_deliver_every_trade_once(page_size):
+    import queue
+    from app.services.fetch_jobs import FetchProgress
+
+    second = 1_000_000_000
+    lo = PolygonService()._date_to_ns("2031-03-10")
+    # Ties at the same timestamp straddle page boundaries
+    timestamps = [lo + s * second for s in (1, 2, 3, 3, 3, 4, 10, 11, 11, 20, 30, 40, 41, 42, 50)]
+    service = PagedService(timestamps, page_size)
+    write_queue = queue.Queue()
+    counts = asyncio.run(service._run_windows(None, None, write_queue, {"ZZTEST": [(lo, lo + 60 * second)]},
+                                              {"ZZTEST": FetchProgress()}))
+
+    assert sorted(ts for _, ts in _drain(write_queue)) == timestamps
+    assert (counts["ZZTEST"] > 1) == (page_size < len(timestamps))
+
+
+def test_symbols_take_turns_starting_windows():
+    import queue
+    from app.services.fetch_jobs import FetchProgress
+
+    service = PagedService([])
+    hour = 60 * 60 * 1_000_000_000
+    windows = {symbol: [(h * hour, (h + 1) * hour) for h in range(3)] for symbol in ("AAA", "BBB")}
+    progress = {symbol: FetchProgress() for symbol in windows}
+    counts = asyncio.run(service._run_windows(None, None, queue.Queue(), windows, progress))
+
+    assert counts == {"AAA": 3, "BBB": 3}
+    assert [symbol for symbol, *_ in service.requests] == ["AAA", "BBB"] * 3
+    assert progress["AAA"].span_done_ns == 3 * hour
+
+
+class BatchStub(PolygonService):
+    """Reports a fixed outcome per symbol instead of fetching; ZZDROP loses a page"""
+
+    async def pipeline_fetch(self, ranges_by_symbol, table="tick_data", progress=None):
+        self.fetched = ranges_by_symbol
+        symbols = {}
+        for symbol in ranges_by_symbol:
+            dropped = [{"url": "x", "error": "HTTP 503", "attempts": 5}] if symbol == "ZZDROP" else []
+            symbols[symbol] = {"rows_written": 10, "pages_dropped": len(dropped), "dropped_pages": dropped,
+                               "rows_lost": 0, "stage_seconds": {}}
+        return {
+            "symbols": symbols, "rows_written": 10 * len(symbols), "pages_fetched": len(symbols),
+            "pages_dropped": 1 if "ZZDROP" in symbols else 0,
+            "dropped_pages": [p for s in symbols.values() for p in s["dropped_pages"]],
+            "windows": len(symbols), "retries": 0, "final_concurrency": 1, "copy_batches": len(symbols),
+            "rows_lost": 0, "write_errors": [],
+        }
+
+
+def test_batch_tracks_completeness_and_coverage_per_symbol(db_session):
+    service = BatchStub()
+    service.coverage.settle_seconds = 0
+    day = "2001-03-12"
+
+    first = asyncio.run(service.fetch_and_store_batch(["ZZTEST", "ZZDROP"], day, day, db_session, bulk=False))
+    assert set(service.fetched) == {"ZZTEST", "ZZDROP"}
+    assert first["records"] == 20 and not first["complete"]
+    assert first["symbols"]["ZZTEST"]["complete"] and not first["symbols"]["ZZDROP"]["complete"]
+
+    # Only the symbol that came back complete is skipped on the next run
+    second = asyncio.run(service.fetch_and_store_batch(["ZZTEST", "ZZDROP"], day, day, db_session, bulk=False))
+    assert set(service.fetched) == {"ZZDROP"}
+    assert second["symbols"]["ZZTEST"] == {"records": 0, "complete": True, "already_covered": True,
+                                           "ranges_fetched": []}
+    assert second["symbols"]["ZZDROP"]["dropped_pages"][0]["error"] == "HTTP 503"
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from app.models.models import AnalyticsTemplate
+from app.services.prompt_cache import PromptCache, normalize
+
+
+def test_normalize_drops_case_and_punctuation_only():
+    assert normalize("  Show me VWAP,  by hour! ") == "show me vwap by hour"
+    assert normalize("size >= 1000") != normalize("size <= 1000")
+    assert normalize("5-minute bars") == normalize("5 minute bars")
+
+
+def test_operators_distinguish_exact_keys():
+    assert PromptCache.key("trades with size > 1000") != PromptCache.key("trades with size < 1000")
+    assert PromptCache.key("price change +5%") != PromptCache.key("price change -5%")
+
+
+def test_exact_and_similar_hits():
+    cache = PromptCache(similarity=0.6)
+    cache.add("Show me hourly trading volume with a bar chart", "code-volume", "both", template_id=7)
+
+    hit = cache.lookup("show me HOURLY trading volume, with a bar chart")
+    assert hit["match"] == "exact" and hit["code"] == "code-volume" and hit["template_id"] == 7
+
+    hit = cache.lookup("hourly trading volume bar chart please")
+    assert hit["match"] == "similar" and hit["similarity"] >= 0.6
+
+    assert cache.lookup("price distribution histogram") is None
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["similar_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_similar_prompts_with_different_operators_or_numbers_miss():
+    cache = PromptCache(similarity=0.5)
+    prompt = "show hourly trading volume and vwap for trades with size > 1000 as a bar chart"
+    cache.add(prompt, "code-gt", "both")
+    assert cache.lookup(prompt.replace(">", "<")) is None
+    assert cache.lookup(prompt.replace("1000", "5000")) is None
+    assert cache.lookup(prompt.replace("bar chart", "line chart"))["code"] == "code-gt"
+
+
+def test_discard_and_eviction():
+    cache = PromptCache(max_entries=2)
+    cache.add("volume by hour", "a", "both")
+    cache.add("vwap by minute", "b", "both")
+    cache.add("price histogram", "c", "chart")
+    assert cache.lookup("volume by hour") is None
+    cache.discard("vwap by minute")
+    assert cache.lookup("vwap by minute") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_concurrent_generations_share_one_call():
+    cache = PromptCache()
+    calls = []
+
+    def generate(prompt):
+        calls.append(prompt)
+        time.sleep(0.1)
+        return {"code": "generated"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.generate_once("Volume by hour", generate)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["Volume by hour"]
+    assert results == [{"code": "generated"}] * 4
+    assert cache.stats()["deduplicated"] == 3
+
+
+def test_sync_indexes_saved_templates(db_session):
+    template = AnalyticsTemplate(name="zz", prompt="zz test prompt: volume where size > 7", python_code="zz-code",
+                                 output_type="table")
+    db_session.add(template)
+    db_session.flush()
+
+    cache = PromptCache()
+    assert cache.sync(db_session) >= 1
+    assert cache.lookup("ZZ test prompt volume where size > 7")["template_id"] == template.id
+    assert cache.sync(db_session) == 0
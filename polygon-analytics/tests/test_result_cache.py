@@ -0,0 +1,139 @@
+from types import SimpleNamespace
+
+from app.services import result_cache
+from app.services.result_cache import ResultCache, code_hash
+
+CODE = "def analyze_data(db_session, symbol, start_date, end_date):\n    return {}\n"
+
+
+class FakeRedis:
+    """The handful of Redis commands ResultCache uses, over a dict"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value.encode()
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field.encode()] = value.encode()
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key.decode() if isinstance(key, bytes) else key, None)
+
+    def expire(self, key, ttl):
+        pass
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+
+
+def test_keys_depend_on_code_symbol_and_range():
+    cache = ResultCache()
+    cache.set(CODE, "aapl", "2031-03-10", "2031-03-10", {"rows": 1})
+    assert cache.get(CODE, "AAPL", "2031-03-10", "2031-03-10") == {"rows": 1}
+    assert cache.get(CODE + "#", "AAPL", "2031-03-10", "2031-03-10") is None
+    assert cache.get(CODE, "MSFT", "2031-03-10", "2031-03-10") is None
+    assert cache.get(CODE, "AAPL", "2031-03-10", "2031-03-11") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+    assert code_hash(CODE) in cache.make_key(CODE, "AAPL", "a", "b")
+
+
+def test_invalidation_only_drops_overlapping_ranges():
+    cache = ResultCache()
+    cache.set(CODE, "AAPL", "2031-03-09", "2031-03-09", {"day": 9})
+    cache.set(CODE, "AAPL", "2031-03-10", "2031-03-12", {"day": 10})
+    cache.set(CODE, "MSFT", "2031-03-10", "2031-03-10", {"day": 10})
+
+    # Same bounds invalidate_fetched_ranges passes after a fetch of 2031-03-11
+    assert cache.invalidate("aapl", "2031-03-11T00:00:00", "2031-03-11T23:59:59") == 1
+    assert cache.get(CODE, "AAPL", "2031-03-10", "2031-03-12") is None
+    assert cache.get(CODE, "AAPL", "2031-03-09", "2031-03-09") == {"day": 9}
+    assert cache.get(CODE, "MSFT", "2031-03-10", "2031-03-10") == {"day": 10}
+
+    assert cache.invalidate("AAPL") == 1
+    assert cache.get(CODE, "AAPL", "2031-03-09", "2031-03-09") is None
+
+
+def test_lru_bound():
+    cache = ResultCache(max_entries=2)
+    for day in ("01", "02", "03"):
+        cache.set(CODE, "AAPL", f"2031-03-{day}", f"2031-03-{day}", {"day": day})
+    assert cache.stats()["local_entries"] == 2
+    assert cache.get(CODE, "AAPL", "2031-03-01", "2031-03-01") is None
+
+
+def test_invalidation_reaches_other_workers_through_redis():
+    shared = FakeRedis()
+    worker_a, worker_b = ResultCache(), ResultCache()
+    worker_a._redis = worker_b._redis = shared
+
+    worker_a.set(CODE, "AAPL", "2031-03-10", "2031-03-10", {"rows": 1})
+    # Worker B finds it in Redis and keeps a local copy
+    assert worker_b.get(CODE, "AAPL", "2031-03-10", "2031-03-10") == {"rows": 1}
+
+    worker_a.invalidate("AAPL", "2031-03-10", "2031-03-10")
+    # B's local copy is from an older generation, and Redis no longer has it
+    assert worker_b.get(CODE, "AAPL", "2031-03-10", "2031-03-10") is None
+    assert worker_a.get(CODE, "AAPL", "2031-03-10", "2031-03-10") is None
+
+
+def test_results_computed_across_an_invalidation_are_not_cached():
+    cache = ResultCache()
+    cached, generation = cache.lookup(CODE, "AAPL", "2031-03-10", "2031-03-10")
+    assert cached is None
+    # A fetch lands while the template is still running
+    cache.invalidate("AAPL", "2031-03-10", "2031-03-10")
+    cache.set(CODE, "AAPL", "2031-03-10", "2031-03-10", {"rows": 1}, generation)
+    assert cache.get(CODE, "AAPL", "2031-03-10", "2031-03-10") is None
+
+    _, generation = cache.lookup(CODE, "AAPL", "2031-03-10", "2031-03-10")
+    cache.set(CODE, "AAPL", "2031-03-10", "2031-03-10", {"rows": 2}, generation)
+    assert cache.get(CODE, "AAPL", "2031-03-10", "2031-03-10") == {"rows": 2}
+
+
+def test_unparseable_dates_are_not_cached():
+    cache = ResultCache()
+    cache._redis = FakeRedis()
+    cache.set(CODE, "AAPL", "March 10", "2031-03-10", {"rows": 1})
+    assert cache.get(CODE, "AAPL", "March 10", "2031-03-10") is None
+    assert cache._redis.data == {}
+
+
+class DownRedis:
+    """Every command fails like a stopped Redis server"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __getattr__(self, method):
+        def call(*args):
+            self.calls += 1
+            raise ConnectionRefusedError("Connection refused")
+        return call
+
+
+def test_redis_is_skipped_for_a_while_after_an_error(monkeypatch):
+    # Only the error type matters; the redis client itself is optional
+    monkeypatch.setattr(result_cache, "redis", SimpleNamespace(RedisError=ConnectionRefusedError))
+    cache = ResultCache(redis_retry_seconds=60)
+    cache._redis = down = DownRedis()
+    cache.set(CODE, "AAPL", "2031-03-10", "2031-03-10", {"rows": 1})
+    assert cache.get(CODE, "AAPL", "2031-03-10", "2031-03-10") == {"rows": 1}
+    cache.invalidate("AAPL")
+    assert down.calls == 1
+
+    cache._redis_down_until = 0
+    cache.get(CODE, "AAPL", "2031-03-10", "2031-03-10")
+    assert down.calls == 2
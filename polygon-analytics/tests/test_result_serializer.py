@@ -0,0 +1,67 @@
+import json
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from app.services.result_serializer import column_values, frame_records, to_jsonable
+
+
+def test_frames_become_records_with_missing_values_as_none():
+    df = pd.DataFrame({
+        "ts": pd.to_datetime(["2031-03-10 09:30:00", None, "2031-03-10 16:00:00"]),
+        "price": [1.5, np.nan, 3.0],
+        "size": np.array([100, 200, 300], dtype=np.int64),
+        "exchange": ["4", None, "11"],
+        "halted": [False, True, False],
+    })
+    assert frame_records(df) == [
+        {"ts": "2031-03-10 09:30:00", "price": 1.5, "size": 100, "exchange": "4", "halted": False},
+        {"ts": None, "price": None, "size": 200, "exchange": None, "halted": True},
+        {"ts": "2031-03-10 16:00:00", "price": 3.0, "size": 300, "exchange": "11", "halted": False},
+    ]
+
+
+def test_timestamps_are_written_like_str_timestamp():
+    # An all-midnight column keeps its time part, as the per-value conversion always did
+    midnight = pd.Series(pd.to_datetime(["2031-03-10", "2031-03-11", None]))
+    assert column_values(midnight) == ["2031-03-10 00:00:00", "2031-03-11 00:00:00", None]
+
+    fractional = pd.Series(pd.to_datetime(["2031-03-10 09:30:00", "2031-03-10 09:30:00.250"], format="ISO8601"))
+    assert column_values(fractional) == [str(v) for v in fractional]
+    assert [pd.Timestamp(v) for v in column_values(fractional)] == fractional.tolist()
+
+    aware = pd.Series(pd.to_datetime(["2031-03-10 09:30:00"]).tz_localize("UTC"))
+    assert column_values(aware) == ["2031-03-10 09:30:00+00:00"]
+
+
+def test_meaningful_indexes_become_columns():
+    ticks = pd.DataFrame({"hour": [9, 9, 10, 11], "size": [1, 2, 3, 4]})
+    assert frame_records(ticks.groupby("hour")["size"].sum()) == [
+        {"hour": 9, "size": 3}, {"hour": 10, "size": 3}, {"hour": 11, "size": 4}
+    ]
+    # Consecutive keys come back as a RangeIndex on pandas 3 but still name a column
+    hourly = pd.DataFrame({"hour": range(3), "size": [1, 2, 3]}).set_index("hour")
+    assert frame_records(hourly)[0] == {"hour": 0, "size": 1}
+    assert frame_records(pd.DataFrame({"a": [1]})) == [{"a": 1}]
+
+
+def test_nested_results_and_scalars():
+    result = {
+        "type": "both",
+        "data": pd.DataFrame({"v": [1.0]}),
+        "stats": {np.int64(1): np.float64("nan"), pd.Timestamp("2031-03-10"): np.float32(0.5), ("a", 1): [np.bool_(True)]},
+        "series": pd.Series([1, 2], name="n"),
+        "matrix": np.array([[1, 2], [3, 4]]),
+        "when": (datetime(2031, 3, 10, 9, 30), date(2031, 3, 10), pd.NaT, None),
+    }
+    out = to_jsonable(result)
+    assert out == {
+        "type": "both",
+        "data": [{"v": 1.0}],
+        "stats": {1: None, "2031-03-10 00:00:00": 0.5, "('a', 1)": [True]},
+        "series": [{"n": 1}, {"n": 2}],
+        "matrix": [[1, 2], [3, 4]],
+        "when": ["2031-03-10 09:30:00", "2031-03-10", None, None],
+    }
+    json.dumps(out, allow_nan=False)
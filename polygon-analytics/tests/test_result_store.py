@@ -0,0 +1,81 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from app.services.chart_store import ChartStore
+from app.services.result_store import ResultStore, as_table, preview_records
+from app.services.template_executor import TemplateExecutor
+
+
+def test_as_table_recognises_template_output_shapes():
+    df = pd.DataFrame({"a": [1, 2]})
+    assert as_table(df) is df
+    assert list(as_table(pd.Series([1, 2], name="a")).columns) == ["a"]
+    assert len(as_table([{"a": 1}, {"a": 2}])) == 2
+    assert len(as_table({"a": [1, 2], "b": [3, 4]})) == 2
+    for not_a_table in (None, [], [1, 2], {"total": 5}, "text"):
+        assert as_table(not_a_table) is None
+
+
+def test_put_page_stream_and_delete(tmp_path):
+    store = ResultStore(str(tmp_path), chunk_rows=4)
+    df = pd.DataFrame({"hour": range(10), "volume": [h * 100 for h in range(10)]})
+    handle = store.put(df.set_index("hour"))
+
+    # A meaningful index is kept as a column
+    assert handle["rows"] == 10 and handle["columns"] == ["hour", "volume"]
+    assert store.info(handle["id"])["rows"] == 10
+    assert store.page(handle["id"], offset=8, limit=5) == [{"hour": 8, "volume": 800}, {"hour": 9, "volume": 900}]
+
+    chunks = list(store.iter_ndjson(handle["id"]))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert rows == df.to_dict("records")
+
+    assert store.delete(handle["id"]) and not store.delete(handle["id"])
+    with pytest.raises(KeyError):
+        store.page(handle["id"])
+
+
+def test_handles_cannot_escape_the_directory(tmp_path):
+    store = ResultStore(str(tmp_path))
+    with pytest.raises(KeyError):
+        store.path("../../etc/passwd")
+    assert not store.delete("../x")
+
+
+def test_mixed_columns_and_previews(tmp_path):
+    df = pd.DataFrame({"value": [1, "two", 3.0]})
+    assert preview_records(df, 2) == [{"value": "1"}, {"value": "two"}]
+    assert ResultStore(str(tmp_path)).put(df)["rows"] == 3
+
+
+def test_expired_results_are_purged(tmp_path):
+    store = ResultStore(str(tmp_path), ttl_seconds=60)
+    old, new = store.put(pd.DataFrame({"a": [1]})), store.put(pd.DataFrame({"a": [2]}))
+    os.utime(store.path(old["id"]), (0, 0))
+    assert store.purge_expired() == 1
+    assert store.info(new["id"])["rows"] == 1
+
+
+def test_large_results_are_stored_with_a_preview(tmp_path):
+    store = ResultStore(str(tmp_path))
+    executor = TemplateExecutor(result_store=store, chart_store=ChartStore(str(tmp_path / "charts")))
+    executor.inline_max_rows, executor.preview_rows = 100, 5
+    code = '''
+def analyze_data(db_session, symbol, start_date, end_date):
+    return {"type": "table", "data": pd.DataFrame({"n": range(rows)})}
+'''
+    executor.globals_dict["rows"] = 101
+    out = executor.execute_template(code, None, "ZZTEST", "2031-03-10", "2031-03-10")
+    result = out["result"]
+    assert result["data"] == [{"n": n} for n in range(5)]
+    assert result["data_handle"]["rows"] == 101
+    assert store.page(result["data_handle"]["id"], 100, 10) == [{"n": 100}]
+
+    executor.globals_dict["rows"] = 100
+    executor._compiled.clear()
+    inline = executor.execute_template(code, None, "ZZTEST", "2031-03-10", "2031-03-10")["result"]
+    assert "data_handle" not in inline and len(inline["data"]) == 100
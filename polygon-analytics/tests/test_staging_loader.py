@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.services.staging_loader import StagingLoader
+from app.services.tick_partitions import TickPartitionManager
+
+
+def ns(value: str) -> int:
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()) * 1_000_000_000
+
+
+def test_span_days():
+    assert StagingLoader.span_days([(ns("2031-03-10"), ns("2031-03-12")), (ns("2031-04-01T12:00:00"), ns("2031-04-02"))]) == 2.5
+
+
+def test_merge_fills_existing_partitions_and_attaches_new_ones(db_session):
+    partitions = TickPartitionManager("day")
+    loader = StagingLoader(partitions)
+    # 2031-03-10 (and its neighbours) exist already; 2031-03-20 is built and attached by the merge
+    partitions.ensure_partitions(db_session, [(ns("2031-03-10"), ns("2031-03-11"))])
+    stage = loader.create_stage(db_session)
+    rows = [("2031-03-10 09:30:00", 10.0), ("2031-03-10 23:59:59", 11.0), ("2031-03-20 12:00:00", 12.0),
+            ("2031-03-25 12:00:00", 13.0)]
+    for ts, price in rows:
+        db_session.execute(text(
+            f"INSERT INTO {stage} (symbol, timestamp, price, size, exchange) "
+            f"VALUES ('ZZTEST', :ts, :price, 100, '4')"
+        ), {"ts": ts, "price": price})
+
+    ranges = [(ns("2031-03-10"), ns("2031-03-11")), (ns("2031-03-20"), ns("2031-03-21"))]
+    # Rows outside the fetched ranges (2031-03-25) stay behind
+    assert loader.merge(db_session, stage, ranges) == 3
+    assert "tick_data_p20310320" in partitions.existing_partitions(db_session)
+    assert db_session.execute(text(
+        "SELECT COUNT(*) FROM tick_data_p20310320 WHERE symbol = 'ZZTEST'"
+    )).scalar() == 1
+    prices = db_session.execute(text(
+        "SELECT price FROM tick_data WHERE symbol = 'ZZTEST' ORDER BY timestamp"
+    )).scalars().all()
+    assert prices == [10.0, 11.0, 12.0]
+
+    # The attached table took on the parent's indexes
+    indexes = db_session.execute(text(
+        "SELECT COUNT(*) FROM pg_indexes WHERE tablename = 'tick_data_p20310320'"
+    )).scalar()
+    assert indexes >= 1
+
+    loader.drop_stage(db_session, stage)
+    assert db_session.execute(text("SELECT to_regclass(:name)"), {"name": stage}).scalar() is None
@@ -0,0 +1,126 @@
+import pytest
+
+from app.services.analytics_spec import spec_template
+from app.services.chart_store import ChartStore
+from app.services.result_store import ResultStore
+from app.services.template_executor import TemplateExecutor
+from app.templates import example_templates
+
+
+@pytest.fixture
+def executor(tmp_path):
+    return TemplateExecutor(result_store=ResultStore(str(tmp_path / "results")),
+                            chart_store=ChartStore(str(tmp_path / "charts")))
+
+
+@pytest.mark.parametrize("name", ["VOLUME_BY_HOUR_SPEC", "VWAP_CALCULATION_SPEC"])
+def test_spec_templates_validate(executor, name):
+    result = executor.validate_template(spec_template(getattr(example_templates, name)))
+    assert result["valid"], result["error"]
+
+
+def test_spec_with_open_column_and_filters_validates(executor):
+    code = spec_template({
+        "interval": "1h",
+        "aggregations": ["open", "high", "low", "close"],
+        "filters": [{"column": "exchange", "op": "in", "value": [4, 11]}],
+    })
+    assert executor.validate_template(code)["valid"]
+
+
+@pytest.mark.parametrize("name", ["VOLUME_BY_HOUR", "VWAP_CALCULATION", "PRICE_DISTRIBUTION"])
+def test_example_templates_validate(executor, name):
+    assert executor.validate_template(getattr(example_templates, name))["valid"]
+
+
+def test_identifiers_comments_and_strings_are_not_operations(executor):
+    code = '''
+import re
+pattern = re.sub("[0-9]+", "", "compile a regex")  # compile a regex, not code
+
+def analyze_data(db_session, symbol, start_date, end_date):
+    bars = load_bars(db_session, symbol, start_date, end_date, "1h")
+    # open/close per hour; profile = "open to close"
+    bars["move"] = bars["close"] - bars["open"]
+    return {"type": "table", "data": bars[["bucket", "open", "move"]]}
+'''
+    assert executor.validate_template(code)["valid"]
+
+
+@pytest.mark.parametrize("snippet, keyword", [
+    ("open('/etc/passwd').read()", "open"),
+    ("eval('1 + 1')", "eval"),
+    ("__import__('os')", "__import__"),
+    ("import os", "os"),
+    ("import os.path", "os.path"),
+    ("from subprocess import run", "subprocess"),
+    ("import sys; sys.exit(1)", "sys.exit"),
+    ("getattr(__builtins__, 'exec')", "exec"),
+    ("getattr(pd, 'eval')", "eval"),
+    ("f = compile", "compile"),
+    ("pd.io.common.os.system('id')", "system"),
+    ("np.os.popen('id')", "popen"),
+    ("x = pd.io.common.subprocess.run", "subprocess"),
+    ("pd.core.common.system('id')", "system"),
+    ("bars.open('x')", "open"),
+    ("().__class__.__bases__[0].__subclasses__()", "__subclasses__"),
+    ("analyze_data.__globals__", "__globals__"),
+    ("getattr(pd.io.common, 'os')", "os"),
+])
+def test_dangerous_operations_are_rejected(executor, snippet, keyword):
+    code = f"def analyze_data(db_session, symbol, start_date, end_date):\n    {snippet}\n    return {{}}\n"
+    result = executor.validate_template(code)
+    assert not result["valid"]
+    assert result["error"].endswith(f": {keyword}")
+
+
+def test_syntax_errors_and_missing_entry_point(executor):
+    assert executor.validate_template("def analyze_data(:\n").get("error").startswith("Syntax error")
+    assert "analyze_data" in executor.validate_template("x = 1\n")["error"]
+
+
+def test_lint_warnings_are_reported(executor):
+    code = '''
+from sqlalchemy import text
+
+def analyze_data(db_session, symbol, start_date, end_date):
+    rows = db_session.execute(text("SELECT * FROM tick_data WHERE symbol = :s"), {"s": symbol})
+    df = pd.DataFrame(rows.fetchall())
+    return {"type": "table", "data": df["price"]}
+'''
+    result = executor.validate_template(code, rewrite=True)
+    assert result["valid"]
+    assert {w["rule"] for w in result["warnings"]} >= {"missing-time-filter"}
+    assert result["rewritten_columns"] == ["price"]
+    assert "SELECT price FROM tick_data" in result["code"]
+
+
+LOADS_ONCE = '''
+LOADED = next(COUNTER)
+
+def analyze_data(db_session, symbol, start_date, end_date):
+    return {"type": "table", "data": [{"loaded": LOADED, "symbol": symbol, "end": end_date}]}
+'''
+
+
+def test_module_body_runs_once_per_template(executor):
+    import itertools
+
+    executor.globals_dict["COUNTER"] = itertools.count()
+    assert executor.validate_template(LOADS_ONCE)["valid"]
+    runs = [executor.execute_template(LOADS_ONCE, None, symbol, "2031-03-10", "2031-03-10") for symbol in ("A", "B")]
+    assert [run["result"]["data"][0]["loaded"] for run in runs] == [0, 0]
+    assert runs[1]["result"]["data"][0] == {"loaded": 0, "symbol": "B", "end": "2031-03-10 23:59:59"}
+    assert executor.cache_info()["entries"] == 1
+
+
+def test_compiled_cache_is_bounded(tmp_path):
+    executor = TemplateExecutor(cache_size=2, result_store=ResultStore(str(tmp_path)), chart_store=ChartStore(str(tmp_path)))
+    for i in range(3):
+        executor.validate_template(f"def analyze_data(db_session, symbol, start_date, end_date):\n    return {i}\n")
+    assert executor.cache_info() == {"entries": 2, "max_entries": 2}
+
+
+def test_template_without_entry_point_fails_to_execute(executor):
+    out = executor.execute_template("x = 1\n", None, "A", "2031-03-10", "2031-03-10")
+    assert not out["success"] and "analyze_data" in out["error"]
@@ -0,0 +1,73 @@
+import pytest
+
+from app.services.template_lint import lint_template, rewrite_select_star, used_columns, _parse
+from app.templates import example_templates
+
+HEADER = "from sqlalchemy import text\n\ndef analyze_data(db_session, symbol, start_date, end_date):\n"
+
+
+def rules(body):
+    return [w["rule"] for w in lint_template(HEADER + body)]
+
+
+def test_each_rule_fires():
+    assert rules('    db_session.execute(text("SELECT * FROM tick_data"))\n') == [
+        "select-star", "missing-symbol-filter", "missing-time-filter"
+    ]
+    assert rules("    df = load_ticks(symbol, start_date, end_date)\n    return df.resample('1min').sum()\n") == [
+        "python-aggregation"
+    ]
+    assert rules("    for row in df.iterrows():\n        pass\n    df.apply(f, axis=1)\n") == ["row-loop", "row-loop"]
+
+
+def test_filtered_aggregating_sql_is_clean():
+    body = '''    rows = db_session.execute(text(f"""
+        SELECT DATE_TRUNC('hour', timestamp) AS hour, SUM(size) AS volume
+        FROM tick_data
+        WHERE symbol = :symbol AND timestamp BETWEEN :start AND :end
+        GROUP BY 1 {""}
+    """), {"symbol": symbol, "start": start_date, "end": end_date})
+    df = pd.DataFrame(rows.fetchall(), columns=["hour", "volume"])
+    return {"type": "table", "data": df.groupby("hour").sum()}
+'''
+    assert rules(body) == []
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("VOLUME_BY_HOUR", []),
+    # Both aggregate raw ticks in pandas
+    ("VWAP_CALCULATION", ["python-aggregation"]),
+    ("PRICE_DISTRIBUTION", ["python-aggregation"]),
+])
+def test_example_templates(name, expected):
+    assert [w["rule"] for w in lint_template(getattr(example_templates, name))] == expected
+
+
+def test_warnings_carry_line_numbers():
+    warnings = lint_template(HEADER + "    x = 1\n    df.itertuples()\n")
+    assert warnings == [{"rule": "row-loop", "line": 5,
+                         "message": ".itertuples() loops in Python; use vectorized column operations"}]
+
+
+def test_used_columns_ignore_bind_parameter_names():
+    tree = _parse(HEADER + '    db_session.execute(text("..."), {"symbol": symbol})\n    df.price + df["size"]\n')
+    assert used_columns(tree) == ["price", "size"]
+
+
+def test_select_star_is_narrowed_to_referenced_columns():
+    code = HEADER + (
+        '    # é — offsets count bytes\n'
+        '    rows = db_session.execute(text("SELECT * FROM tick_data WHERE symbol = :s AND timestamp >= :t"),\n'
+        '                              {"s": symbol, "t": start_date})\n'
+        '    df = pd.DataFrame(rows.fetchall(), columns=["timestamp", "size", "price"])\n'
+        '    return df["price"] * df["size"]\n'
+    )
+    rewritten, columns = rewrite_select_star(code)
+    assert columns == ["timestamp", "price", "size"]
+    assert 'text("SELECT timestamp, price, size FROM tick_data WHERE' in rewritten
+    assert rewritten.replace("SELECT timestamp, price, size", "SELECT *") == code
+
+
+def test_positional_access_blocks_the_rewrite():
+    code = HEADER + '    rows = db_session.execute(text("SELECT * FROM tick_data")).fetchall()\n    return rows[0][2] + df.price\n'
+    assert rewrite_select_star(code) == (code, [])
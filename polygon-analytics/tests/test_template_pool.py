@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.template_pool import TemplateCancelled, TemplatePoolFull, TemplateTimeout, TemplateWorkerPool
+
+ECHO = '''
+def analyze_data(db_session, symbol, start_date, end_date):
+    return {"type": "table", "data": [{"symbol": symbol, "start": start_date}]}
+'''
+
+SLEEP = '''
+import time
+
+def analyze_data(db_session, symbol, start_date, end_date):
+    time.sleep(30)
+'''
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _with_pool(body, **kwargs):
+    pool = TemplateWorkerPool(workers=1, **kwargs)
+    pool.start()
+    try:
+        return await body(pool)
+    finally:
+        pool.shutdown()
+
+
+def test_executes_in_a_worker_process():
+    async def body(pool):
+        first = await pool.execute(ECHO, "ZZTEST", "2031-03-10", "2031-03-10")
+        second = await pool.execute(ECHO, "OTHER", "2031-03-10", "2031-03-11")
+        return first, second, pool.stats()
+
+    first, second, stats = run(_with_pool(body))
+    assert first["success"] and first["result"]["data"] == [{"symbol": "ZZTEST", "start": "2031-03-10 00:00:00"}]
+    assert second["result"]["data"][0]["symbol"] == "OTHER"
+    assert stats == {"workers": 1, "running": 0, "queued": 0, "max_queue": 32}
+
+
+def test_timeout_replaces_the_worker():
+    async def body(pool):
+        # Warm the worker up so the timeout only covers the template
+        await pool.execute(ECHO, "ZZTEST", "2031-03-10", "2031-03-10")
+        stuck = pool._workers[0]
+        with pytest.raises(TemplateTimeout):
+            await pool.execute(SLEEP, "ZZTEST", "2031-03-10", "2031-03-10", timeout=0.5)
+        assert not stuck.process.is_alive() and pool._workers[0] is not stuck
+        return await pool.execute(ECHO, "ZZTEST", "2031-03-10", "2031-03-10")
+
+    assert run(_with_pool(body))["success"]
+
+
+def test_killing_a_stuck_worker_does_not_block_the_loop():
+    async def body(pool):
+        await pool.execute(ECHO, "ZZTEST", "2031-03-10", "2031-03-10")
+        stuck = pool._workers[0]
+        kill = stuck.kill
+        stuck.kill = lambda: (time.sleep(1), kill())  # a worker slow to die
+
+        gaps = []
+
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.05)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticks = asyncio.ensure_future(ticker())
+        with pytest.raises(TemplateTimeout):
+            await pool.execute(SLEEP, "ZZTEST", "2031-03-10", "2031-03-10", timeout=0.5)
+        await asyncio.sleep(0.1)  # let the ticker record the gap the kill left
+        ticks.cancel()
+        assert not stuck.process.is_alive()
+        return max(gaps)
+
+    assert run(_with_pool(body)) < 0.5
+
+
+def test_cancel_and_queue_limit():
+    async def body(pool):
+        running = asyncio.ensure_future(pool.execute(SLEEP, "ZZTEST", "2031-03-10", "2031-03-10",
+                                                     execution_id="slow"))
+        await asyncio.sleep(0.1)
+        queued = asyncio.ensure_future(pool.execute(ECHO, "ZZTEST", "2031-03-10", "2031-03-10"))
+        await asyncio.sleep(0.1)
+        assert pool.stats()["queued"] == 1
+        with pytest.raises(TemplatePoolFull):
+            await pool.execute(ECHO, "ZZTEST", "2031-03-10", "2031-03-10")
+
+        assert pool.cancel("slow") and not pool.cancel("unknown")
+        with pytest.raises(TemplateCancelled):
+            await running
+        return await queued
+
+    assert run(_with_pool(body, max_queue=1))["success"]
@@ -0,0 +1,71 @@
+import tracemalloc
+
+import pytest
+
+from app.services.chart_store import ChartStore
+from app.services.result_store import ResultStore
+from app.services.template_executor import TemplateExecutor
+from app.services.template_profiler import ExecutionProfile, current_profile
+
+QUERY_AND_CHART = '''
+from sqlalchemy import text
+
+def analyze_data(db_session, symbol, start_date, end_date):
+    rows = db_session.execute(text("SELECT g AS n FROM generate_series(1, 500) AS g")).fetchall()
+    df = pd.DataFrame(rows, columns=["n"])
+    fig, ax = plt.subplots()
+    ax.plot(df["n"])
+    return {"type": "both", "data": df.head(3), "chart": fig_to_base64(fig)}
+'''
+
+
+def test_profile_attributes_time_to_stages():
+    profile = ExecutionProfile(trace_memory=False)
+    with profile:
+        assert current_profile() is profile
+        profile.analyze_seconds = 1.0
+        profile.add_query(0.25, 100)
+        profile.add_query(0.25, 50)
+        profile.add_chart(0.125)
+    assert current_profile() is None
+
+    stats = profile.as_dict()
+    assert stats["queries"] == 2 and stats["rows_fetched"] == 150
+    assert stats["db_seconds"] == 0.5 and stats["chart_seconds"] == 0.125
+    assert stats["pandas_seconds"] == 0.375
+    assert stats["peak_memory_bytes"] is None
+
+
+def test_existing_tracemalloc_session_is_left_running():
+    tracemalloc.start()
+    try:
+        with ExecutionProfile() as profile:
+            pass
+        assert tracemalloc.is_tracing() and profile.peak_memory_bytes is None
+    finally:
+        tracemalloc.stop()
+
+
+def test_execution_profile_counts_queries_rows_and_charts(db_session, tmp_path):
+    executor = TemplateExecutor(profile_memory=True, result_store=ResultStore(str(tmp_path / "results")),
+                                chart_store=ChartStore(str(tmp_path / "charts")))
+    out = executor.execute_template(QUERY_AND_CHART, db_session, "ZZTEST", "2031-03-10", "2031-03-10")
+    assert out["success"], out["error"]
+
+    profile = out["profile"]
+    # The test session's SAVEPOINT counts as a query too, but returns no rows
+    assert profile["queries"] >= 1 and profile["rows_fetched"] == 500
+    assert profile["chart_seconds"] > 0 and profile["db_seconds"] > 0
+    assert profile["peak_memory_bytes"] > 0 and profile["payload_bytes"] > 0
+    assert profile["wall_seconds"] >= profile["db_seconds"] + profile["chart_seconds"]
+
+
+def test_failed_execution_still_reports_a_profile(db_session, tmp_path):
+    executor = TemplateExecutor(profile_memory=False, result_store=ResultStore(str(tmp_path)),
+                                chart_store=ChartStore(str(tmp_path)))
+    code = QUERY_AND_CHART.replace("generate_series(1, 500)", "no_such_function(1)")
+    out = executor.execute_template(code, db_session, "ZZTEST", "2031-03-10", "2031-03-10")
+    assert not out["success"]
+    assert out["profile"]["rows_fetched"] == 0
+    # The failed query's start time was discarded, so later timings aren't skewed
+    assert not db_session.connection().info.get("profile_query_start")
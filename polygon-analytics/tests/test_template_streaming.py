@@ -0,0 +1,48 @@
+import pytest
+
+from app.agents.fake_llm import FakeTemplateChain
+from app.services.chart_store import ChartStore
+from app.services.result_store import ResultStore
+from app.services.template_executor import TemplateExecutor
+from app.templates.example_templates import PRICE_DISTRIBUTION, VOLUME_BY_HOUR, VWAP_CALCULATION
+
+
+@pytest.mark.parametrize("prompt, code", [
+    ("Show VWAP by minute", VWAP_CALCULATION),
+    ("price histogram", PRICE_DISTRIBUTION),
+    ("hourly volume", VOLUME_BY_HOUR),
+])
+def test_fake_chain_streams_a_fenced_example(prompt, code):
+    chain = FakeTemplateChain()
+    chunks = list(chain.stream({"prompt": prompt}))
+    assert len(chunks) > 10
+    assert "".join(chunks) == chain.invoke({"prompt": prompt}) == f"```python\n{code.strip()}\n```"
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    pytest.importorskip("langchain_openai")
+    from app.agents import analytics_agent
+
+    monkeypatch.setattr(analytics_agent.settings, "llm_provider", "fake")
+    monkeypatch.setattr(analytics_agent.settings, "fake_llm_token_seconds", 0.0)
+    monkeypatch.setattr(analytics_agent.settings, "prompt_cache_enabled", True)
+    return analytics_agent.AnalyticsAgent()
+
+
+def test_stream_yields_tokens_then_the_template(agent, tmp_path):
+    items = list(agent.stream_template("Show VWAP by minute"))
+    tokens, template = items[:-1], items[-1]
+    assert all(isinstance(token, str) for token in tokens)
+    assert template["code"] == VWAP_CALCULATION.strip() and template["cache"] is None
+
+    executor = TemplateExecutor(result_store=ResultStore(str(tmp_path)), chart_store=ChartStore(str(tmp_path)))
+    assert executor.validate_template(template["code"])["valid"]
+
+
+def test_cached_prompt_streams_as_one_chunk(agent):
+    first = list(agent.stream_template("hourly volume as a bar chart"))[-1]
+    items = list(agent.stream_template("Hourly volume as a bar chart!"))
+    assert items[0] == first["code"]
+    assert items[1]["cache"]["match"] == "exact"
+    assert len(list(agent.stream_template("hourly volume as a bar chart", use_cache=False))) > 2
@@ -0,0 +1,97 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pyarrow as pa
+
+from app.services.tick_cache import TICK_SCHEMA, TickColumnCache
+
+
+def _write_day(cache, symbol, day, times):
+    table = pa.table({
+        'timestamp': pa.array(times, type=pa.timestamp('us')),
+        'price': pa.array([100.0 + i for i in range(len(times))]),
+        'size': pa.array([10 * (i + 1) for i in range(len(times))], type=pa.int64()),
+        'exchange': pa.array(['4'] * len(times)),
+        'conditions': pa.array(['[]'] * len(times)),
+    }, schema=TICK_SCHEMA)
+    path = cache.path(symbol, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, TICK_SCHEMA) as writer:
+        writer.write_table(table)
+
+
+def test_symbols_setting(tmp_path):
+    assert TickColumnCache(str(tmp_path), "aapl, msft").caches("AAPL")
+    assert not TickColumnCache(str(tmp_path), "AAPL").caches("MSFT")
+    assert TickColumnCache(str(tmp_path), "*").caches("ANY")
+    assert not TickColumnCache(str(tmp_path), "").enabled
+
+
+def test_load_reads_cached_days_without_the_database(tmp_path):
+    cache = TickColumnCache(str(tmp_path), "AA")
+    day = date(2024, 1, 2)
+    _write_day(cache, "AA", day, [datetime(2024, 1, 2, 9), datetime(2024, 1, 2, 12), datetime(2024, 1, 2, 23, 59, 59)])
+
+    df = cache.load(None, "aa", "2024-01-02", "2024-01-02", columns=["timestamp", "price"])
+    assert list(df.columns) == ["timestamp", "price"]
+    assert df["price"].tolist() == [100.0, 101.0, 102.0]
+
+    # Executor-style bounds cut inside the day
+    df = cache.load(None, "AA", "2024-01-02 10:00:00", "2024-01-02 23:59:59")
+    assert df["size"].tolist() == [20, 30]
+
+
+def test_evict_range_removes_every_symbols_days(tmp_path):
+    cache = TickColumnCache(str(tmp_path), "")
+    for symbol in ("AA", "BB"):
+        for offset in range(4):
+            day = date(2024, 1, 1) + timedelta(days=offset)
+            _write_day(cache, symbol, day, [datetime(day.year, day.month, day.day, 12)])
+
+    assert cache.evict_range(date(2024, 1, 2), date(2024, 1, 4)) == 4
+    remaining = sorted(os.listdir(tmp_path / "AA"))
+    assert remaining == ["20240101.arrow", "20240104.arrow"]
+    assert cache.read_day("BB", date(2024, 1, 2)) is None
+
+
+def test_prune_keeps_recent_days(tmp_path):
+    cache = TickColumnCache(str(tmp_path), "AA")
+    today = date.today()
+    for day in (today - timedelta(days=40), today - timedelta(days=1)):
+        _write_day(cache, "AA", day, [datetime(day.year, day.month, day.day, 12)])
+    assert cache.prune(30) == 1
+    assert os.listdir(tmp_path / "AA") == [f"{today - timedelta(days=1):%Y%m%d}.arrow"]
+
+
+def test_cached_and_uncached_days_load_the_same_rows(db_session, tmp_path):
+    from sqlalchemy import text
+
+    from app.models.models import IngestCoverage
+    from app.services.coverage_ledger import NS_PER_DAY, day_start_ns
+    from app.services.tick_loader import load_ticks
+    from app.services.tick_partitions import TickPartitionManager
+
+    days = [date(2031, 3, 10), date(2031, 3, 11), date(2031, 3, 12)]
+    TickPartitionManager("day").ensure_partitions(
+        db_session, [(day_start_ns(days[0]), day_start_ns(days[-1]) + NS_PER_DAY)]
+    )
+    for i, day in enumerate(days):
+        for hour in (9, 15, 23):
+            db_session.execute(text(
+                "INSERT INTO tick_data (symbol, timestamp, price, size, exchange, conditions) "
+                "VALUES ('ZZTEST', :ts, :price, :size, '4', '[]')"
+            ), {"ts": datetime(day.year, day.month, day.day, hour, 30), "price": 100.0 + i, "size": hour})
+    # The middle day is fully ingested; the others are not, so they stay uncached
+    db_session.add(IngestCoverage(symbol="ZZTEST", day=days[1], covered_until_ns=day_start_ns(days[1]) + NS_PER_DAY))
+    db_session.flush()
+
+    cache = TickColumnCache(str(tmp_path), "ZZTEST")
+    assert [cache.build_day(db_session, "zztest", day) for day in days] == [False, True, False]
+
+    columns = ["timestamp", "price", "size"]
+    mixed = cache.load(db_session, "ZZTEST", "2031-03-10 12:00:00", "2031-03-12 23:59:59", columns)
+    direct = load_ticks("ZZTEST", "2031-03-10 12:00:00", "2031-03-12 23:59:59", columns=columns, db_session=db_session)
+    assert len(mixed) == 8
+    assert mixed["timestamp"].tolist() == direct["timestamp"].tolist()
+    assert mixed["price"].tolist() == direct["price"].tolist()
+    assert mixed["size"].tolist() == direct["size"].tolist()
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from app.services.tick_loader import bind_session, load_ticks, tick_bounds
+from app.services.tick_partitions import TickPartitionManager
+
+
+def ns(value: str) -> int:
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()) * 1_000_000_000
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ("2031-03-10", "2031-03-10", (datetime(2031, 3, 10), datetime(2031, 3, 11))),
+    ("2031-03-10 00:00:00", "2031-03-10 23:59:59", (datetime(2031, 3, 10), datetime(2031, 3, 11))),
+    ("2031-03-10 09:30:00", "2031-03-10 16:00:00", (datetime(2031, 3, 10, 9, 30), datetime(2031, 3, 10, 16, 0, 0, 1))),
+])
+def test_tick_bounds_are_half_open(start, end, expected):
+    assert tick_bounds(start, end) == expected
+
+
+@pytest.fixture
+def ticks(db_session):
+    TickPartitionManager("day").ensure_partitions(db_session, [(ns("2031-03-10"), ns("2031-03-11"))])
+    rows = [("09:30:00", 10.25, 100, "4", '["12"]'), ("09:30:00", 10.5, 200, "11", "[]"),
+            ("09:30:00", 10.75, 300, "4", "[]"), ("12:00:00.123456", 11.0, 50, "12", '["37"]'),
+            ("23:59:59.5", 12.0, 10, "4", "[]")]
+    for ts, price, size, exchange, conditions in rows:
+        db_session.execute(text(
+            "INSERT INTO tick_data (symbol, timestamp, price, size, exchange, conditions) "
+            "VALUES ('ZZTEST', :ts, :price, :size, :exchange, CAST(:conditions AS json))"
+        ), {"ts": f"2031-03-10 {ts}", "price": price, "size": size, "exchange": exchange, "conditions": conditions})
+    # Outside the range on both sides
+    for ts in ("2031-03-09 23:59:59.999999", "2031-03-11 00:00:00"):
+        db_session.execute(text(
+            "INSERT INTO tick_data (symbol, timestamp, price, size, exchange) VALUES ('ZZTEST', :ts, 1, 1, '4')"
+        ), {"ts": ts})
+    return db_session
+
+
+def test_binary_and_csv_paths_agree(ticks):
+    binary = load_ticks("ZZTEST", "2031-03-10", "2031-03-10", db_session=ticks)
+    csv = load_ticks("ZZTEST", "2031-03-10", "2031-03-10", columns=["timestamp", "price", "size", "exchange"],
+                     db_session=ticks)
+
+    assert list(binary.columns) == ["timestamp", "price", "size"]
+    assert len(binary) == 5
+    assert binary["timestamp"].dtype == "datetime64[ns]" and binary["size"].dtype == np.int64
+    assert binary["timestamp"].iloc[3] == pd.Timestamp("2031-03-10 12:00:00.123456")
+    assert binary["timestamp"].iloc[-1] == pd.Timestamp("2031-03-10 23:59:59.5")
+    pd.testing.assert_frame_equal(binary.sort_values(["timestamp", "price"], ignore_index=True),
+                                  csv[binary.columns].sort_values(["timestamp", "price"], ignore_index=True))
+    assert sorted(csv["exchange"]) == ["11", "12", "4", "4", "4"]
+
+
+def test_symbols_are_case_insensitive(ticks):
+    upper = load_ticks("ZZTEST", "2031-03-10", "2031-03-10", db_session=ticks)
+    assert len(upper) > 0
+    pd.testing.assert_frame_equal(load_ticks("zztest", "2031-03-10", "2031-03-10", db_session=ticks), upper)
+    chunks = list(load_ticks("zztest", "2031-03-10", "2031-03-10", chunk_rows=100, db_session=ticks))
+    assert sum(len(chunk) for chunk in chunks) == len(upper)
+
+
+def test_chunks_resume_past_timestamp_ties(ticks):
+    with bind_session(ticks):
+        chunks = list(load_ticks("ZZTEST", "2031-03-10", "2031-03-10", columns=["price"], chunk_rows=2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert sorted(pd.concat(chunks)["price"]) == [10.25, 10.5, 10.75, 11.0, 12.0]
+
+
+def test_empty_range_and_argument_errors(ticks):
+    empty = load_ticks("ZZTEST", "2031-03-12", "2031-03-12", columns=["price", "exchange"], db_session=ticks)
+    assert empty.empty and list(empty.columns) == ["price", "exchange"]
+    with pytest.raises(ValueError, match="Unknown tick column"):
+        load_ticks("ZZTEST", "2031-03-10", "2031-03-10", columns=["volume"], db_session=ticks)
+    with pytest.raises(RuntimeError, match="database session"):
+        load_ticks("ZZTEST", "2031-03-10", "2031-03-10")
@@ -0,0 +1,89 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.services.result_cache import ResultCache
+from app.services.tick_cache import TickColumnCache
+from app.services.tick_partitions import TickPartitionManager
+
+
+def ns(value: str) -> int:
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()) * 1_000_000_000
+
+
+def test_daily_periods_include_neighbours():
+    manager = TickPartitionManager("day")
+    periods = manager.periods_for([(ns("2031-03-10"), ns("2031-03-12"))])
+    assert periods == [date(2031, 3, 9), date(2031, 3, 10), date(2031, 3, 11), date(2031, 3, 12)]
+
+
+def test_monthly_periods_include_neighbours():
+    manager = TickPartitionManager("month")
+    periods = manager.periods_for([(ns("2031-01-01"), ns("2031-01-02"))])
+    assert periods == [date(2030, 12, 1), date(2031, 1, 1), date(2031, 2, 1)]
+    assert [manager.partition_name(p) for p in periods] == ["tick_data_p203012", "tick_data_p203101", "tick_data_p203102"]
+
+
+def test_overlapping_ranges_are_deduplicated():
+    manager = TickPartitionManager("day")
+    periods = manager.periods_for([(ns("2031-03-10"), ns("2031-03-11")), (ns("2031-03-11"), ns("2031-03-12"))])
+    assert len(periods) == len(set(periods)) == 4
+
+
+def test_interval_is_validated():
+    with pytest.raises(ValueError):
+        TickPartitionManager("week")
+
+
+class HeapTable:
+    """A db whose tick_data has no pg_partitioned_table row"""
+
+    def execute(self, *args, **kwargs):
+        return self
+
+    def fetchone(self):
+        return None
+
+
+def test_heap_tick_data_is_rejected():
+    with pytest.raises(RuntimeError, match="tick_partitions migrate"):
+        TickPartitionManager().require_partitioned(HeapTable())
+
+
+def test_row_just_before_the_range_has_a_partition(db_session):
+    manager = TickPartitionManager("day")
+    manager.require_partitioned(db_session)
+    created = manager.ensure_partitions(db_session, [(ns("2031-03-10"), ns("2031-03-11"))])
+    assert "tick_data_p20310309" in created
+
+    # Participant time a few seconds before the requested SIP range
+    db_session.execute(text(
+        "INSERT INTO tick_data (symbol, timestamp, price, size, exchange) "
+        "VALUES ('ZZTEST', '2031-03-09 23:59:58', 1.0, 100, '4')"
+    ))
+    assert db_session.execute(text("SELECT COUNT(*) FROM tick_data_p20310309")).scalar() == 1
+
+
+def test_retention_clears_everything_derived_from_dropped_partitions(db_session, tmp_path):
+    manager = TickPartitionManager("day")
+    manager.create_partition(db_session, "tick_data_p20000105", date(2000, 1, 5), date(2000, 1, 6))
+    cache = TickColumnCache(str(tmp_path), "*")
+    (tmp_path / "ZZTEST").mkdir()
+    for day in ("20000105", "20240102"):
+        (tmp_path / "ZZTEST" / f"{day}.arrow").write_bytes(b"")
+        db_session.execute(text(
+            "INSERT INTO tick_bars (symbol, interval, bucket, open, high, low, close, volume, trade_count, "
+            "pv_sum, first_ts, last_ts) VALUES ('ZZTEST', '1h', :bucket, 1, 1, 1, 1, 1, 1, 1, 0, 0)"
+        ), {"bucket": f"{day} 10:00:00"})
+    results = ResultCache()
+    results.set("code", "ZZTEST", "2000-01-04", "2000-01-05", {"rows": 1})
+    results.set("code", "ZZTEST", "2024-01-02", "2024-01-02", {"rows": 2})
+
+    days = (datetime.utcnow().date() - date(2000, 1, 7)).days
+    assert manager.drop_older_than(db_session, days, tick_cache=cache, result_cache=results) == ["tick_data_p20000105"]
+    assert [p.name for p in (tmp_path / "ZZTEST").iterdir()] == ["20240102.arrow"]
+    buckets = db_session.execute(text("SELECT bucket FROM tick_bars WHERE symbol = 'ZZTEST'")).scalars().all()
+    assert buckets == [datetime(2024, 1, 2, 10)]
+    assert results.get("code", "ZZTEST", "2000-01-04", "2000-01-05") is None
+    assert results.get("code", "ZZTEST", "2024-01-02", "2024-01-02") == {"rows": 2}